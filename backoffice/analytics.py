@@ -0,0 +1,273 @@
+# backoffice/analytics.py
+"""
+Owner analytics from hourly + daily rollup rows (OrderRollup, ItemSalesRollup).
+
+- record_order_change(): funnel / revenue deltas, from the Order signals
+- record_items(): item sales of an order that became converted (or stopped being)
+- rollup_window(): recomputes the trailing ANALYTICS_ROLLUP_LOOKBACK_HOURS from
+  the orders tables (Celery beat) - fixes whatever the signals can't see
+  (bulk updates, item edits after confirmation, deleted orders)
+- popular_items() / revenue_series() / funnel(): the API reads; they only touch
+  rollup rows, so cost depends on the window, not on order history
+
+Buckets are keyed on the order's created_at, truncated in ANALYTICS_TIME_ZONE.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from restaurant_backend.observability import log_event
+from .models import Granularity, ItemSalesRollup, OrderRollup
+from .stats import CONVERTED_STATUSES
+
+logger = logging.getLogger(__name__)
+
+FUNNEL_FIELDS = ["carts", "converted", "completed", "cancelled", "paid", "revenue"]
+ZERO = Decimal("0.00")
+
+
+def _tz() -> ZoneInfo:
+    return ZoneInfo(settings.ANALYTICS_TIME_ZONE)
+
+
+def buckets_for(moment) -> dict:
+    """{granularity: bucket start} for an aware datetime."""
+    hour = moment.astimezone(_tz()).replace(minute=0, second=0, microsecond=0)
+    return {Granularity.HOUR: hour, Granularity.DAY: hour.replace(hour=0)}
+
+
+def _money(value) -> str:
+    return f"{Decimal(value or ZERO):.2f}"
+
+
+def _step(granularity) -> timedelta:
+    return timedelta(hours=1) if granularity == Granularity.HOUR else timedelta(days=1)
+
+
+# ------------------------------------------------------------
+# Incremental (Order signals)
+# ------------------------------------------------------------
+def funnel_contribution(status, payment_status, total) -> dict:
+    converted = status in CONVERTED_STATUSES
+    values = {"carts": 1}
+    if converted:
+        values["converted"] = 1
+        values["revenue"] = Decimal(total or 0)
+    if status == Order.OrderStatus.COMPLETED:
+        values["completed"] = 1
+    if status == Order.OrderStatus.CANCELLED:
+        values["cancelled"] = 1
+    if payment_status == Order.PaymentStatus.PAID:
+        values["paid"] = 1
+    return values
+
+
+def _bump(model, key: dict, delta: dict) -> None:
+    """F() increment of one rollup row, created on first use."""
+    if not delta:
+        return
+    updates = {field: F(field) + change for field, change in delta.items()}
+    if model.objects.filter(**key).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **delta)
+    except IntegrityError:
+        # another request created the row in between
+        model.objects.filter(**key).update(**updates)
+
+
+def record_order_change(restaurant_id, source, created_at, delta: dict) -> None:
+    for granularity, bucket in buckets_for(created_at).items():
+        key = {"restaurant_id": restaurant_id, "granularity": granularity, "bucket": bucket, "source": source}
+        _bump(OrderRollup, key, delta)
+
+
+def record_items(order: Order, sign: int) -> None:
+    """Add (+1) or take back (-1) the order's items in its item buckets."""
+    lines = order.items.order_by().values("menu_item_id").annotate(qty=Sum("quantity"), amount=Sum("total_price"))
+    buckets = buckets_for(order.created_at)
+    for line in lines:
+        for granularity, bucket in buckets.items():
+            key = {
+                "restaurant_id": order.restaurant_id,
+                "menu_item_id": line["menu_item_id"],
+                "granularity": granularity,
+                "bucket": bucket,
+                "source": order.source,
+            }
+            _bump(
+                ItemSalesRollup,
+                key,
+                {"quantity": sign * line["qty"], "revenue": sign * line["amount"], "order_count": sign},
+            )
+
+
+# ------------------------------------------------------------
+# Periodic recompute
+# ------------------------------------------------------------
+def rollup_window(hours: int | None = None) -> int:
+    """
+    Rebuild every rollup row whose bucket starts within the last `hours`
+    (from the start of that local day, so day rows are complete). Returns rows written.
+    """
+    hours = hours or settings.ANALYTICS_ROLLUP_LOOKBACK_HOURS
+    since = buckets_for(timezone.now() - timedelta(hours=hours))[Granularity.DAY]
+    converted = Q(status__in=CONVERTED_STATUSES)
+    written = 0
+
+    with transaction.atomic():
+        OrderRollup.objects.filter(bucket__gte=since).delete()
+        ItemSalesRollup.objects.filter(bucket__gte=since).delete()
+
+        for granularity in Granularity.values:
+            order_rows = (
+                Order.objects.filter(created_at__gte=since)
+                .annotate(b=Trunc("created_at", granularity, tzinfo=_tz()))
+                .values("restaurant_id", "b", "source")
+                .annotate(
+                    carts=Count("id"),
+                    converted=Count("id", filter=converted),
+                    completed=Count("id", filter=Q(status=Order.OrderStatus.COMPLETED)),
+                    cancelled=Count("id", filter=Q(status=Order.OrderStatus.CANCELLED)),
+                    paid=Count("id", filter=Q(payment_status=Order.PaymentStatus.PAID)),
+                    revenue=Coalesce(Sum("total", filter=converted), ZERO),
+                )
+                .order_by()
+            )
+            created = OrderRollup.objects.bulk_create(
+                [
+                    OrderRollup(
+                        restaurant_id=row.pop("restaurant_id"),
+                        granularity=granularity,
+                        bucket=row.pop("b"),
+                        **row,
+                    )
+                    for row in order_rows
+                ],
+                batch_size=500,
+            )
+            written += len(created)
+
+            item_rows = (
+                OrderItem.objects.filter(order__created_at__gte=since, order__status__in=CONVERTED_STATUSES)
+                .annotate(b=Trunc("order__created_at", granularity, tzinfo=_tz()))
+                .values("order__restaurant_id", "b", "order__source", "menu_item_id")
+                .annotate(
+                    qty=Sum("quantity"),
+                    amount=Sum("total_price"),
+                    orders=Count("order_id", distinct=True),
+                )
+                .order_by()
+            )
+            created = ItemSalesRollup.objects.bulk_create(
+                [
+                    ItemSalesRollup(
+                        restaurant_id=row["order__restaurant_id"],
+                        menu_item_id=row["menu_item_id"],
+                        granularity=granularity,
+                        bucket=row["b"],
+                        source=row["order__source"],
+                        quantity=row["qty"],
+                        revenue=row["amount"],
+                        order_count=row["orders"],
+                    )
+                    for row in item_rows
+                ],
+                batch_size=500,
+            )
+            written += len(created)
+
+    log_event(logger, "analytics_rollup", since=since.isoformat(), rows=written)
+    return written
+
+
+# ------------------------------------------------------------
+# Reads (API)
+# ------------------------------------------------------------
+def window_start(granularity, periods: int):
+    """Bucket start of the oldest of the last `periods` buckets (current one included)."""
+    current = buckets_for(timezone.now())[granularity]
+    return current - _step(granularity) * (periods - 1)
+
+
+def _rows(model, restaurant_id, granularity, since, source=None):
+    qs = model.objects.filter(restaurant_id=restaurant_id, granularity=granularity, bucket__gte=since)
+    return qs.filter(source=source) if source else qs
+
+
+def popular_items(restaurant_id, days: int = 30, source: str | None = None, limit: int = 10) -> list[dict]:
+    rows = (
+        _rows(ItemSalesRollup, restaurant_id, Granularity.DAY, window_start(Granularity.DAY, days), source)
+        .values("menu_item_id", "menu_item__name")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"), orders=Sum("order_count"))
+        .filter(quantity__gt=0)
+        .order_by("-quantity", "-revenue")[:limit]
+    )
+    return [
+        {
+            "id": row["menu_item_id"],
+            "name": row["menu_item__name"],
+            "quantity": row["quantity"],
+            "revenue": _money(row["revenue"]),
+            "orders": row["orders"],
+        }
+        for row in rows
+    ]
+
+
+def revenue_series(restaurant_id, granularity, periods: int, source: str | None = None) -> list[dict]:
+    """One point per bucket (zeros for empty buckets), oldest first."""
+    since = window_start(granularity, periods)
+    found = {
+        row["bucket"]: row
+        for row in _rows(OrderRollup, restaurant_id, granularity, since, source)
+        .values("bucket")
+        .annotate(revenue=Sum("revenue"), orders=Sum("converted"), carts=Sum("carts"))
+        .order_by()
+    }
+    series = []
+    for i in range(periods):
+        bucket = since + _step(granularity) * i
+        row = found.get(bucket) or {}
+        series.append(
+            {
+                "bucket": bucket.isoformat(),
+                "revenue": _money(row.get("revenue")),
+                "orders": row.get("orders") or 0,
+                "carts": row.get("carts") or 0,
+            }
+        )
+    return series
+
+
+def _funnel_totals(values: dict) -> dict:
+    carts = values.get("carts") or 0
+    converted = values.get("converted") or 0
+    return {
+        "carts": carts,
+        "converted": converted,
+        "completed": values.get("completed") or 0,
+        "cancelled": values.get("cancelled") or 0,
+        "paid": values.get("paid") or 0,
+        "revenue": _money(values.get("revenue")),
+        "conversion_rate": round(converted / carts, 4) if carts else 0.0,
+    }
+
+
+def funnel(restaurant_id, days: int = 30, source: str | None = None) -> dict:
+    qs = _rows(OrderRollup, restaurant_id, Granularity.DAY, window_start(Granularity.DAY, days), source)
+    sums = {field: Sum(field) for field in FUNNEL_FIELDS}
+    by_source = {
+        row.pop("source"): _funnel_totals(row)
+        for row in qs.values("source").annotate(**sums).order_by()
+    }
+    return {"days": days, **_funnel_totals(qs.aggregate(**sums)), "by_source": by_source}
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class BackofficeConfig(AppConfig):
     name = 'backoffice'
+
+    def ready(self):
+        # dashboard counters follow order / restaurant / user changes
+        from . import signals  # noqa
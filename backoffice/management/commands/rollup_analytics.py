@@ -0,0 +1,20 @@
+# backoffice/management/commands/rollup_analytics.py
+from django.core.management.base import BaseCommand
+
+from backoffice.analytics import rollup_window
+from backoffice.stats import rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the owner analytics rollups for the last --hours (backfill after deploy: "
+        "--hours 8760 for a year) and the superadmin dashboard counters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=None, help="Default: ANALYTICS_ROLLUP_LOOKBACK_HOURS.")
+
+    def handle(self, *args, **options):
+        rows = rollup_window(options["hours"])
+        platform = rollup()
+        self.stdout.write(f"analytics rows={rows} dashboard orders={platform.orders_total}")
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:18
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('restaurants', '0005_alter_restaurant_pos_menu_last_synced_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders_total', models.PositiveIntegerField(default=0)),
+                ('orders_pending', models.IntegerField(default=0)),
+                ('orders_confirmed', models.IntegerField(default=0)),
+                ('orders_in_kitchen', models.IntegerField(default=0)),
+                ('orders_ready', models.IntegerField(default=0)),
+                ('orders_completed', models.IntegerField(default=0)),
+                ('orders_cancelled', models.IntegerField(default=0)),
+                ('gmv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('chatbot_orders', models.IntegerField(default=0)),
+                ('chatbot_conversions', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('rolled_up_at', models.DateTimeField(blank=True, null=True)),
+                ('total_stores', models.IntegerField(default=0)),
+                ('total_users', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Platform stats',
+                'verbose_name_plural': 'Platform stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='RestaurantStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders_total', models.PositiveIntegerField(default=0)),
+                ('orders_pending', models.IntegerField(default=0)),
+                ('orders_confirmed', models.IntegerField(default=0)),
+                ('orders_in_kitchen', models.IntegerField(default=0)),
+                ('orders_ready', models.IntegerField(default=0)),
+                ('orders_completed', models.IntegerField(default=0)),
+                ('orders_cancelled', models.IntegerField(default=0)),
+                ('gmv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('chatbot_orders', models.IntegerField(default=0)),
+                ('chatbot_conversions', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('rolled_up_at', models.DateTimeField(blank=True, null=True)),
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='restaurants.restaurant')),
+            ],
+            options={
+                'verbose_name': 'Restaurant stats',
+                'verbose_name_plural': 'Restaurant stats',
+            },
+        ),
+    ]
@@ -1,3 +1,121 @@
+# backoffice/models.py
+from decimal import Decimal
+
 from django.db import models
 
-# Create your models here.
+from restaurants.models import Restaurant
+
+
+class OrderCounters(models.Model):
+    """
+    Order counters kept incrementally by backoffice/signals.py and recomputed
+    by the periodic rollup (backoffice/stats.py).
+    GMV / conversions count orders that got past the cart (confirmed or later).
+    """
+
+    orders_total = models.PositiveIntegerField(default=0)
+    orders_pending = models.IntegerField(default=0)
+    orders_confirmed = models.IntegerField(default=0)
+    orders_in_kitchen = models.IntegerField(default=0)
+    orders_ready = models.IntegerField(default=0)
+    orders_completed = models.IntegerField(default=0)
+    orders_cancelled = models.IntegerField(default=0)
+
+    gmv = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    # carts started from the chatbot / how many of them became real orders
+    chatbot_orders = models.IntegerField(default=0)
+    chatbot_conversions = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+    rolled_up_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def chatbot_conversion_rate(self) -> float:
+        return self.chatbot_conversions / self.chatbot_orders if self.chatbot_orders else 0.0
+
+
+class RestaurantStats(OrderCounters):
+    restaurant = models.OneToOneField(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name="stats",
+    )
+
+    class Meta:
+        verbose_name = "Restaurant stats"
+        verbose_name_plural = "Restaurant stats"
+
+    def __str__(self):
+        return f"Stats for restaurant #{self.restaurant_id}"
+
+
+class PlatformStats(OrderCounters):
+    """Single row (pk=1): totals for the superadmin dashboard."""
+
+    total_stores = models.IntegerField(default=0)
+    total_users = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Platform stats"
+        verbose_name_plural = "Platform stats"
+
+    def __str__(self):
+        return "Platform stats"
+
+
+# ------------------------------------------------------------
+# Owner analytics rollups (backoffice/analytics.py)
+# ------------------------------------------------------------
+class Granularity(models.TextChoices):
+    HOUR = "hour", "Hour"
+    DAY = "day", "Day"
+
+
+class OrderRollup(models.Model):
+    """Order funnel + revenue per restaurant, time bucket (order created_at) and order source."""
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name="order_rollups")
+    granularity = models.CharField(max_length=4, choices=Granularity.choices)
+    bucket = models.DateTimeField()
+    source = models.CharField(max_length=20)
+
+    carts = models.IntegerField(default=0)
+    converted = models.IntegerField(default=0)  # confirmed or later
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    paid = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "granularity", "bucket", "source"],
+                name="uniq_order_rollup_bucket",
+            ),
+        ]
+
+
+class ItemSalesRollup(models.Model):
+    """Sold quantity / revenue per menu item of converted orders, same buckets as OrderRollup."""
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name="item_rollups")
+    menu_item = models.ForeignKey("menu.MenuItem", on_delete=models.CASCADE, related_name="+")
+    granularity = models.CharField(max_length=4, choices=Granularity.choices)
+    bucket = models.DateTimeField()
+    source = models.CharField(max_length=20)
+
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "granularity", "bucket", "source", "menu_item"],
+                name="uniq_item_rollup_bucket",
+            ),
+        ]
@@ -0,0 +1,113 @@
+# backoffice/signals.py
+"""
+Incremental dashboard counters and analytics rollups: every order save
+applies new - old contribution (backoffice/stats.py, backoffice/analytics.py).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from orders.models import Order
+from restaurants.models import Restaurant
+from .models import RestaurantStats
+from .analytics import funnel_contribution, record_items, record_order_change
+from .stats import CONVERTED_STATUSES, apply_delta, bump_platform, contribution, diff
+
+_TRACKED = ("restaurant_id", "status", "total", "source", "payment_status", "created_at")
+
+
+def _order_values(order: Order):
+    """Tracked field values as loaded; None if one is deferred."""
+    values = order.__dict__
+    if any(field not in values for field in _TRACKED):
+        # never trigger a query for a deferred field; the rollups fix these
+        return None
+    return {field: values[field] for field in _TRACKED}
+
+
+def _counters(values: dict) -> dict:
+    if not values:
+        return {}
+    return contribution(values["status"], values["total"], values["source"])
+
+
+def _funnel(values: dict) -> dict:
+    if not values:
+        return {}
+    return funnel_contribution(values["status"], values["payment_status"], values["total"])
+
+
+def _converted(values: dict) -> bool:
+    return bool(values) and values["status"] in CONVERTED_STATUSES
+
+
+def _restaurant_deleted(origin) -> bool:
+    """The delete cascades from a restaurant or its owner (instance or queryset)."""
+    model = getattr(origin, "model", None) or type(origin)
+    return model is Restaurant or model is get_user_model()
+
+
+@receiver(post_init, sender=Order)
+def remember_order_state(sender, instance: Order, **kwargs):
+    # {} = not in the DB yet, contributes nothing so far
+    instance._stats_state = {} if instance.pk is None else _order_values(instance)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance: Order, created, raw=False, **kwargs):
+    old = getattr(instance, "_stats_state", None)
+    new = _order_values(instance)
+    instance._stats_state = new
+    if raw or old is None or new is None:
+        return
+
+    # superadmin counters
+    if old and old["restaurant_id"] != new["restaurant_id"]:
+        apply_delta(old["restaurant_id"], diff(_counters(old), {}))
+        apply_delta(new["restaurant_id"], _counters(new))
+    else:
+        apply_delta(new["restaurant_id"], diff(_counters(old), _counters(new)))
+
+    # owner analytics: moving an order between restaurants is left to the rollup
+    if old and old["restaurant_id"] != new["restaurant_id"]:
+        return
+    record_order_change(new["restaurant_id"], new["source"], new["created_at"], diff(_funnel(old), _funnel(new)))
+    if _converted(old) != _converted(new):
+        record_items(instance, 1 if _converted(new) else -1)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance: Order, **kwargs):
+    values = _order_values(instance)
+    if values is None:
+        return
+    apply_delta(values["restaurant_id"], diff(_counters(values), {}))
+    if _restaurant_deleted(kwargs.get("origin")):
+        # the restaurant's rollup rows go with it; recreating them would break its delete
+        return
+    # its items are already gone (cascade); item rows are fixed by the rollup
+    record_order_change(values["restaurant_id"], values["source"], values["created_at"], diff(_funnel(values), {}))
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_saved(sender, instance: Restaurant, created, raw=False, **kwargs):
+    if created and not raw:
+        RestaurantStats.objects.get_or_create(restaurant=instance)
+        bump_platform(total_stores=1)
+
+
+@receiver(post_delete, sender=Restaurant)
+def restaurant_deleted(sender, instance: Restaurant, **kwargs):
+    bump_platform(total_stores=-1)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump_platform(total_users=1)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    bump_platform(total_users=-1)
@@ -0,0 +1,143 @@
+# backoffice/stats.py
+"""
+Dashboard counters (RestaurantStats per restaurant, PlatformStats pk=1).
+
+- contribution(): what one order adds to the counters
+- apply_delta(): F() increments on the restaurant row and the platform row,
+  called by the Order signals with new contribution - old contribution
+- rollup(): recomputes every row from the orders table (Celery beat, every
+  STATS_ROLLUP_SECONDS). Changes that bypass signals (queryset.update(),
+  raw SQL, deferred-field saves) are corrected by the next rollup.
+
+Rows that don't exist yet are left alone by apply_delta(); the rollup
+creates them with full totals.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import User
+from orders.models import Order
+from restaurant_backend.observability import log_event
+from restaurants.models import Restaurant
+from .models import PlatformStats, RestaurantStats
+
+logger = logging.getLogger(__name__)
+
+PLATFORM_PK = 1
+
+STATUS_FIELDS = {
+    Order.OrderStatus.PENDING: "orders_pending",
+    Order.OrderStatus.CONFIRMED: "orders_confirmed",
+    Order.OrderStatus.IN_KITCHEN: "orders_in_kitchen",
+    Order.OrderStatus.READY: "orders_ready",
+    Order.OrderStatus.COMPLETED: "orders_completed",
+    Order.OrderStatus.CANCELLED: "orders_cancelled",
+}
+# past the cart: counts towards GMV and chatbot conversions
+CONVERTED_STATUSES = (
+    Order.OrderStatus.CONFIRMED,
+    Order.OrderStatus.IN_KITCHEN,
+    Order.OrderStatus.READY,
+    Order.OrderStatus.COMPLETED,
+)
+CHATBOT_SOURCE = "chatbot"
+
+COUNTER_FIELDS = ["orders_total", *STATUS_FIELDS.values(), "gmv", "chatbot_orders", "chatbot_conversions"]
+
+
+def contribution(status, total, source) -> dict:
+    converted = status in CONVERTED_STATUSES
+    values = {"orders_total": 1}
+    if status in STATUS_FIELDS:
+        values[STATUS_FIELDS[status]] = 1
+    if converted:
+        values["gmv"] = Decimal(total or 0)
+    if source == CHATBOT_SOURCE:
+        values["chatbot_orders"] = 1
+        if converted:
+            values["chatbot_conversions"] = 1
+    return values
+
+
+def diff(old: dict, new: dict) -> dict:
+    delta = {}
+    for field in old.keys() | new.keys():
+        change = new.get(field, 0) - old.get(field, 0)
+        if change:
+            delta[field] = change
+    return delta
+
+
+def apply_delta(restaurant_id, delta: dict) -> None:
+    if not delta:
+        return
+    updates = {field: F(field) + change for field, change in delta.items()}
+    RestaurantStats.objects.filter(restaurant_id=restaurant_id).update(**updates)
+    PlatformStats.objects.filter(pk=PLATFORM_PK).update(**updates)
+
+
+def bump_platform(**changes) -> None:
+    """total_stores / total_users +- 1 (Restaurant / User signals)."""
+    PlatformStats.objects.filter(pk=PLATFORM_PK).update(
+        **{field: F(field) + change for field, change in changes.items()}
+    )
+
+
+# ------------------------------------------------------------
+# Rollup
+# ------------------------------------------------------------
+def _aggregates() -> dict:
+    converted = Q(status__in=CONVERTED_STATUSES)
+    chatbot = Q(source=CHATBOT_SOURCE)
+    return {
+        "orders_total": Count("id"),
+        **{field: Count("id", filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+        "gmv": Coalesce(Sum("total", filter=converted), Decimal("0.00")),
+        "chatbot_orders": Count("id", filter=chatbot),
+        "chatbot_conversions": Count("id", filter=chatbot & converted),
+    }
+
+
+def rollup(batch_size: int = 500) -> PlatformStats:
+    """Recompute every stats row from the source tables (one GROUP BY over orders)."""
+    now = timezone.now()
+    per_restaurant = {
+        row.pop("restaurant"): row
+        for row in Order.objects.order_by().values("restaurant").annotate(**_aggregates())
+    }
+    empty = {field: 0 for field in COUNTER_FIELDS}
+
+    with transaction.atomic():
+        rows = [
+            RestaurantStats(restaurant_id=rid, rolled_up_at=now, **per_restaurant.get(rid, empty))
+            for rid in Restaurant.objects.values_list("id", flat=True)
+        ]
+        RestaurantStats.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["restaurant"],
+            update_fields=[*COUNTER_FIELDS, "rolled_up_at", "updated_at"],
+        )
+        platform, _ = PlatformStats.objects.update_or_create(
+            pk=PLATFORM_PK,
+            defaults={
+                **Order.objects.aggregate(**_aggregates()),
+                "total_stores": len(rows),
+                "total_users": User.objects.count(),
+                "rolled_up_at": now,
+            },
+        )
+
+    log_event(logger, "stats_rollup", restaurants=len(rows), orders=platform.orders_total)
+    return platform
+
+
+def platform_stats() -> PlatformStats:
+    """The platform row; the very first call (fresh install) builds everything."""
+    return PlatformStats.objects.filter(pk=PLATFORM_PK).first() or rollup()
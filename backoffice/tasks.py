@@ -0,0 +1,17 @@
+# backoffice/tasks.py
+from celery import shared_task
+
+from .analytics import rollup_window
+from .stats import rollup
+
+
+@shared_task
+def rollup_dashboard_stats() -> int:
+    """Periodic (beat) recompute of the dashboard counters; returns the order count."""
+    return rollup().orders_total
+
+
+@shared_task
+def rollup_owner_analytics(hours: int | None = None) -> int:
+    """Periodic (beat) recompute of the recent analytics buckets; returns rows written."""
+    return rollup_window(hours)
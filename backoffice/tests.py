@@ -1,3 +1,139 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from menu.embedding_context import suspend_embedding_signals
+from menu.models import MenuItem
+from orders.models import Order, OrderItem
+from restaurants.models import Restaurant
+
+from . import analytics, stats
+from .models import ItemSalesRollup, OrderRollup, PlatformStats, RestaurantStats
+
+ORDER_ROLLUP_FIELDS = ["restaurant_id", "granularity", "bucket", "source", *analytics.FUNNEL_FIELDS]
+ITEM_ROLLUP_FIELDS = ["restaurant_id", "menu_item_id", "granularity", "bucket", "source", "quantity", "revenue", "order_count"]
+
+
+class OrderSignalCountersTests(TestCase):
+    """
+    The Order signals keep the dashboard counters and the analytics rollups
+    where a full recompute (stats.rollup(), analytics.rollup_window()) would put them.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create(username="owner", email="owner@example.com")
+        self.restaurant = Restaurant.objects.create(owner=self.owner, name="Only Kulchas")
+        with suspend_embedding_signals():
+            self.kulcha = MenuItem.objects.create(
+                restaurant=self.restaurant, name="Amritsari Kulcha", price=Decimal("120"), external_item_id="k1"
+            )
+            self.lassi = MenuItem.objects.create(
+                restaurant=self.restaurant, name="Sweet Lassi", price=Decimal("60"), external_item_id="l1"
+            )
+        # counters start from a rollup, as on a live install
+        stats.rollup()
+
+    def order(self, *lines, source="chatbot"):
+        order = Order.objects.create(restaurant=self.restaurant, session_id="sess", source=source)
+        for menu_item, quantity in lines:
+            OrderItem.objects.create(
+                order=order, menu_item=menu_item, name=menu_item.name, quantity=quantity,
+                unit_price=menu_item.price, total_price=menu_item.price * quantity,
+            )
+        order.recalc_totals()
+        return order
+
+    def set_status(self, order, status, **fields):
+        order.status = status
+        for name, value in fields.items():
+            setattr(order, name, value)
+        order.save()
+
+    def order_history(self):
+        """Two confirmed orders (one paid, completed), one cancelled after confirming, a deleted cart, an open cart."""
+        first = self.order((self.kulcha, 2), (self.lassi, 1))
+        self.set_status(first, Order.OrderStatus.CONFIRMED)
+        self.set_status(first, Order.OrderStatus.COMPLETED, payment_status=Order.PaymentStatus.PAID)
+
+        second = self.order((self.kulcha, 1), source="admin")
+        self.set_status(second, Order.OrderStatus.CONFIRMED)
+
+        cancelled = self.order((self.lassi, 3))
+        self.set_status(cancelled, Order.OrderStatus.CONFIRMED)
+        self.set_status(cancelled, Order.OrderStatus.CANCELLED)
+
+        self.order((self.lassi, 1)).delete()
+        self.order((self.kulcha, 1))
+
+    def counters(self):
+        restaurant = RestaurantStats.objects.get(restaurant=self.restaurant)
+        platform = PlatformStats.objects.get(pk=stats.PLATFORM_PK)
+        return [
+            {field: getattr(row, field) for field in stats.COUNTER_FIELDS}
+            for row in (restaurant, platform)
+        ]
+
+    def rollup_rows(self, model, fields):
+        # signals leave emptied rows behind (e.g. a deleted cart's bucket); the recompute doesn't write them
+        amounts = fields[fields.index("source") + 1:]
+        return sorted(
+            tuple(row)
+            for row in model.objects.values_list(*fields)
+            if any(row[fields.index(f)] for f in amounts)
+        )
+
+    def test_counters_match_rollup(self):
+        self.order_history()
+        counted = self.counters()
+
+        stats.rollup()
+        self.assertEqual(counted, self.counters())
+        restaurant = counted[0]
+        self.assertEqual(restaurant["orders_total"], 4)
+        self.assertEqual(restaurant["orders_pending"], 1)
+        self.assertEqual(restaurant["orders_cancelled"], 1)
+        self.assertEqual(restaurant["gmv"], Decimal("420.00"))
+        self.assertEqual((restaurant["chatbot_orders"], restaurant["chatbot_conversions"]), (3, 1))
+
+    def test_analytics_rows_match_rollup_window(self):
+        self.order_history()
+        orders = self.rollup_rows(OrderRollup, ORDER_ROLLUP_FIELDS)
+        items = self.rollup_rows(ItemSalesRollup, ITEM_ROLLUP_FIELDS)
+
+        analytics.rollup_window(hours=1)
+        self.assertEqual(orders, self.rollup_rows(OrderRollup, ORDER_ROLLUP_FIELDS))
+        self.assertEqual(items, self.rollup_rows(ItemSalesRollup, ITEM_ROLLUP_FIELDS))
+
+    def test_owner_analytics_endpoints(self):
+        self.order_history()
+        client = APIClient()
+        client.force_authenticate(self.owner)
+
+        response = client.get("/super-admin/owner/api/analytics/popular-items/?days=7")
+        self.assertEqual(
+            [(row["name"], row["quantity"], row["revenue"]) for row in response.json()["results"]],
+            [("Amritsari Kulcha", 3, "360.00"), ("Sweet Lassi", 1, "60.00")],
+        )
+        response = client.get("/super-admin/owner/api/analytics/popular-items/?source=admin")
+        self.assertEqual([row["name"] for row in response.json()["results"]], ["Amritsari Kulcha"])
+
+        response = client.get("/super-admin/owner/api/analytics/revenue/?granularity=day&periods=3")
+        series = response.json()["results"]
+        self.assertEqual(len(series), 3)
+        self.assertEqual(series[-1], {**series[-1], "revenue": "420.00", "orders": 2, "carts": 4})
+        self.assertEqual(series[0]["revenue"], "0.00")
+
+        funnel = client.get("/super-admin/owner/api/analytics/funnel/?days=7").json()
+        self.assertEqual(
+            {k: funnel[k] for k in ("carts", "converted", "completed", "cancelled", "paid", "revenue")},
+            {"carts": 4, "converted": 2, "completed": 1, "cancelled": 1, "paid": 1, "revenue": "420.00"},
+        )
+        self.assertEqual(funnel["conversion_rate"], 0.5)
+        self.assertEqual(funnel["by_source"]["admin"]["converted"], 1)
 
-# Create your tests here.
+    def test_analytics_need_a_restaurant(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="guest", email="guest@example.com"))
+        self.assertEqual(client.get("/super-admin/owner/api/analytics/funnel/").status_code, 404)
@@ -7,7 +7,10 @@ from .views import (
     owner_menu_items_list,
     OwnerMenuItemViewSet,
     OwnerCategoryListAPIView, 
-    owner_menu_categories_list
+    owner_menu_categories_list,
+    OwnerPopularItemsAPIView,
+    OwnerRevenueAPIView,
+    OwnerFunnelAPIView,
 )
 
 app_name = "backoffice"
@@ -54,4 +57,10 @@ urlpatterns = [
         name="owner_menu_categories_list",
     ),
 
+    # ======================
+    # OWNER API (analytics)
+    # ======================
+    path("owner/api/analytics/popular-items/", OwnerPopularItemsAPIView.as_view(), name="owner_analytics_popular_items"),
+    path("owner/api/analytics/revenue/", OwnerRevenueAPIView.as_view(), name="owner_analytics_revenue"),
+    path("owner/api/analytics/funnel/", OwnerFunnelAPIView.as_view(), name="owner_analytics_funnel"),
 ]
\ No newline at end of file
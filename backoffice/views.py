@@ -1,23 +1,49 @@
 # backoffice/views.py
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.shortcuts import get_object_or_404, render
 from restaurants.models import Restaurant
-from accounts.models import User
-from orders.models import Order
+from restaurants.tenant import OwnerRestaurantMixin, request_restaurant, request_restaurant_id
 from rest_framework import permissions
 from menu.models import MenuItem
+from . import analytics
+from .models import Granularity
 from .serializers import MenuItemSerializer
+from .stats import platform_stats
 from rest_framework.response import Response
 from rest_framework import viewsets
 
 
 
 def super_admin_dashboard(request):
-    total_stores = Restaurant.objects.count()
-    total_users = User.objects.count()
-    total_orders = Order.objects.count()
-    stores = Restaurant.objects.all()
-    return render(request, "superadmin/dashboard.html",{"total_stores":total_stores,"total_users":total_users,"total_orders":total_orders,"stores":stores})
+    # counters: one precomputed row (backoffice/stats.py), no count() over orders
+    stats = platform_stats()
+
+    stores = Restaurant.objects.select_related("stats").order_by("-created_at")
+    q = (request.GET.get("q") or "").strip()
+    if q:
+        stores = stores.filter(name__icontains=q)
+    store_status = request.GET.get("status")
+    if store_status in ("active", "inactive"):
+        stores = stores.filter(is_active=(store_status == "active"))
+
+    page = Paginator(stores, settings.SUPERADMIN_STORES_PER_PAGE).get_page(request.GET.get("page"))
+    return render(
+        request,
+        "superadmin/dashboard.html",
+        {
+            "stats": stats,
+            "total_stores": stats.total_stores,
+            "total_users": stats.total_users,
+            "total_orders": stats.orders_total,
+            "stores": page.object_list,
+            "page_obj": page,
+            "q": q,
+            "status": store_status or "",
+        },
+    )
 
 
 # @login_required
@@ -33,19 +59,19 @@ def owner_menu_items_list(request):
     return render(request, "owner/menu_items_list.html", context)
 
 
-class OwnerMenuItemViewSet(viewsets.ModelViewSet):
+class OwnerMenuItemViewSet(OwnerRestaurantMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = MenuItemSerializer
 
-    def get_restaurant(self):
-        # never crash
-        return Restaurant.objects.filter(owner=self.request.user).first()
+    def get_restaurant_id(self):
+        # never crash; cached per owner (restaurants/tenant.py)
+        return self.owner_restaurant_id()
 
     def get_queryset(self):
-        restaurant = self.get_restaurant()
-        if not restaurant:
+        restaurant_id = self.get_restaurant_id()
+        if not restaurant_id:
             return MenuItem.objects.none()
-        qs = MenuItem.objects.filter(restaurant=restaurant)
+        qs = MenuItem.objects.filter(restaurant_id=restaurant_id)
 
         # optional filters
         active = self.request.query_params.get("active")  # "1" or "0"
@@ -61,10 +87,10 @@ class OwnerMenuItemViewSet(viewsets.ModelViewSet):
         return qs.order_by("name")
 
     def perform_create(self, serializer):
-        restaurant = self.get_restaurant()
-        if not restaurant:
+        restaurant_id = self.get_restaurant_id()
+        if not restaurant_id:
             raise permissions.PermissionDenied("Restaurant not found for this user.")
-        serializer.save(restaurant=restaurant)
+        serializer.save(restaurant_id=restaurant_id)
 
     # ✅ Soft delete instead of hard delete (recommended)
     def destroy(self, request, *args, **kwargs):
@@ -84,7 +110,7 @@ from menu.models import Category
 from .serializers import CategorySerializer
 
 def owner_menu_categories_list(request):
-    restaurant = Restaurant.objects.filter(owner=request.user).first()
+    restaurant = request_restaurant(request)
 
     return render(
         request,
@@ -105,11 +131,11 @@ class OwnerCategoryListAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
-        if not restaurant:
+        restaurant_id = request_restaurant_id(request)
+        if not restaurant_id:
             return Response({"results": []})
 
-        qs = Category.objects.filter(restaurant=restaurant,is_active=True)
+        qs = Category.objects.filter(restaurant_id=restaurant_id,is_active=True)
 
         # 🔍 search
         q = request.query_params.get("q")
@@ -131,5 +157,64 @@ class OwnerCategoryListAPIView(APIView):
         return Response({"results": serializer.data})
 
 
+# ------------------------------------------------------------
+# Owner analytics API (reads rollup rows only, see backoffice/analytics.py)
+# ------------------------------------------------------------
+def _int_param(request, name, default, low, high):
+    try:
+        value = int(request.query_params.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(low, min(value, high))
+
+
+class OwnerAnalyticsAPIView(APIView):
+    """
+    Base for the owner analytics endpoints: owner's restaurant,
+    superadmin can pass ?restaurant_id=. Optional ?source=chatbot|admin.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def restaurant_id(self, request):
+        rid = request.query_params.get("restaurant_id")
+        if rid and request.user.is_superadmin:
+            return get_object_or_404(Restaurant, pk=rid).pk
+        restaurant_id = request_restaurant_id(request)
+        if not restaurant_id:
+            raise Http404("No restaurant for this user.")
+        return restaurant_id
+
+    def source(self, request):
+        return request.query_params.get("source") or None
+
+
+class OwnerPopularItemsAPIView(OwnerAnalyticsAPIView):
+    """GET owner/api/analytics/popular-items/?days=30&limit=10"""
+
+    def get(self, request):
+        days = _int_param(request, "days", 30, 1, 366)
+        limit = _int_param(request, "limit", 10, 1, 100)
+        items = analytics.popular_items(self.restaurant_id(request), days, self.source(request), limit)
+        return Response({"days": days, "results": items})
+
+
+class OwnerRevenueAPIView(OwnerAnalyticsAPIView):
+    """GET owner/api/analytics/revenue/?granularity=day&periods=30 (hour: up to 168)"""
+
+    def get(self, request):
+        granularity = request.query_params.get("granularity", Granularity.DAY)
+        if granularity not in Granularity.values:
+            granularity = Granularity.DAY
+        limit = 168 if granularity == Granularity.HOUR else 366
+        periods = _int_param(request, "periods", 24 if granularity == Granularity.HOUR else 30, 1, limit)
+        series = analytics.revenue_series(self.restaurant_id(request), granularity, periods, self.source(request))
+        return Response({"granularity": granularity, "results": series})
+
+
+class OwnerFunnelAPIView(OwnerAnalyticsAPIView):
+    """GET owner/api/analytics/funnel/?days=30"""
 
-    
\ No newline at end of file
+    def get(self, request):
+        days = _int_param(request, "days", 30, 1, 366)
+        return Response(analytics.funnel(self.restaurant_id(request), days, self.source(request)))
@@ -1,16 +1,41 @@
+import asyncio
+import logging
 import pickle
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from groq import Groq
 import os
 from dotenv import load_dotenv
 import json
-import re
+
+from chatbot import prompt_budget
+from chatbot.response_cache import SemanticResponseCache, item_set, memoize_encoder
+from menu.search_index import MenuSearchIndex
+from menu.tasks import enrich_menu_items
+from restaurant_backend.llm import achat_completion, chat_completion, completion_text, stream_chat_completion
+from restaurant_backend.observability import log_event, span, traced
 
 # Load environment variables
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+logger = logging.getLogger(__name__)
+
+# one bot serves every visitor of a restaurant; the least recently active
+# conversations beyond this are dropped
+MAX_CONVERSATIONS = int(os.getenv("CHATBOT_MAX_CONVERSATIONS", "1000"))
+
+
+class Conversation:
+    """One visitor's turns and the numbered list they may be picking from."""
+
+    def __init__(self):
+        self.history = []
+        self.awaiting_selection = False
+        self.current_search_results = []
+
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY not found. Add it to your .env file.")
 
@@ -24,104 +49,108 @@ class MenuChatbot:
             embeddings_path: Path to the pickle file containing embeddings
             model_name: Sentence transformer model for encoding queries
         """
-        print("Loading menu embeddings...")
         with open(embeddings_path, 'rb') as f:
             data = pickle.load(f)
             self.embeddings = data['embeddings']
             self.metadata = data['metadata']
         
-        print(f"Loaded {len(self.embeddings)} menu items")
+        # embeddings + BM25 keyword index (hybrid search)
+        # (compact float16/int8 files re-rank from their float32 sidecar)
+        self.index = MenuSearchIndex.from_payload(data, path=embeddings_path)
         
-        print(f"Loading embedding model on CPU: {model_name}")
+        log_event(logger, "menu_chatbot_loading", path=str(embeddings_path), items=len(self.embeddings), model=model_name)
         self.encoder = SentenceTransformer(model_name, device="cpu")
+        # same query text → one encode (search + reply cache); cache hits skip the "encode" span
+        self.encode = memoize_encoder(traced("encode", self.encoder.encode))
         
-        print("Initializing Groq client...")
-        self.groq_client = Groq(api_key=GROQ_API_KEY)
+        # Near-identical questions over the same items reuse the answer.
+        # One bot per index version, so a new menu version starts with an empty cache.
+        self.response_cache = SemanticResponseCache(source="menu_chat")
         
-        # Conversation history
-        self.conversation_history = []
+        # items without calories already handed to the offline enrichment
+        self.calories_queued = set()
+        # size of the last prompt sent (see prompt_budget.py), for logging
+        self.last_prompt = {}
         
-        # State management for interactions
-        self.awaiting_selection = False
-        self.current_search_results = []
-        self.interaction_context = {}
+        # Conversation history + selection state, per session (None: the CLI's one conversation)
+        self.conversations = OrderedDict()
+        self.conversations_lock = threading.Lock()
         
-        print("Chatbot ready!\n")
+        log_event(logger, "menu_chatbot_ready", path=str(embeddings_path))
     
     def cosine_similarity(self, a, b):
         """Calculate cosine similarity between two vectors."""
         return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
     
-    def search_menu(self, query, top_k=5):
+    def search_menu(self, query, top_k=5, mode="hybrid"):
         """
         Search for relevant menu items based on query.
         
         Args:
             query: User's search query
             top_k: Number of top results to return
+            mode: "hybrid" (BM25 + embeddings, lexical fast path), "semantic" or "lexical"
         
         Returns:
             List of relevant menu items with metadata
         """
-        # Encode the query
-        query_embedding = self.encoder.encode(query)
-        
-        # Calculate similarities
-        similarities = []
-        for idx, embedding in enumerate(self.embeddings):
-            sim = self.cosine_similarity(query_embedding, embedding)
-            similarities.append((idx, sim))
-        
-        # Sort by similarity (highest first)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        # Price / category / diet / availability constraints become a row mask
+        # applied before top-k, so "veg starters under 200" only ranks matching rows.
+        filters, text = self.index.parse_query(query)
+
+        # Exact dish names ("Paneer 65") are answered from the keyword index
+        # without encoding the query; everything else is fused with cosine ranks.
+        with span("vector_search", source="menu_chat"):
+            hits = self.index.search(text or query, self.encode, top_k=top_k, mode=mode, filters=filters)
         
-        # Get top k results
         results = []
-        for idx, sim in similarities[:top_k]:
+        for hit in hits:
             results.append({
-                'metadata': self.metadata[idx],
-                'similarity': float(sim)
+                'metadata': self.metadata[hit['index']],
+                'similarity': hit['score'],
+                'match': hit['source'],
             })
         
         return results
     
-    def estimate_calories(self, item_name, category=None, description=None):
+    def item_description(self, meta):
+        """Description (or ingredients) of a search result, for display/estimation."""
+        orig = meta.get('original_data') or {}
+        if orig.get('description'):
+            return orig['description']
+        if orig.get('ingredients'):
+            return orig['ingredients'] if isinstance(orig['ingredients'], str) else ', '.join(orig['ingredients'])
+        return ""
+    
+    def lookup_calories(self, metas):
         """
-        Estimate calories for a menu item using AI.
+        Calories for several search results.
         
-        Args:
-            item_name: Name of the item
-            category: Category of the item
-            description: Description/ingredients
+        Precomputed when the menu is enriched (original_data['calories'], see
+        menu/enrichment.py); never estimated here. Items without one show "~N/A"
+        and are queued once per process for the offline enrichment task.
         
         Returns:
-            Estimated calorie information as string
+            List of calorie strings, same order as `metas`
         """
-        try:
-            prompt = f"""Estimate the approximate calories for this menu item. Be brief and realistic.
-
-Item: {item_name}
-{f"Category: {category}" if category else ""}
-{f"Details: {description}" if description else ""}
-
-Provide ONLY a brief calorie estimate in this format: "~X-Y kcal" or "~X kcal" (where X and Y are numbers).
-Be concise - just the calorie range, nothing else."""
-
-            completion = self.groq_client.chat.completions.create(
-                model="meta-llama/llama-4-maverick-17b-128e-instruct",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=50
-            )
-            
-            calorie_info = completion.choices[0].message.content.strip()
-            # Clean up the response to ensure it's just the calorie info
-            calorie_info = re.sub(r'^[^0-9~]*', '', calorie_info)
-            calorie_info = calorie_info.split('\n')[0].strip()
-            return calorie_info if calorie_info else "~N/A"
-        
-        except Exception as e:
-            return "~N/A"
+        calories = []
+        missing = []
+        for meta in metas:
+            orig = meta.get('original_data') or {}
+            calories.append(orig.get('calories') or "~N/A")
+            item_id = orig.get('menu_item_id')
+            if not orig.get('calories') and item_id and item_id not in self.calories_queued:
+                missing.append(item_id)
+        
+        if missing:
+            self.calories_queued.update(missing)
+            try:
+                enrich_menu_items.delay(missing)
+            except Exception as e:
+                # broker down: the reply still goes out, the next index build retries
+                log_event(logger, "calories_enqueue_failed", logging.WARNING, items=len(missing), error=str(e))
+        
+        return calories
     
     def format_menu_list(self, search_results, include_calories=True):
         """
@@ -137,27 +166,20 @@ Be concise - just the calorie range, nothing else."""
         menu_list = ["\n📋 MENU OPTIONS:"]
         menu_list.append("=" * 70)
         
+        # Precomputed calories; missing ones are queued for offline enrichment
+        all_calories = []
+        if include_calories:
+            all_calories = self.lookup_calories([r['metadata'] for r in search_results])
+        
         for idx, result in enumerate(search_results, 1):
             meta = result['metadata']
             name = meta.get('name', 'Unknown Item')
             category = meta.get('category', '')
             price = meta.get('price', 'N/A')
             
-            # Get description for calorie estimation
-            description = ""
-            if meta.get('original_data'):
-                orig = meta['original_data']
-                if orig.get('description'):
-                    description = orig['description']
-                elif orig.get('ingredients'):
-                    ing = orig['ingredients'] if isinstance(orig['ingredients'], str) else ', '.join(orig['ingredients'])
-                    description = ing
-            
-            # Estimate calories
             calories = ""
             if include_calories:
-                calories = self.estimate_calories(name, category, description)
-                calories = f" | {calories}"
+                calories = f" | {all_calories[idx - 1]}"
             
             # Format the line
             line = f"{idx}. {name}"
@@ -209,47 +231,26 @@ Be concise - just the calorie range, nothing else."""
                 dietary = orig['dietary_info'] if isinstance(orig['dietary_info'], str) else ', '.join(orig['dietary_info'])
                 details.append(f"🥗 Dietary Info: {dietary}")
         
-        # Add calorie estimate
-        calories = self.estimate_calories(meta.get('name', ''), meta.get('category', ''), description)
+        # Add calorie estimate (precomputed by the enrichment task)
+        calories = self.lookup_calories([meta])[0]
         details.append(f"🔥 Estimated Calories: {calories}")
         
         details.append("=" * 70)
         
         return '\n'.join(details)
     
-    def format_context(self, search_results):
-        """Format search results into context for the LLM."""
-        context_parts = []
-        
-        for idx, result in enumerate(search_results, 1):
-            meta = result['metadata']
-            item_info = []
-            
-            if meta.get('name'):
-                item_info.append(f"Item {idx}: {meta['name']}")
-            if meta.get('category'):
-                item_info.append(f"Category: {meta['category']}")
-            if meta.get('price'):
-                item_info.append(f"Price: {meta['price']}")
-            
-            # Include original data if available
-            if meta.get('original_data'):
-                orig = meta['original_data']
-                if orig.get('description'):
-                    item_info.append(f"Description: {orig['description']}")
-                if orig.get('ingredients'):
-                    ing = orig['ingredients'] if isinstance(orig['ingredients'], str) else ', '.join(orig['ingredients'])
-                    item_info.append(f"Ingredients: {ing}")
-                if orig.get('allergens'):
-                    allergens = orig['allergens'] if isinstance(orig['allergens'], str) else ', '.join(orig['allergens'])
-                    item_info.append(f"Allergens: {allergens}")
-                if orig.get('dietary_info'):
-                    dietary = orig['dietary_info'] if isinstance(orig['dietary_info'], str) else ', '.join(orig['dietary_info'])
-                    item_info.append(f"Dietary: {dietary}")
-            
-            context_parts.append('\n'.join(item_info))
-        
-        return '\n\n'.join(context_parts)
+    def format_context(self, search_results, user_query=""):
+        """
+        Format search results into context for the LLM.
+        Only the original_data fields the question needs, capped at the context budget.
+        """
+        fields, full_description = prompt_budget.context_fields(user_query)
+        blocks = [
+            prompt_budget.context_block(result['metadata'], idx, fields, full_description)
+            for idx, result in enumerate(search_results, 1)
+        ]
+        blocks = prompt_budget.fit_context(blocks, prompt_budget.budget("CHATBOT_CONTEXT_TOKEN_BUDGET"))
+        return '\n\n'.join(blocks)
     
     def check_needs_clarification(self, user_query, search_results):
         """
@@ -269,18 +270,17 @@ Be concise - just the calorie range, nothing else."""
         
         return False, None
     
-    def generate_response(self, user_query, context, show_menu_list=False):
-        """
-        Generate conversational response using Groq API.
-        
-        Args:
-            user_query: User's question
-            context: Retrieved menu items context
-            show_menu_list: Whether to show menu as a list first
-        
-        Returns:
-            AI response string
-        """
+    def conversation(self, session_id=None):
+        """This session's Conversation (created on first use)."""
+        with self.conversations_lock:
+            convo = self.conversations.pop(session_id, None) or Conversation()
+            self.conversations[session_id] = convo
+            while len(self.conversations) > MAX_CONVERSATIONS:
+                self.conversations.popitem(last=False)
+            return convo
+    
+    def build_messages(self, user_query, context, session_id=None):
+        """System prompt + recent history + current question with menu context."""
         # Build conversation with history
         messages = [
             {
@@ -300,10 +300,6 @@ IMPORTANT RULES:
             }
         ]
         
-        # Add conversation history (last 6 messages for context)
-        for msg in self.conversation_history[-6:]:
-            messages.append(msg)
-        
         # Add current query with context
         user_content = f"""Customer question: {user_query}
 
@@ -311,107 +307,289 @@ Available menu items:
 {context}
 
 Please answer the customer's question. If there are multiple options and the customer hasn't specified which one, encourage them to select by number."""
-        
-        messages.append({
+        current = {
             "role": "user",
             "content": user_content
-        })
+        }
+        
+        # Conversation history gets whatever the budget leaves (compacted, old turns summarized)
+        remaining = prompt_budget.budget("CHATBOT_PROMPT_TOKEN_BUDGET") - prompt_budget.count_message_tokens(messages + [current])
+        history = prompt_budget.fit_history(self.conversation(session_id).history, max(remaining, 0))
+        messages.extend(history)
+        messages.append(current)
+        
+        self.last_prompt = {
+            "est_tokens": prompt_budget.count_message_tokens(messages),
+            "history_messages": len(history),
+            "context_items": sum(1 for line in context.splitlines() if line.startswith("Item ")),
+        }
+        return messages
+    
+    def log_turn(self, started, completion=None):
+        """chat_prompt log line: estimated vs real prompt tokens and LLM latency for this turn."""
+        usage = getattr(completion, "usage", None)
+        log_event(
+            logger,
+            "chat_prompt",
+            est_tokens=self.last_prompt.get("est_tokens"),
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            history_messages=self.last_prompt.get("history_messages"),
+            context_items=self.last_prompt.get("context_items"),
+            latency_ms=round((time.perf_counter() - started) * 1000),
+        )
+    
+    def reply_cache_key(self, user_query, search_results):
+        """(query embedding, retrieval key) for the semantic reply cache."""
+        fields, full_description = prompt_budget.context_fields(user_query)
+        items = (item_set(r['metadata'] for r in search_results), frozenset(fields), full_description)
+        return self.encode(user_query), items
+    
+    def cached_reply(self, user_query, search_results, session_id=None):
+        """
+        (cached reply or None, cache key to store a fresh reply under).
+        Only for a session's first turn: later prompts carry its earlier turns
+        ("is it spicy?"), which the key does not cover.
+        """
+        if not search_results or self.conversation(session_id).history:
+            return None, None
+        cache_key = self.reply_cache_key(user_query, search_results)
+        return self.response_cache.lookup(*cache_key), cache_key
+    
+    def generate_response(self, user_query, context, show_menu_list=False, cache_key=None, session_id=None):
+        """
+        Generate conversational response using Groq API.
+        
+        Args:
+            user_query: User's question
+            context: Retrieved menu items context
+            show_menu_list: Whether to show menu as a list first
+            cache_key: from cached_reply(); a successful reply is stored under it
+            session_id: whose conversation history goes into the prompt
+        
+        Returns:
+            AI response string
+        """
+        messages = self.build_messages(user_query, context, session_id)
+        started = time.perf_counter()
         
         try:
-            completion = self.groq_client.chat.completions.create(
+            # shared pooled client (restaurant_backend/llm.py)
+            completion = chat_completion(
                 model="meta-llama/llama-4-maverick-17b-128e-instruct",
                 messages=messages,
                 temperature=0.7,
                 max_tokens=1024
             )
+            self.log_turn(started, completion)
             
-            response = completion.choices[0].message.content.strip()
+            response = completion_text(completion)
+            if cache_key:
+                self.response_cache.store(*cache_key, response)
             
             return response
         
         except Exception as e:
             return f"I'm sorry, I encountered an error: {str(e)}"
     
-    def chat(self, user_query):
-        """
-        Main chat function - handles user query and returns response.
+    async def agenerate_response(self, user_query, context, cache_key=None, session_id=None):
+        """Async generate_response(): awaits the LLM instead of blocking a thread."""
+        messages = self.build_messages(user_query, context, session_id)
+        started = time.perf_counter()
+        try:
+            completion = await achat_completion(
+                model="meta-llama/llama-4-maverick-17b-128e-instruct",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1024
+            )
+            self.log_turn(started, completion)
+            response = completion_text(completion)
+            if cache_key:
+                self.response_cache.store(*cache_key, response)
+            return response
         
-        Args:
-            user_query: User's question/message
+        except Exception as e:
+            return f"I'm sorry, I encountered an error: {str(e)}"
+    
+    def handle_selection(self, user_query, session_id=None):
+        """Reply for a numeric selection while a list is shown, else None."""
+        convo = self.conversation(session_id)
+        if not (convo.awaiting_selection and user_query.strip().isdigit()):
+            return None
         
-        Returns:
-            AI response
-        """
-        # Check if user is responding with a number (selection)
-        if self.awaiting_selection and user_query.strip().isdigit():
-            selection = int(user_query.strip())
-            
-            if 1 <= selection <= len(self.current_search_results):
-                selected_item = self.current_search_results[selection - 1]
-                
-                # Show detailed information
-                details = self.format_item_details(selected_item, selection)
-                
-                # Update conversation history
-                self.conversation_history.append({
-                    "role": "user",
-                    "content": f"Tell me more about item #{selection}"
-                })
-                self.conversation_history.append({
-                    "role": "assistant",
-                    "content": details
-                })
-                
-                # Reset selection state
-                self.awaiting_selection = False
-                self.current_search_results = []
-                
-                return details + "\n\nWould you like to know anything else about this item or explore other options?"
-            else:
-                return f"Please enter a number between 1 and {len(self.current_search_results)}."
+        selection = int(user_query.strip())
         
+        if 1 <= selection <= len(convo.current_search_results):
+            selected_item = convo.current_search_results[selection - 1]
+            
+            # Show detailed information
+            details = self.format_item_details(selected_item, selection)
+            
+            # Update conversation history
+            convo.history.append({
+                "role": "user",
+                "content": f"Tell me more about item #{selection}"
+            })
+            convo.history.append({
+                "role": "assistant",
+                "content": details
+            })
+            
+            # Reset selection state
+            convo.awaiting_selection = False
+            convo.current_search_results = []
+            
+            return details + "\n\nWould you like to know anything else about this item or explore other options?"
+        else:
+            return f"Please enter a number between 1 and {len(convo.current_search_results)}."
+    
+    def prepare_turn(self, user_query):
+        """Retrieval part of a turn: (search_results, show_list, context)."""
         # Search for relevant menu items
         search_results = self.search_menu(user_query, top_k=5)
         
         # Check if we need clarification
         needs_clarification, clarification_type = self.check_needs_clarification(user_query, search_results)
+        show_list = len(search_results) > 1 and needs_clarification
         
         # Format context for LLM
-        context = self.format_context(search_results)
-        
-        # Generate conversational response
-        response = self.generate_response(user_query, context, needs_clarification)
-        
-        # If multiple relevant items, show menu list
-        if len(search_results) > 1 and needs_clarification:
-            menu_list = self.format_menu_list(search_results)
-            full_response = f"{response}\n{menu_list}\n\n💬 Reply with a number (1-{len(search_results)}) to learn more about that item!"
-            
-            # Set state to await selection
-            self.awaiting_selection = True
-            self.current_search_results = search_results
-        else:
-            full_response = response
-        
+        context = self.format_context(search_results, user_query)
+        return search_results, show_list, context
+    
+    def menu_list_suffix(self, search_results, session_id=None):
+        """Numbered selection list appended after the answer; also arms selection state."""
+        menu_list = self.format_menu_list(search_results)
+        
+        # Set state to await selection
+        convo = self.conversation(session_id)
+        convo.awaiting_selection = True
+        convo.current_search_results = search_results
+        return f"\n{menu_list}\n\n💬 Reply with a number (1-{len(search_results)}) to learn more about that item!"
+    
+    def remember_turn(self, user_query, full_response, session_id=None):
         # Update conversation history
-        self.conversation_history.append({
+        history = self.conversation(session_id).history
+        history.append({
             "role": "user",
             "content": user_query
         })
-        self.conversation_history.append({
+        history.append({
             "role": "assistant",
             "content": full_response
         })
+    
+    def chat(self, user_query, session_id=None):
+        """
+        Main chat function - handles user query and returns response.
+        
+        Args:
+            user_query: User's question/message
+            session_id: visitor whose conversation this turn continues
+        
+        Returns:
+            AI response
+        """
+        # Check if user is responding with a number (selection)
+        selection_reply = self.handle_selection(user_query, session_id)
+        if selection_reply is not None:
+            return selection_reply
+        
+        search_results, show_list, context = self.prepare_turn(user_query)
+        
+        # Generate conversational response (or reuse one for a near-identical question)
+        full_response, cache_key = self.cached_reply(user_query, search_results, session_id)
+        if full_response is None:
+            full_response = self.generate_response(
+                user_query, context, show_list, cache_key=cache_key, session_id=session_id
+            )
+        
+        # If multiple relevant items, show menu list
+        if show_list:
+            full_response += self.menu_list_suffix(search_results, session_id)
+        
+        self.remember_turn(user_query, full_response, session_id)
+        return full_response
+    
+    async def achat(self, user_query, session_id=None):
+        """
+        Async chat() for ASGI views. Encoding/scoring and the menu list
+        (CPU / sync cache and broker calls) run in worker threads; the answer is awaited.
+        """
+        selection_reply = await asyncio.to_thread(self.handle_selection, user_query, session_id)
+        if selection_reply is not None:
+            return selection_reply
+        
+        search_results, show_list, context = await asyncio.to_thread(self.prepare_turn, user_query)
+        
+        full_response, cache_key = await asyncio.to_thread(self.cached_reply, user_query, search_results, session_id)
+        if full_response is None:
+            full_response = await self.agenerate_response(user_query, context, cache_key=cache_key, session_id=session_id)
         
+        if show_list:
+            full_response += await asyncio.to_thread(self.menu_list_suffix, search_results, session_id)
+        
+        self.remember_turn(user_query, full_response, session_id)
         return full_response
     
-    def reset_conversation(self):
+    def chat_stream(self, user_query, session_id=None):
+        """
+        Streaming version of chat().
+        
+        Yields (event, text) tuples:
+            ("delta", "...")      answer tokens as they arrive from the LLM
+            ("menu_list", "...")  numbered selection list, once the answer is complete
+        """
+        selection_reply = self.handle_selection(user_query, session_id)
+        if selection_reply is not None:
+            yield "delta", selection_reply
+            return
+        
+        search_results, show_list, context = self.prepare_turn(user_query)
+        
+        cached, cache_key = self.cached_reply(user_query, search_results, session_id)
+        if cached is not None:
+            yield "delta", cached
+            full_response = cached
+        else:
+            full_response = yield from self._stream_answer(user_query, context, cache_key, session_id)
+        
+        if show_list:
+            suffix = self.menu_list_suffix(search_results, session_id)
+            full_response += suffix
+            yield "menu_list", suffix
+        
+        self.remember_turn(user_query, full_response, session_id)
+    
+    def _stream_answer(self, user_query, context, cache_key, session_id=None):
+        """Yield LLM deltas; returns the full answer (stored in the reply cache if it completed)."""
+        parts = []
+        messages = self.build_messages(user_query, context, session_id)
+        started = time.perf_counter()
+        try:
+            for delta in stream_chat_completion(
+                model="meta-llama/llama-4-maverick-17b-128e-instruct",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1024,
+            ):
+                parts.append(delta)
+                yield "delta", delta
+        except Exception as e:
+            error = f"I'm sorry, I encountered an error: {str(e)}"
+            yield "delta", error
+            return "".join(parts).strip() + error
+        self.log_turn(started)
+        
+        response = "".join(parts).strip()
+        if cache_key:
+            self.response_cache.store(*cache_key, response)
+        return response
+    
+    def reset_conversation(self, session_id=None):
         """Clear conversation history."""
-        self.conversation_history = []
-        self.awaiting_selection = False
-        self.current_search_results = []
-        self.interaction_context = {}
-        print("Conversation history cleared.")
+        with self.conversations_lock:
+            self.conversations.pop(session_id, None)
+        log_event(logger, "conversation_reset")
 
 
 def main():
@@ -458,6 +636,7 @@ def main():
             
             if user_input.lower() == 'reset':
                 chatbot.reset_conversation()
+                print("Conversation history cleared.")
                 continue
             
             # Get response
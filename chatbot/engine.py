@@ -1,18 +1,27 @@
 # engine.py  (FULL AI ENGINE — RAG + LLM — trimmed to ChatbotResult requirements)
  
+import asyncio
+import logging
 import os
 import json
 import numpy as np
 import re
+import threading
 from dataclasses import dataclass
 from typing import Optional, List, Dict
 from pathlib import Path
 from dotenv import load_dotenv
-from groq import Groq
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
 import pickle
+
+from chatbot.response_cache import for_index as response_cache_for, memoize_encoder
+from menu.search_index import MenuSearchIndex, load_exact_rows
+from restaurant_backend.llm import achat_completion, chat_completion, completion_text, is_configured as llm_configured
+from restaurant_backend.observability import log_event, span, traced
  
 load_dotenv()
+
+logger = logging.getLogger(__name__)
  
 # ============================================================
 # CONFIG
@@ -20,7 +29,8 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
  
-EMBEDDINGS_PATH = Path("media/embeddings/restaurant_1_menu_embeddings.pkl")
+ENGINE_RESTAURANT_ID = 1
+EMBEDDINGS_PATH = Path("media/embeddings/restaurant_1_menu_embeddings.pkl")  # legacy / standalone fallback
 CHUNKS_PATH = Path("text_chunks.json")
  
 # ============================================================
@@ -29,9 +39,15 @@ CHUNKS_PATH = Path("text_chunks.json")
 _embed_model = None
 _embeddings = None
 _text_chunks = None
-_groq_client = None
-_emb_last_mtime = None
+# stored with the embeddings: filter columns (menu/filters.py), compact format + exact rows (menu/quantize.py)
+_index_extras = {}
+_search_index = None
+_query_encoder = None
+_search_index_source = (None, None)
+_emb_version = None
 _chunks_last_mtime = None
+# async views load from worker threads: only one of them should read the model/files
+_load_lock = threading.Lock()
  
 # Common typo corrections
 COMMON_TYPO_MAP = {
@@ -54,30 +70,60 @@ class ChatbotResult:
 # ============================================================
 # RAG SYSTEM LOADER
 # ============================================================
+def _current_embeddings_file():
+    """
+    (path, version) of the published index (manifest, see menu/index_store.py).
+    Standalone runs without Django fall back to EMBEDDINGS_PATH + mtime.
+    """
+    from django.conf import settings
+
+    if settings.configured:
+        from menu.index_store import current_index
+
+        current = current_index(ENGINE_RESTAURANT_ID)
+        if current:
+            return Path(current[0]), current[1]
+
+    if EMBEDDINGS_PATH.exists():
+        return EMBEDDINGS_PATH, f"legacy-{EMBEDDINGS_PATH.stat().st_mtime}"
+    return None, None
+
+
 def load_rag_system():
-    global _embed_model, _embeddings, _text_chunks, _groq_client
-    global _emb_last_mtime, _chunks_last_mtime
+    global _embed_model, _embeddings, _text_chunks, _index_extras
+    global _emb_version, _chunks_last_mtime
 
     # Agar sab pehle se loaded hai to dobara mat load karo
     if _embed_model and _embeddings is not None and _text_chunks is not None:
         return
 
-    print("[RAG] Loading embedding model...")
+    with _load_lock:
+        if _embed_model and _embeddings is not None and _text_chunks is not None:
+            return
+        _load_rag_system_locked()
+
+
+def _load_rag_system_locked():
+    global _embed_model, _embeddings, _text_chunks, _index_extras
+    global _emb_version, _chunks_last_mtime
+
+    log_event(logger, "rag_loading", model=MODEL_NAME)
 
     # 1) SentenceTransformer model
     if _embed_model is None:
         _embed_model = SentenceTransformer(MODEL_NAME)
 
     # 2) Embeddings file load karo
-    if not EMBEDDINGS_PATH.exists():
+    embeddings_path, version = _current_embeddings_file()
+    if embeddings_path is None:
         raise FileNotFoundError(f"Embeddings not found: {EMBEDDINGS_PATH}")
 
     # Raw data read (pkl ya npy / npz)
-    if EMBEDDINGS_PATH.suffix == ".pkl":
-        with open(EMBEDDINGS_PATH, "rb") as f:
+    if embeddings_path.suffix == ".pkl":
+        with open(embeddings_path, "rb") as f:
             data = pickle.load(f)
     else:
-        data = np.load(EMBEDDINGS_PATH, allow_pickle=True)
+        data = np.load(embeddings_path, allow_pickle=True)
 
     # Agar dict hai, to usme se embeddings (aur texts) nikalo
     if isinstance(data, dict):
@@ -88,6 +134,7 @@ def load_rag_system():
             )
 
         emb_array = data["embeddings"]
+        _index_extras = _extras_from_payload(data, embeddings_path)
 
         # Agar texts/chunks bhi isi file me stored hain:
         if _text_chunks is None:
@@ -98,11 +145,12 @@ def load_rag_system():
     else:
         # Direct array case
         emb_array = data
+        _index_extras = {}
 
-    # Final numpy array
-    _embeddings = np.asarray(emb_array, dtype="float32")
-    _emb_last_mtime = EMBEDDINGS_PATH.stat().st_mtime
-    print(f"[RAG] Embeddings loaded. Shape = {_embeddings.shape}")
+    # Final numpy array (compact float16/int8 matrices stay compact)
+    _embeddings = np.asarray(emb_array) if _index_extras.get("storage") else np.asarray(emb_array, dtype="float32")
+    _emb_version = version
+    log_event(logger, "rag_loaded", shape=list(_embeddings.shape), version=version)
 
     # 3) Agar abhi tak _text_chunks nahi aaye to JSON se loado
     if _text_chunks is None:
@@ -118,35 +166,30 @@ def load_rag_system():
         else:
             _chunks_last_mtime = None
 
-    # 4) Groq client
-    if _groq_client is None and GROQ_API_KEY:
-        _groq_client = Groq(api_key=GROQ_API_KEY)
-        print("[RAG] Groq client initialized")
+    # 4) LLM calls go through restaurant_backend.llm (shared pooled client)
 
  
 def ensure_latest_embeddings():
-    global _embeddings, _text_chunks, _emb_last_mtime, _chunks_last_mtime
+    global _embeddings, _text_chunks, _emb_version, _chunks_last_mtime, _index_extras
 
-    if not EMBEDDINGS_PATH.exists() or not CHUNKS_PATH.exists():
+    embeddings_path, current_version = _current_embeddings_file()
+    if embeddings_path is None:
         return
 
-    current_emb = EMBEDDINGS_PATH.stat().st_mtime
-    current_chunks = CHUNKS_PATH.stat().st_mtime
-
-    if _emb_last_mtime is None or _chunks_last_mtime is None:
-        _emb_last_mtime = current_emb
-        _chunks_last_mtime = current_chunks
+    if _emb_version is None:
+        _emb_version = current_version
         return
 
     # ---------- Embeddings reload ----------
-    if current_emb != _emb_last_mtime:
-        print("[RAG] Reloading NEW embeddings...")
+    # published files are immutable → a new version is always complete
+    if current_version != _emb_version:
+        log_event(logger, "rag_reload_embeddings", old_version=_emb_version, version=current_version)
 
-        if EMBEDDINGS_PATH.suffix == ".pkl":
-            with open(EMBEDDINGS_PATH, "rb") as f:
+        if embeddings_path.suffix == ".pkl":
+            with open(embeddings_path, "rb") as f:
                 data = pickle.load(f)
         else:
-            data = np.load(EMBEDDINGS_PATH, allow_pickle=True)
+            data = np.load(embeddings_path, allow_pickle=True)
 
         if isinstance(data, dict):
             if "embeddings" not in data:
@@ -155,6 +198,7 @@ def ensure_latest_embeddings():
                     f"Available keys: {list(data.keys())}"
                 )
             emb_array = data["embeddings"]
+            _index_extras = _extras_from_payload(data, embeddings_path)
 
             # Optional: texts bhi saath update karna ho to
             if "texts" in data:
@@ -163,16 +207,21 @@ def ensure_latest_embeddings():
                 _text_chunks = data["chunks"]
         else:
             emb_array = data
+            _index_extras = {}
 
-        _embeddings = np.asarray(emb_array, dtype="float32")
-        _emb_last_mtime = current_emb
+        _embeddings = np.asarray(emb_array) if _index_extras.get("storage") else np.asarray(emb_array, dtype="float32")
+        _emb_version = current_version
 
     # ---------- Chunks reload ----------
-    if current_chunks != _chunks_last_mtime:
-        print("[RAG] Reloading NEW text chunks...")
+    if not CHUNKS_PATH.exists():
+        return
+
+    current_chunks = CHUNKS_PATH.stat().st_mtime
+    if _chunks_last_mtime is not None and current_chunks != _chunks_last_mtime:
+        log_event(logger, "rag_reload_chunks", path=str(CHUNKS_PATH))
         with open(CHUNKS_PATH, "r") as f:
             _text_chunks = json.load(f)
-        _chunks_last_mtime = current_chunks
+    _chunks_last_mtime = current_chunks
 
  
 # ============================================================
@@ -192,21 +241,63 @@ def parse_chunk_text(chunk: str) -> Dict[str, str]:
     }
  
  
-def semantic_search(query: str, top_k: int = 5) -> List[Dict[str, any]]:
+def _extras_from_payload(data: dict, path) -> dict:
+    return {
+        # BM25 index pickled at build time; rebuilt from the chunks only for older files
+        "lexical": data.get("lexical"),
+        "columns": data.get("columns"),
+        "storage": data.get("embedding_format"),
+        "exact": load_exact_rows(data, path),
+    }
+
+
+def _get_search_index() -> MenuSearchIndex:
+    """Hybrid (BM25 + cosine) index over the currently loaded embeddings/chunks."""
+    global _search_index, _search_index_source
+
+    # rebuilt whenever ensure_latest_embeddings() swapped embeddings or chunks
+    # (BM25 build is a few ms for a menu, no model call)
+    if _search_index is None or _search_index_source[0] is not _embeddings or _search_index_source[1] is not _text_chunks:
+        _search_index = MenuSearchIndex(_embeddings, _text_chunks, **_index_extras)
+        _search_index_source = (_embeddings, _text_chunks)
+    return _search_index
+
+
+def _encode_query(text: str):
+    """Memoized query encoder: search and the reply cache share one encode."""
+    global _query_encoder
+    if _query_encoder is None:
+        # cache hits never reach the "encode" span
+        _query_encoder = memoize_encoder(traced("encode", lambda q: _embed_model.encode(q, convert_to_numpy=True)))
+    return _query_encoder(text)
+
+
+def semantic_search(query: str, top_k: int = 5, mode: str = "hybrid") -> List[Dict[str, any]]:
     ensure_latest_embeddings()
- 
-    q_emb = _embed_model.encode(query, convert_to_numpy=True)
-    scores = util.cos_sim(q_emb, _embeddings)[0]
-    top_indices = scores.argsort(descending=True)[:top_k].tolist()
+    index = _get_search_index()
+
+    # "veg starters under 200" → price/diet/category mask applied before top-k
+    filters, text = index.parse_query(query)
+    with span("vector_search", source="engine"):
+        hits = index.search(
+            text or query,
+            _encode_query,
+            top_k=top_k,
+            mode=mode,
+            filters=filters,
+        )
  
     results = []
-    for idx in top_indices:
+    for hit in hits:
+        idx = hit["index"]
         parsed = parse_chunk_text(_text_chunks[idx])
         results.append(
             {
+                "index": idx,
                 "text": _text_chunks[idx],
-                "score": float(scores[idx]),
-                "parsed": parsed
+                "score": hit["score"],
+                "parsed": parsed,
+                "match": hit["source"],
             }
         )
     return results
@@ -233,14 +324,10 @@ def normalize_term(term: str) -> str:
 # ============================================================
 # LLM INTENT CLASSIFICATION
 # ============================================================
-def classify_intent_with_llm(message: str) -> Dict[str, any]:
-    """
-    This is a trimmed version of chatbot.py classification,
-    but returns only fields we can use.
-    """
-    if not _groq_client:
-        load_rag_system()
- 
+INTENT_FALLBACK = {"intent": "HELP", "quantity": 1, "item_name": None}
+
+
+def _intent_request(message: str) -> dict:
     prompt = f"""
 You are a restaurant ordering assistant. Extract intent from the user's message.
  
@@ -255,39 +342,59 @@ Extract:
  
 Return ONLY JSON:
 """
+    return dict(
+        model="meta-llama/llama-4-maverick-17b-128e-instruct",
+        messages=[{"role": "user", "content": prompt + message}],
+        temperature=0.2,
+        max_tokens=200,
+        timeout=15,
+    )
+
+
+def _parse_intent(resp) -> Dict[str, any]:
+    raw = completion_text(resp)
  
-    try:
-        resp = _groq_client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",
-            messages=[{"role": "user", "content": prompt + message}],
-            temperature=0.2,
-            max_tokens=200
-        )
-        raw = resp.choices[0].message.content.strip()
+    if raw.startswith("```"):
+        raw = raw.strip("`").replace("json", "").strip()
  
-        if raw.startswith("```"):
-            raw = raw.strip("`").replace("json", "").strip()
+    data = json.loads(raw)
  
-        data = json.loads(raw)
+    if "intent" not in data:
+        data["intent"] = "HELP"
+    if "quantity" not in data:
+        data["quantity"] = 1
  
-        if "intent" not in data:
-            data["intent"] = "HELP"
-        if "quantity" not in data:
-            data["quantity"] = 1
+    return data
+
+
+def classify_intent_with_llm(message: str) -> Dict[str, any]:
+    """
+    This is a trimmed version of chatbot.py classification,
+    but returns only fields we can use.
+    """
+    if not llm_configured():
+        return dict(INTENT_FALLBACK)
  
-        return data
+    try:
+        return _parse_intent(chat_completion(**_intent_request(message)))
+    except Exception:
+        return dict(INTENT_FALLBACK)
+
+
+async def aclassify_intent_with_llm(message: str) -> Dict[str, any]:
+    if not llm_configured():
+        return dict(INTENT_FALLBACK)
  
+    try:
+        return _parse_intent(await achat_completion(**_intent_request(message)))
     except Exception:
-        return {"intent": "HELP", "quantity": 1, "item_name": None}
+        return dict(INTENT_FALLBACK)
  
  
 # ============================================================
 # CONVERSATIONAL RESPONSE
 # ============================================================
-def generate_conversational_reply(user_query: str, items: List[Dict[str, any]]) -> str:
-    if not _groq_client:
-        return "Here are some items I found."
- 
+def _reply_request(user_query: str, items: List[Dict[str, any]]) -> dict:
     context = "\n".join([f"- {it['text']}" for it in items])
  
     prompt = f"""
@@ -300,36 +407,73 @@ Relevant menu items:
  
 Give a helpful natural-language answer (2–4 sentences). Mention prices.
 """
+    return dict(
+        model="meta-llama/llama-4-maverick-17b-128e-instruct",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.6,
+        max_tokens=250,
+        timeout=20,
+    )
+
+
+def _reply_fallback(items: List[Dict[str, any]]) -> str:
+    names = [it["parsed"]["name"] for it in items]
+    return f"I found these items: {', '.join(names)}."
+
+
+def _reply_cache_key(user_query: str, items: List[Dict[str, any]]):
+    """(reply cache for the loaded index version, (query embedding, retrieved rows))."""
+    cache = response_cache_for(ENGINE_RESTAURANT_ID, _emb_version, source="engine")
+    return cache, (_encode_query(user_query), frozenset(it["index"] for it in items))
+
+
+def generate_conversational_reply(user_query: str, items: List[Dict[str, any]]) -> str:
+    if not llm_configured():
+        return "Here are some items I found."
+ 
+    # near-identical question over the same items → reuse the answer
+    cache, key = _reply_cache_key(user_query, items)
+    cached = cache.lookup(*key)
+    if cached is not None:
+        return cached
  
     try:
-        resp = _groq_client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.6,
-            max_tokens=250
-        )
-        return resp.choices[0].message.content.strip()
+        reply = completion_text(chat_completion(**_reply_request(user_query, items)))
+    except Exception:
+        return _reply_fallback(items)
+    cache.store(*key, reply)
+    return reply
+
+
+async def agenerate_conversational_reply(user_query: str, items: List[Dict[str, any]]) -> str:
+    if not llm_configured():
+        return "Here are some items I found."
  
+    cache, key = await asyncio.to_thread(_reply_cache_key, user_query, items)
+    cached = cache.lookup(*key)
+    if cached is not None:
+        return cached
+ 
+    try:
+        reply = completion_text(await achat_completion(**_reply_request(user_query, items)))
     except Exception:
-        names = [it["parsed"]["name"] for it in items]
-        return f"I found these items: {', '.join(names)}."
+        return _reply_fallback(items)
+    cache.store(*key, reply)
+    return reply
  
  
 # ============================================================
 # MAIN ENTRYPOINT: parse_message()
 # ============================================================
-def parse_message(message: str) -> ChatbotResult:
-    text = (message or "").strip()
-    if not text:
-        return ChatbotResult(
-            intent="HELP",
-            reply="Try something like 'menu', 'add butter naan', or 'show cart'."
-        )
- 
-    load_rag_system()
- 
-    llm = classify_intent_with_llm(text)
- 
+EMPTY_MESSAGE_REPLY = "Try something like 'menu', 'add butter naan', or 'show cart'."
+HELP_REPLY = "I can help you browse the menu or place an order. Try 'menu' or 'add butter naan'."
+
+
+def _route_intent(llm: Dict[str, any]):
+    """
+    Intent JSON → ChatbotResult for everything that needs no search,
+    or the normalized search term (str) for SEARCH_ITEM.
+    """
     intent = llm.get("intent", "HELP")
     item_name_raw = llm.get("item_name")
     quantity = llm.get("quantity", 1)
@@ -364,34 +508,80 @@ def parse_message(message: str) -> ChatbotResult:
     # SEARCH (RAG)
     # -------------------------------
     if intent == "SEARCH_ITEM" and item_name_raw:
-        normalized = normalize_term(item_name_raw)
-        results = semantic_search(normalized, top_k=5)
- 
-        if not results:
-            return ChatbotResult(
-                intent="SEARCH_ITEM",
-                reply=f"Sorry, I couldn't find anything related to '{normalized}'."
-            )
+        return normalize_term(item_name_raw)
  
-        best_score = results[0]["score"]
-        if best_score < 0.35:
-            return ChatbotResult(
-                intent="SEARCH_ITEM",
-                reply=f"Sorry, '{normalized}' is not on our menu."
-            )
+    # -------------------------------
+    # HELP or fallback
+    # -------------------------------
+    return ChatbotResult(intent="HELP", reply=HELP_REPLY)
+
+
+def _search_miss(normalized: str, results: List[Dict[str, any]]) -> Optional[ChatbotResult]:
+    if not results:
+        return ChatbotResult(
+            intent="SEARCH_ITEM",
+            reply=f"Sorry, I couldn't find anything related to '{normalized}'."
+        )
  
-        conversational = generate_conversational_reply(text, results)
+    # lexical/hybrid: BM25 found the query words in an item, that is the signal.
+    # Their "score" is BM25 relative to the top hit / the fused item's cosine,
+    # so the cosine cutoff only judges purely semantic rankings.
+    best = results[0]
+    if best.get("match") == "semantic" and best["score"] < 0.35:
         return ChatbotResult(
             intent="SEARCH_ITEM",
-            reply=conversational
+            reply=f"Sorry, '{normalized}' is not on our menu."
         )
+    return None
+
+
+def parse_message(message: str) -> ChatbotResult:
+    text = (message or "").strip()
+    if not text:
+        return ChatbotResult(intent="HELP", reply=EMPTY_MESSAGE_REPLY)
+ 
+    load_rag_system()
+ 
+    routed = _route_intent(classify_intent_with_llm(text))
+    if isinstance(routed, ChatbotResult):
+        return routed
+ 
+    # SEARCH (RAG)
+    results = semantic_search(routed, top_k=5)
+    miss = _search_miss(routed, results)
+    if miss:
+        return miss
+ 
+    return ChatbotResult(
+        intent="SEARCH_ITEM",
+        reply=generate_conversational_reply(text, results)
+    )
+
+
+async def aparse_message(message: str) -> ChatbotResult:
+    """
+    Async parse_message(): the LLM calls are awaited (event loop stays free),
+    embedding load / query encoding / scoring run in a worker thread.
+    """
+    text = (message or "").strip()
+    if not text:
+        return ChatbotResult(intent="HELP", reply=EMPTY_MESSAGE_REPLY)
+ 
+    await asyncio.to_thread(load_rag_system)
+ 
+    routed = _route_intent(await aclassify_intent_with_llm(text))
+    if isinstance(routed, ChatbotResult):
+        return routed
+ 
+    # SEARCH (RAG)
+    results = await asyncio.to_thread(semantic_search, routed, 5)
+    miss = _search_miss(routed, results)
+    if miss:
+        return miss
  
-    # -------------------------------
-    # HELP or fallback
-    # -------------------------------
     return ChatbotResult(
-        intent="HELP",
-        reply="I can help you browse the menu or place an order. Try 'menu' or 'add butter naan'."
+        intent="SEARCH_ITEM",
+        reply=await agenerate_conversational_reply(text, results)
     )
     
     
\ No newline at end of file
@@ -0,0 +1,179 @@
+# chatbot/management/commands/benchmark_chat_db.py
+import statistics
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from accounts.models import User
+from chatbot.engine import ChatbotResult
+from chatbot.services import apply_intent
+from menu.embedding_context import suspend_embedding_signals
+from menu.models import MenuItem
+from menu.services import rebuild_menu_from_json
+from orders.models import Order
+from restaurants.models import Restaurant
+
+# one cart round per conversation: mutations + reads, no LLM
+TURNS = [
+    ("ADD_ITEM", "Benchmark Kulcha", 2),
+    ("SHOW_CART", None, 1),
+    ("ADD_ITEM", "Benchmark Lassi", 1),
+    ("REMOVE_ITEM", "Benchmark Kulcha", 1),
+    ("SHOW_MENU", None, 1),
+    ("CLEAR_CART", None, 1),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Chat cart turns per second against the configured database (SQLite file vs "
+        "DATABASE_URL=postgres://...), at several thread counts. Runs apply_intent() "
+        "directly, so the LLM is not part of the numbers. With --import-items, a menu "
+        "import (rebuild_menu_from_json) loops on a second restaurant meanwhile, and "
+        "--readers threads keep reading that menu. Creates and removes its own restaurants."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", default="1,4,8,16", help="Comma separated levels.")
+        parser.add_argument("--conversations", type=int, default=10, help="Per thread.")
+        parser.add_argument(
+            "--import-items", type=int, default=0, help="Items per concurrent menu import (0 = no import)."
+        )
+        parser.add_argument("--readers", type=int, default=0, help="Threads reading the imported menu.")
+
+    def handle(self, *args, **options):
+        restaurant, owner = self._setup()
+        imported = import_owner = None
+        if options["import_items"]:
+            # one restaurant per owner
+            import_owner = User.objects.create(username=f"{owner.username}_import", email=f"import_{owner.email}")
+            imported = Restaurant.objects.create(owner=import_owner, name=f"{restaurant.name} import")
+            self.import_items = [
+                {"name": f"Import Dish {i}", "price": str(100 + i % 50), "category": f"Category {i % 8}"}
+                for i in range(options["import_items"])
+            ]
+        try:
+            vendor = connection.vendor
+            mode = connection.settings_dict.get("OPTIONS", {}).get("init_command", "") if vendor == "sqlite" else ""
+            self.stdout.write(f"database={vendor} ({connection.settings_dict['NAME']}) turns/conversation={len(TURNS)}")
+            if mode:
+                self.stdout.write(f"init_command: {mode}")
+            if imported:
+                self.stdout.write(f"concurrent import: {options['import_items']} items, readers={options['readers']}")
+            self.stdout.write(
+                f"\n{'threads':>8}{'turns':>8}{'locked':>8}{'err':>6}{'turns/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+                + (f"{'imports':>9}{'import ms':>11}{'reads/s':>9}" if imported else "")
+            )
+            for threads in [int(t) for t in options["threads"].split(",") if t.strip()]:
+                self._level(restaurant, threads, options["conversations"], imported, options["readers"])
+        finally:
+            with suspend_embedding_signals():
+                if imported:
+                    imported.delete()
+                    import_owner.delete()
+                # carts a failed turn left behind (order items protect the menu items)
+                Order.objects.filter(restaurant=restaurant).delete()
+                restaurant.delete()
+            owner.delete()
+
+    def _setup(self):
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create(username=f"benchmark_{tag}", email=f"benchmark_{tag}@example.com")
+        restaurant = Restaurant.objects.create(owner=owner, name=f"Benchmark {tag}")
+        with suspend_embedding_signals():
+            for i, (name, price) in enumerate([("Benchmark Kulcha", "120"), ("Benchmark Lassi", "60")]):
+                MenuItem.objects.create(
+                    restaurant=restaurant, name=name, price=Decimal(price), external_item_id=f"bench-{i}"
+                )
+        return restaurant, owner
+
+    def _level(self, restaurant, threads, conversations, imported=None, readers=0):
+        latencies, counts = [], {"locked": 0, "errors": 0, "imports": 0, "import_s": 0.0, "reads": 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def importer():
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        with suspend_embedding_signals():
+                            rebuild_menu_from_json(imported, self.import_items)
+                    except OperationalError:
+                        continue
+                    with lock:
+                        counts["imports"] += 1
+                        counts["import_s"] += time.perf_counter() - start
+            finally:
+                connections.close_all()
+
+        def reader():
+            # the public menu query, uncached
+            try:
+                while not stop.is_set():
+                    try:
+                        list(MenuItem.objects.filter(restaurant=imported, is_active=True).values("id", "name", "price"))
+                    except OperationalError:
+                        continue
+                    with lock:
+                        counts["reads"] += 1
+            finally:
+                connections.close_all()
+
+        def worker(n):
+            try:
+                for c in range(conversations):
+                    session_id = f"bench_{threads}_{n}_{c}"
+                    for intent, item_name, quantity in TURNS:
+                        result = ChatbotResult(intent=intent, reply="", item_name=item_name, quantity=quantity)
+                        start = time.perf_counter()
+                        try:
+                            apply_intent(restaurant, session_id, result)
+                            elapsed = (time.perf_counter() - start) * 1000
+                            with lock:
+                                latencies.append(elapsed)
+                        except OperationalError as e:
+                            with lock:
+                                counts["locked" if "locked" in str(e) else "errors"] += 1
+                        except Exception as e:
+                            with lock:
+                                counts["errors"] += 1
+                                if counts["errors"] <= 3:
+                                    self.stderr.write(f"[benchmark] {type(e).__name__}: {e}")
+            finally:
+                connections.close_all()
+
+        background = []
+        if imported:
+            background = [threading.Thread(target=importer)]
+            background += [threading.Thread(target=reader) for _ in range(readers)]
+        for t in background:
+            t.start()
+
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        wall = time.perf_counter() - start
+        stop.set()
+        for t in background:
+            t.join()
+
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) >= 2 else p50
+        self.stdout.write(
+            f"{threads:>8}{len(latencies):>8}{counts['locked']:>8}{counts['errors']:>6}"
+            f"{len(latencies) / wall:>10.1f}{p50:>9.1f}{p95:>9.1f}"
+            + (
+                f"{counts['imports']:>9}{counts['import_s'] * 1000 / max(counts['imports'], 1):>11.0f}"
+                f"{counts['reads'] / wall:>9.0f}"
+                if imported
+                else ""
+            )
+        )
@@ -0,0 +1,168 @@
+# chatbot/management/commands/loadtest_chat.py
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+DEFAULT_MESSAGES = [
+    "what starters do you have?",
+    "anything spicy under 300?",
+    "suggest a dessert",
+    "do you have vegan options?",
+]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _PooledWSGIServer(WSGIServer):
+    """wsgiref server with a fixed worker pool: behaves like gunicorn --threads N."""
+
+    daemon_threads = True
+    pool = None
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent chat conversations at a chat endpoint and report throughput / latency "
+        "per concurrency level. Use --serve wsgi|asgi to run the app in-process (optionally with "
+        "a stub LLM of fixed latency) to compare thread-bound WSGI with the async views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurant-id", type=int, default=1)
+        parser.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+        parser.add_argument(
+            "--serve",
+            choices=["wsgi", "asgi"],
+            help="Run the project in-process instead of --url (wsgi: pooled threads, asgi: event loop).",
+        )
+        parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads for --serve wsgi.")
+        parser.add_argument("--path", default="/api/chatbot/chat/async/")
+        parser.add_argument("--concurrency", default="1,8,32,64", help="Comma separated levels.")
+        parser.add_argument("--turns", type=int, default=3, help="Messages per conversation.")
+        parser.add_argument("--message", action="append", help="Message to send (repeatable).")
+        parser.add_argument(
+            "--llm-latency",
+            type=float,
+            help="In-process only: answer LLM calls from a local stub after this many seconds.",
+        )
+        parser.add_argument("--timeout", type=float, default=120.0)
+
+    def handle(self, *args, **options):
+        if bool(options["url"]) == bool(options["serve"]):
+            raise CommandError("Pass exactly one of --url or --serve.")
+        if options["llm_latency"] is not None and not options["serve"]:
+            raise CommandError("--llm-latency needs --serve (a remote server uses its own LLM settings).")
+
+        levels = [int(c) for c in options["concurrency"].split(",") if c.strip()]
+        messages = options["message"] or DEFAULT_MESSAGES
+
+        if options["llm_latency"] is None:
+            self._run_target(options, levels, messages)
+            return
+
+        from restaurant_backend.llm_stub import StubLLMServer
+
+        reply = json.dumps({"intent": "SEARCH_ITEM", "item_name": "paneer", "quantity": 1})
+        with StubLLMServer(lambda request: reply, delay=options["llm_latency"]) as stub:
+            # slots must not be the bottleneck being measured
+            with override_settings(
+                LLM_BASE_URL=stub.url,
+                GROQ_API_KEY="loadtest",
+                LLM_MAX_CONCURRENCY=max(levels) * 2,
+                LLM_POOL_SIZE=max(levels) * 2,
+            ):
+                self._run_target(options, levels, messages)
+
+    def _run_target(self, options, levels, messages):
+        if options["serve"] == "wsgi":
+            from django.core.wsgi import get_wsgi_application
+
+            server = make_server(
+                "127.0.0.1", 0, get_wsgi_application(),
+                server_class=_PooledWSGIServer, handler_class=_QuietHandler,
+            )
+            server.pool = ThreadPoolExecutor(max_workers=options["threads"])
+            server.request_queue_size = 1024
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            target = f"in-process WSGI ({options['threads']} threads)"
+            try:
+                self._report(target, {"base_url": base_url}, options, levels, messages)
+            finally:
+                server.shutdown()
+                server.pool.shutdown(wait=False)
+        elif options["serve"] == "asgi":
+            from restaurant_backend.asgi import application
+
+            target = "in-process ASGI"
+            client_kwargs = {"transport": httpx.ASGITransport(app=application), "base_url": "http://localhost"}
+            self._report(target, client_kwargs, options, levels, messages)
+        else:
+            self._report(options["url"], {"base_url": options["url"].rstrip("/")}, options, levels, messages)
+
+    def _report(self, target, client_kwargs, options, levels, messages):
+        llm = f" llm_latency={options['llm_latency']}s" if options["llm_latency"] is not None else ""
+        self.stdout.write(f"target={target} path={options['path']} turns={options['turns']}{llm}\n")
+        self.stdout.write(f"{'conc':>6}{'ok':>7}{'err':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'wall s':>9}")
+        for concurrency in levels:
+            ok, errors, latencies, wall = asyncio.run(
+                self._level(client_kwargs, options, concurrency, messages)
+            )
+            p50 = statistics.median(latencies) if latencies else 0.0
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) >= 2 else p50
+            self.stdout.write(
+                f"{concurrency:>6}{ok:>7}{errors:>6}{ok / wall:>9.2f}{p50:>10.1f}{p95:>10.1f}{wall:>9.2f}"
+            )
+
+    async def _level(self, client_kwargs, options, concurrency, messages):
+        latencies, errors = [], 0
+
+        async def conversation(client, n):
+            nonlocal errors
+            session_id = f"loadtest_{concurrency}_{n}"
+            for turn in range(options["turns"]):
+                body = {
+                    "restaurant_id": options["restaurant_id"],
+                    "session_id": session_id,
+                    "message": messages[(n + turn) % len(messages)],
+                }
+                start = time.perf_counter()
+                try:
+                    r = await client.post(options["path"], json=body)
+                    if r.status_code != 200:
+                        raise ValueError(f"HTTP {r.status_code}")
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except Exception as e:
+                    errors += 1
+                    if errors <= 3:
+                        self.stderr.write(f"[loadtest] {type(e).__name__}: {e}")
+
+        # one connection per simulated user: the client must not be the queue
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(timeout=options["timeout"], limits=limits, **client_kwargs) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(conversation(client, n) for n in range(concurrency)))
+            wall = time.perf_counter() - start
+        return len(latencies), errors, latencies, wall
@@ -0,0 +1,197 @@
+# chatbot/prompt_budget.py
+"""
+Token budgeting for MenuChatbot prompts.
+
+Every turn used to resend whole formatted menus / item-detail blocks from
+history plus every original_data field of every hit. Here:
+
+- count_tokens(): cheap offline estimate (no tokenizer download); the real
+  number comes back in completion.usage and is logged next to it
+- compact_message(): menus / detail blocks in old assistant turns → one line
+- fit_history(): the last few turns within the budget, older user
+  questions folded into a one-line summary
+- context_fields() / fit_context(): only the original_data fields the
+  question needs, items added in rank order until the context budget
+
+Budgets: settings.CHATBOT_PROMPT_TOKEN_BUDGET / CHATBOT_CONTEXT_TOKEN_BUDGET /
+CHATBOT_HISTORY_MESSAGES / CHATBOT_HISTORY_MESSAGE_TOKENS (env vars when
+running without Django).
+"""
+import os
+import re
+
+# word / number / single symbol; long words are split like BPE would (~4 chars)
+_PIECE = re.compile(r"\w+|[^\w\s]")
+# chat format overhead per message (role, separators)
+MESSAGE_OVERHEAD = 4
+
+DEFAULTS = {
+    "CHATBOT_PROMPT_TOKEN_BUDGET": 1800,
+    "CHATBOT_CONTEXT_TOKEN_BUDGET": 700,
+    "CHATBOT_HISTORY_MESSAGES": 6,
+    "CHATBOT_HISTORY_MESSAGE_TOKENS": 150,
+}
+
+DESCRIPTION_TOKENS = 40
+SUMMARY_QUESTIONS = 5
+SUMMARY_QUESTION_TOKENS = 12
+
+
+def budget(name: str) -> int:
+    try:
+        from django.conf import settings
+
+        if settings.configured and hasattr(settings, name):
+            return int(getattr(settings, name))
+    except ImportError:
+        pass
+    return int(os.getenv(name, DEFAULTS[name]))
+
+
+# ------------------------------------------------------------
+# Counting / truncation
+# ------------------------------------------------------------
+def count_tokens(text: str) -> int:
+    return sum(1 + (len(p) - 1) // 4 for p in _PIECE.findall(text or ""))
+
+
+def count_message_tokens(messages: list[dict]) -> int:
+    return sum(count_tokens(m.get("content", "")) + MESSAGE_OVERHEAD for m in messages)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` after roughly `max_tokens` tokens (on a piece boundary)."""
+    used = 0
+    for match in _PIECE.finditer(text or ""):
+        used += 1 + (len(match.group()) - 1) // 4
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + " …"
+    return text
+
+
+# ------------------------------------------------------------
+# History
+# ------------------------------------------------------------
+_MENU_BLOCK = re.compile(r"📋 MENU OPTIONS:\n=+\n(.*?)\n=+", re.S)
+_MENU_LINE = re.compile(r"^\d+\.\s+(.+?)(?:\s+\(|\s+-\s+₹|$)", re.M)
+_DETAIL_BLOCK = re.compile(r"=+\n📌 (?:ITEM #\d+: )?(.+?)\n=+\n.*?\n=+", re.S)
+_SELECTION_HINT = re.compile(r"\n*💬 Reply with a number.*$", re.M)
+# numbered picks ("2" / "Tell me more about item #2") mean nothing out of context
+_SELECTION_QUESTION = re.compile(r"^\s*(?:\d+|Tell me more about item #\d+)\s*$")
+
+
+def compact_message(content: str) -> str:
+    """Replace formatted menu lists / item-detail blocks with a one-line note."""
+    content = _MENU_BLOCK.sub(
+        lambda m: "[listed: " + ", ".join(_MENU_LINE.findall(m.group(1))) + "]", content
+    )
+    content = _DETAIL_BLOCK.sub(lambda m: f"[showed details of {m.group(1).strip()}]", content)
+    content = _SELECTION_HINT.sub("", content)
+    return re.sub(r"\n{3,}", "\n\n", content).strip()
+
+
+def fit_history(history: list[dict], max_tokens: int) -> list[dict]:
+    """
+    Compacted recent history within `max_tokens`, newest first in priority.
+    Turns that don't fit (or are older than CHATBOT_HISTORY_MESSAGES) become
+    one summary line of the customer's earlier questions.
+    """
+    per_message = budget("CHATBOT_HISTORY_MESSAGE_TOKENS")
+    window = budget("CHATBOT_HISTORY_MESSAGES")
+    kept, used = [], 0
+    cut = max(len(history) - window, 0)
+    for i in range(len(history) - 1, cut - 1, -1):
+        msg = history[i]
+        content = truncate_tokens(compact_message(msg.get("content", "")), per_message)
+        cost = count_tokens(content) + MESSAGE_OVERHEAD
+        if used + cost > max_tokens:
+            cut = i + 1
+            break
+        kept.append({"role": msg["role"], "content": content})
+        used += cost
+    kept.reverse()
+
+    # a reply without its question confuses the model (cut off, or the history starts with one)
+    if kept and kept[0]["role"] == "assistant":
+        used -= count_tokens(kept[0]["content"]) + MESSAGE_OVERHEAD
+        kept.pop(0)
+        cut += 1
+
+    older = [
+        m.get("content", "") for m in history[:cut]
+        if m.get("role") == "user" and not _SELECTION_QUESTION.match(m.get("content", ""))
+    ]
+    if older:
+        asked = "; ".join(
+            truncate_tokens(q.strip(), SUMMARY_QUESTION_TOKENS) for q in older[-SUMMARY_QUESTIONS:]
+        )
+        summary = {"role": "system", "content": f"Earlier in this conversation the customer asked about: {asked}"}
+        if used + count_tokens(summary["content"]) + MESSAGE_OVERHEAD <= max_tokens:
+            kept.insert(0, summary)
+    return kept
+
+
+# ------------------------------------------------------------
+# Menu context
+# ------------------------------------------------------------
+FIELD_KEYWORDS = {
+    "ingredients": ("ingredient", "contain", "made", "inside", "what's in", "whats in", "recipe", "topping"),
+    "allergens": (
+        "allerg", "nut", "peanut", "gluten", "dairy", "lactose", "milk",
+        "egg", "soy", "shellfish", "sesame", "safe",
+    ),
+    "dietary_info": ("veg", "vegan", "jain", "diet", "halal", "keto", "sugar", "healthy", "spicy"),
+}
+_DETAIL_WORDS = ("describe", "tell me about", "what is", "details", "more about", "explain")
+
+
+def context_fields(query: str) -> tuple[set, bool]:
+    """(original_data fields the question needs, whether to keep full descriptions)."""
+    q = (query or "").lower()
+    fields = {field for field, words in FIELD_KEYWORDS.items() if any(w in q for w in words)}
+    full_description = any(w in q for w in _DETAIL_WORDS)
+    if full_description:
+        fields |= {"ingredients", "allergens", "dietary_info"}
+    return fields, full_description
+
+
+def _as_text(value) -> str:
+    return value if isinstance(value, str) else ", ".join(str(v) for v in value)
+
+
+def context_block(meta: dict, idx: int, fields: set, full_description: bool) -> str:
+    item_info = []
+    if meta.get("name"):
+        item_info.append(f"Item {idx}: {meta['name']}")
+    if meta.get("category"):
+        item_info.append(f"Category: {meta['category']}")
+    if meta.get("price"):
+        item_info.append(f"Price: {meta['price']}")
+
+    orig = meta.get("original_data") or {}
+    if orig.get("description"):
+        description = orig["description"]
+        if not full_description:
+            description = truncate_tokens(description, DESCRIPTION_TOKENS)
+        item_info.append(f"Description: {description}")
+    if "ingredients" in fields and orig.get("ingredients"):
+        item_info.append(f"Ingredients: {_as_text(orig['ingredients'])}")
+    if "allergens" in fields and orig.get("allergens"):
+        item_info.append(f"Allergens: {_as_text(orig['allergens'])}")
+    if "dietary_info" in fields and orig.get("dietary_info"):
+        item_info.append(f"Dietary: {_as_text(orig['dietary_info'])}")
+    return "\n".join(item_info)
+
+
+def fit_context(blocks: list[str], max_tokens: int) -> list[str]:
+    """Blocks in rank order until the budget; the best hit is always kept (truncated if needed)."""
+    kept, used = [], 0
+    for block in blocks:
+        cost = count_tokens(block)
+        if used + cost > max_tokens:
+            if not kept:
+                kept.append(truncate_tokens(block, max_tokens))
+            break
+        kept.append(block)
+        used += cost
+    return kept
@@ -0,0 +1,167 @@
+# chatbot/recommendations.py
+"""
+Best-sellers and "people also order" suggestions for the chat.
+
+- build(): the OrderItem rows of converted orders from the last
+  RECOMMENDATIONS_WINDOW_DAYS: top-N items by quantity and, per item, the
+  items bought with it ranked by confidence / lift (associations(), a
+  sparse co-occurrence matrix, NumPy/SciPy)
+- refresh_all(): the Celery beat job (chatbot/tasks.py), every
+  RECOMMENDATIONS_REFRESH_SECONDS
+- popular() / also_ordered(): reads for apply_intent. The cache only holds
+  item ids; they are resolved through the menu snapshot cards
+  (menu/snapshot.py), so unavailable items drop out and a warm read does
+  zero queries
+
+A restaurant missing from the cache (new install, evicted key) gets no
+suggestions until a queued refresh has built it: the build scans orders,
+too slow for the chat request that noticed.
+"""
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from scipy import sparse
+
+from backoffice.stats import CONVERTED_STATUSES
+from menu.snapshot import get_snapshot as get_menu_snapshot
+from orders.models import OrderItem
+from restaurants.models import Restaurant
+from restaurant_backend.observability import log_event
+
+logger = logging.getLogger(__name__)
+
+
+def _key(restaurant_id) -> str:
+    return f"recommendations:{restaurant_id}"
+
+
+def associations(order_idx: np.ndarray, item_idx: np.ndarray, n_items: int) -> dict:
+    """
+    Item -> items ranked by association, from (order, item) index pairs.
+
+    X is the binary order x item matrix; C = X.T @ X counts, per item pair,
+    the orders containing both (diagonal: orders containing the item).
+    confidence(a -> b) = C[a, b] / C[a, a]
+    lift(a, b)         = C[a, b] * orders / (C[a, a] * C[b, b])
+    Pairs seen in fewer than RECOMMENDATIONS_MIN_PAIR_ORDERS orders or with
+    lift <= RECOMMENDATIONS_MIN_LIFT (not bought together more than chance) are dropped.
+    """
+    n_orders = int(order_idx.max()) + 1 if order_idx.size else 0
+    X = sparse.csr_matrix(
+        (np.ones(order_idx.size, dtype=np.float32), (order_idx, item_idx)),
+        shape=(n_orders, n_items),
+    )
+    X.data[:] = 1  # the same item twice in one order is still one order
+    C = (X.T @ X).tocoo()
+    support = C.diagonal()
+
+    a, b, together = C.row, C.col, C.data
+    keep = (a != b) & (together >= settings.RECOMMENDATIONS_MIN_PAIR_ORDERS)
+    a, b, together = a[keep], b[keep], together[keep]
+    confidence = together / support[a]
+    lift = confidence * n_orders / support[b]
+    keep = lift > settings.RECOMMENDATIONS_MIN_LIFT
+    a, b = a[keep], b[keep]
+    score = (lift if settings.RECOMMENDATIONS_RANK_BY == "lift" else confidence)[keep]
+
+    ranked = {}
+    top_n = settings.RECOMMENDATIONS_TOP_N
+    # by item, best score first
+    for i in np.lexsort((-score, a)):
+        others = ranked.setdefault(int(a[i]), [])
+        if len(others) < top_n:
+            others.append(int(b[i]))
+    return ranked
+
+
+def build(restaurant_id) -> dict:
+    """{"popular": [item ids], "also": {item id: [item ids]}, "orders": n}"""
+    since = timezone.now() - timedelta(days=settings.RECOMMENDATIONS_WINDOW_DAYS)
+    rows = np.array(
+        OrderItem.objects.filter(
+            order__restaurant_id=restaurant_id,
+            order__status__in=CONVERTED_STATUSES,
+            order__created_at__gte=since,
+        )
+        .order_by()
+        .values_list("order_id", "menu_item_id", "quantity"),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+
+    # dense 0..n-1 indices for orders and menu items
+    order_ids, order_idx = np.unique(rows[:, 0], return_inverse=True)
+    item_ids, item_idx = np.unique(rows[:, 1], return_inverse=True)
+
+    quantity = np.bincount(item_idx, weights=rows[:, 2], minlength=item_ids.size)
+    top_n = settings.RECOMMENDATIONS_TOP_N
+    popular = item_ids[np.argsort(-quantity, kind="stable")[:top_n]]
+
+    also = {
+        int(item_ids[i]): [int(item_ids[j]) for j in others]
+        for i, others in associations(order_idx, item_idx, item_ids.size).items()
+    }
+    return {"popular": [int(i) for i in popular], "also": also, "orders": int(order_ids.size)}
+
+
+def refresh(restaurant_id) -> dict:
+    data = build(restaurant_id)
+    # outlives a few missed beats; restaurants that stop being refreshed just expire
+    cache.set(_key(restaurant_id), data, timeout=settings.RECOMMENDATIONS_REFRESH_SECONDS * 4)
+    return data
+
+
+def refresh_all() -> int:
+    count = 0
+    for restaurant_id in Restaurant.objects.values_list("id", flat=True):
+        refresh(restaurant_id)
+        count += 1
+    log_event(logger, "recommendations_refresh", restaurants=count)
+    return count
+
+
+_EMPTY = {"popular": [], "also": {}, "orders": 0}
+
+
+def _get(restaurant_id) -> dict:
+    data = cache.get(_key(restaurant_id))
+    if data is None:
+        # one queued build per restaurant per minute, however many chats miss
+        if cache.add(_key(restaurant_id) + ":queued", 1, timeout=60):
+            from .tasks import refresh_restaurant_recommendations  # tasks imports this module
+
+            try:
+                refresh_restaurant_recommendations.delay(restaurant_id)
+            except Exception as e:
+                log_event(logger, "recommendations_enqueue_failed", logging.WARNING, restaurant_id=restaurant_id, error=str(e))
+        return _EMPTY
+    return data
+
+
+def _cards(restaurant_id, item_ids, exclude, limit) -> list[dict]:
+    snapshot = get_menu_snapshot(restaurant_id) or {}
+    cards = snapshot.get("cards") or {}
+    picked = []
+    for item_id in item_ids:
+        if item_id in exclude or item_id not in cards:
+            continue
+        picked.append(cards[item_id])
+        if len(picked) >= limit:
+            break
+    return picked
+
+
+def popular(restaurant_id, exclude=(), limit: int | None = None) -> list[dict]:
+    """Best-seller chat cards (available items only)."""
+    limit = limit or settings.RECOMMENDATIONS_CHAT_ITEMS
+    return _cards(restaurant_id, _get(restaurant_id)["popular"], set(exclude), limit)
+
+
+def also_ordered(restaurant_id, item_id, exclude=(), limit: int | None = None) -> list[dict]:
+    """Cards for items often ordered together with `item_id`."""
+    limit = limit or settings.RECOMMENDATIONS_CHAT_ITEMS
+    ids = _get(restaurant_id)["also"].get(item_id, [])
+    return _cards(restaurant_id, ids, {item_id, *exclude}, limit)
@@ -0,0 +1,168 @@
+# chatbot/response_cache.py
+"""
+Semantic cache for LLM chat replies.
+
+"do you have vegan options?" and "any vegan options?" retrieve the same items
+and get the same answer; the second one is served from here instead of a new
+LLM call. An entry is (unit query embedding, retrieval key, reply); the key
+is the retrieved item set (plus anything else the prompt depended on) and a
+lookup hits when the key is identical AND cosine(query, entry) >= threshold.
+
+Caches are per restaurant and per index version: for_index() drops the old
+cache as soon as a new version is published (MenuChatbot instances already
+live for exactly one version and own their cache).
+
+Settings: CHATBOT_RESPONSE_CACHE_ENABLED, CHATBOT_RESPONSE_CACHE_THRESHOLD,
+CHATBOT_RESPONSE_CACHE_SIZE.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from restaurant_backend.metrics import counter
+from restaurant_backend.observability import log_event
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_LOOKUPS = counter(
+    "chat_response_cache_total", "Semantic reply cache lookups by result (hit/miss)"
+)
+
+DEFAULTS = {
+    "CHATBOT_RESPONSE_CACHE_ENABLED": True,
+    "CHATBOT_RESPONSE_CACHE_THRESHOLD": 0.92,
+    "CHATBOT_RESPONSE_CACHE_SIZE": 256,
+}
+
+
+def _setting(name: str):
+    try:
+        from django.conf import settings
+
+        if settings.configured and hasattr(settings, name):
+            return getattr(settings, name)
+    except ImportError:
+        pass
+    default = DEFAULTS[name]
+    value = os.getenv(name)
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes")
+    return type(default)(value)
+
+
+def item_set(metas) -> frozenset:
+    """Identity of a retrieval result: menu item ids (names for old indexes)."""
+    return frozenset(m.get("menu_item_id") or m.get("name") for m in metas)
+
+
+def memoize_encoder(encode, maxsize: int = 256):
+    """Query text → embedding, remembered: search and cache lookup share one encode."""
+    memo = OrderedDict()
+    lock = threading.Lock()
+
+    def encoded(text, *args, **kwargs):
+        with lock:
+            if text in memo:
+                memo.move_to_end(text)
+                return memo[text]
+        vector = encode(text, *args, **kwargs)
+        with lock:
+            memo[text] = vector
+            if len(memo) > maxsize:
+                memo.popitem(last=False)
+        return vector
+
+    return encoded
+
+
+class SemanticResponseCache:
+    def __init__(self, threshold: float | None = None, max_entries: int | None = None, source: str = "chat"):
+        self.threshold = float(threshold if threshold is not None else _setting("CHATBOT_RESPONSE_CACHE_THRESHOLD"))
+        self.max_entries = int(max_entries or _setting("CHATBOT_RESPONSE_CACHE_SIZE"))
+        self.source = source
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._vectors = None  # (n, dim) float32, unit rows
+        self._items: list = []  # retrieval keys
+        self._replies: list[str] = []
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def lookup(self, query_vector, items) -> str | None:
+        if not _setting("CHATBOT_RESPONSE_CACHE_ENABLED") or not items:
+            return None
+        q = self._unit(query_vector)
+        best, reply = -1.0, None
+        with self._lock:
+            if self._vectors is not None:
+                candidates = [i for i, s in enumerate(self._items) if s == items]
+                if candidates:
+                    sims = self._vectors[candidates] @ q
+                    j = int(np.argmax(sims))
+                    best = float(sims[j])
+                    if best >= self.threshold:
+                        reply = self._replies[candidates[j]]
+
+            if reply is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        RESPONSE_CACHE_LOOKUPS.inc(result="hit" if reply is not None else "miss", source=self.source)
+        if reply is not None:
+            log_event(logger, "response_cache_hit", source=self.source, sim=round(best, 3), hit_rate=round(self.hit_rate, 2))
+        return reply
+
+    def store(self, query_vector, items, reply: str) -> None:
+        if not _setting("CHATBOT_RESPONSE_CACHE_ENABLED") or not items or not reply:
+            return
+        q = self._unit(query_vector)[None, :]
+        with self._lock:
+            self._vectors = q if self._vectors is None else np.vstack([self._vectors, q])
+            self._items.append(items)
+            self._replies.append(reply)
+            # oldest first out
+            overflow = len(self._replies) - self.max_entries
+            if overflow > 0:
+                self._vectors = self._vectors[overflow:]
+                self._items = self._items[overflow:]
+                self._replies = self._replies[overflow:]
+
+    def __len__(self) -> int:
+        return len(self._replies)
+
+
+# restaurant_id -> {"version": ..., "cache": SemanticResponseCache}
+_caches: dict = {}
+_caches_lock = threading.Lock()
+
+
+def for_index(restaurant_id: int, version, source: str = "chat") -> SemanticResponseCache:
+    """The restaurant's cache for this index version (a new version starts empty)."""
+    with _caches_lock:
+        entry = _caches.get(restaurant_id)
+        if entry is None or entry["version"] != version:
+            if entry is not None:
+                log_event(
+                    logger, "response_cache_stale",
+                    restaurant_id=restaurant_id, old_version=entry["version"], version=version,
+                    dropped=len(entry["cache"]),
+                )
+            entry = {"version": version, "cache": SemanticResponseCache(source=source)}
+            _caches[restaurant_id] = entry
+        return entry["cache"]
@@ -14,4 +14,6 @@ class ChatRequestSerializer(serializers.Serializer):
 class MenuChatRequestSerializer(serializers.Serializer):
     message = serializers.CharField()
     restaurant_id = serializers.IntegerField()
+    # the bot keeps conversation history per session; without one every message starts afresh
+    session_id = serializers.CharField(required=False, allow_blank=True)
 
@@ -1,13 +1,57 @@
 # chatbot/services.py (AI-powered version)
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.shortcuts import get_object_or_404
 
 from restaurants.models import Restaurant
 from menu.models import MenuItem
+from menu.snapshot import get_snapshot as get_menu_snapshot
+from orders import cart_cache
 from orders.models import Order, OrderItem
+from restaurant_backend.db import retry_on_busy
+from restaurant_backend.observability import span
+from . import recommendations
 from .engine import ChatbotResult
 
 
+# Intents that never write: they only look up an existing cart
+READ_ONLY_INTENTS = {"SHOW_CART", "SHOW_MENU", "HELP", "SEARCH_ITEM"}
+
+
+def get_open_order(restaurant: Restaurant, session_id: str) -> Order:
+    """
+    The session's pending order with its items prefetched, or an unsaved
+    empty one: carts are only written by the first ADD_ITEM (see
+    orders/carts.py for the lifecycle). Sessions the cart cache knows to
+    have no cart cost no query; a cached id is re-checked against PENDING.
+    """
+    cached = cart_cache.get(restaurant.id, session_id)
+    order = None
+    if cached is None or cached["id"] is not None:
+        qs = Order.objects.filter(restaurant=restaurant, status=Order.OrderStatus.PENDING)
+        qs = qs.filter(pk=cached["id"]) if cached else qs.filter(session_id=session_id)
+        order = qs.prefetch_related("items").first()
+    if order is None:
+        order = Order(
+            restaurant=restaurant,
+            session_id=session_id,
+            order_type=Order.OrderType.TAKEAWAY,
+            source="chatbot",
+        )
+    return order
+
+
+def has_items(order: Order) -> bool:
+    # items are prefetched by get_open_order()
+    return order.pk is not None and bool(order.items.all())
+
+
+def _reload_items(order: Order) -> None:
+    """Fresh prefetch after a cart write: recalc_totals() and the snapshot share it."""
+    getattr(order, "_prefetched_objects_cache", {}).pop("items", None)
+    prefetch_related_objects([order], "items")
+
+
 def get_or_create_open_order(restaurant: Restaurant, session_id: str) -> Order:
     """Get or create a pending order for this session."""
     order, _ = Order.objects.get_or_create(
@@ -48,85 +92,131 @@ def find_menu_item_by_name(restaurant: Restaurant, item_name: str) -> MenuItem:
     raise MenuItem.DoesNotExist(f"No menu item found matching: {item_name}")
 
 
+def _suggestions(cards: list[dict], title: str) -> dict:
+    """Extra payload for the widget's tap-able cards (nothing if there are none)."""
+    if not cards:
+        return {}
+    return {"menu_items": cards, "menu_items_title": title}
+
+
+def _popular_extra(restaurant: Restaurant) -> dict:
+    return _suggestions(recommendations.popular(restaurant.id), "Popular here:")
+
+
+def _popular_followup(restaurant: Restaurant):
+    return lambda reply: (reply, _popular_extra(restaurant))
+
+
+def _pairing_followup(restaurant: Restaurant, menu_item_id: int, order: Order):
+    """ADD_ITEM: "Add a X with that?" + cards, from the cached association lists."""
+    # never offer what is already in the cart (items are prefetched)
+    in_cart = [line.menu_item_id for line in order.items.all()]
+
+    def followup(reply):
+        also = recommendations.also_ordered(restaurant.id, menu_item_id, exclude=in_cart)
+        if also:
+            reply += f"\nAdd a {also[0]['name']} with that?"
+        return reply, _suggestions(also, "People also order:")
+
+    return followup
+
+
 def apply_intent(restaurant: Restaurant, session_id: str, result: ChatbotResult):
     """
     Takes ChatbotResult from AI engine, performs DB actions,
-    and ALWAYS returns (reply_text, order, extra_dict).
+    and ALWAYS returns (reply_text, order_snapshot, extra_dict).
     """
-    order = get_or_create_open_order(restaurant, session_id)
-
+    # "cart" span: cart reads + mutations per intent (DB queries land in the request log)
+    with span("cart", intent=result.intent):
+        if result.intent in READ_ONLY_INTENTS:
+            # most turns: cart state straight from the cart cache
+            cart = cart_cache.get(restaurant.id, session_id)
+            if cart is None:
+                cart = cart_cache.put(get_open_order(restaurant, session_id))
+            reply, extra = _read_intent(restaurant, cart, result)
+            return reply, cart, extra
+
+        # one transaction per mutation; on SQLite "database is locked" (a menu
+        # import holding the write lock) it is run again from the cart lookup
+        reply, order, extra = retry_on_busy(lambda: _mutate(restaurant, session_id, result))
+        if callable(extra):
+            # suggestions: cache / snapshot reads, kept out of the write transaction
+            reply, extra = extra(reply)
+        # write-through; the items are still prefetched, so no extra query
+        return reply, cart_cache.put(order), extra
+
+
+def _mutate(restaurant: Restaurant, session_id: str, result: ChatbotResult):
+    with transaction.atomic():
+        order = get_open_order(restaurant, session_id)
+        return _apply_intent(restaurant, session_id, order, result)
+
+
+def _read_intent(restaurant: Restaurant, cart: dict, result: ChatbotResult):
+    """Read-only intents on the cart snapshot: never write. Returns (reply, extra)."""
     # ============================================
     # SHOW_CART
     # ============================================
     if result.intent == "SHOW_CART":
-        if not order.items.exists():
-            return "Your cart is empty.", order, {}
+        if not cart["items"]:
+            return "Your cart is empty.", _popular_extra(restaurant)
 
         lines = []
-        for item in order.items.select_related("menu_item"):
-            lines.append(f"{item.quantity} × {item.name} — ₹{item.total_price}")
+        for item in cart["items"]:
+            lines.append(f"{item['quantity']} × {item['name']} — ₹{item['total_price']}")
 
-        reply = "Here is your cart:\n" + "\n".join(lines) + f"\nTotal: ₹{order.total}"
-        return reply, order, {}
+        reply = "Here is your cart:\n" + "\n".join(lines) + f"\nTotal: ₹{cart['total']}"
+        return reply, {}
 
     # ============================================
     # SHOW_MENU
     # ============================================
     if result.intent == "SHOW_MENU":
-        qs = MenuItem.objects.filter(
-            restaurant=restaurant,
-            available=True
-        ).order_by("category", "name")[:50]
-
-        if not qs:
-            return "This restaurant has no menu items yet.", order, {}
-
-        lines = []
-        current_category = None
-        suggestions = []
-
-        for m in qs:
-            if m.category != current_category:
-                current_category = m.category
-                lines.append(f"\n**{current_category}**")
-            lines.append(f"• {m.name} — ₹{m.price}")
-
-            suggestions.append(
-                {
-                    "id": m.id,
-                    "name": m.name,
-                    "price": str(m.price),
-                    "category": m.category or "",
-                }
-            )
-
-        reply = (
-            "Here's our menu:\n"
-            + "\n".join(lines)
-            + "\n\nJust tap an item or tell me what you'd like to add!"
-        )
-        return reply, order, {"menu_items": suggestions}
+        # text + suggestions pre-rendered per menu version (menu/snapshot.py)
+        show_menu = get_menu_snapshot(restaurant.id)["show_menu"]
+        if not show_menu["menu_items"]:
+            return show_menu["reply"], {}
+        return show_menu["reply"], {"menu_items": show_menu["menu_items"]}
 
     # ============================================
     # HELP
     # ============================================
     if result.intent == "HELP":
-        return result.reply, order, {}
+        return result.reply, _popular_extra(restaurant)
 
+    # ============================================
+    # SEARCH_ITEM
+    # ============================================
+    if result.intent == "SEARCH_ITEM":
+        extra = {}
+        if getattr(result, "suggestions", None):
+            extra["menu_items"] = result.suggestions
+        return result.reply, extra
+
+    return result.reply, {}
+
+
+def _apply_intent(restaurant: Restaurant, session_id: str, order: Order, result: ChatbotResult):
+    """
+    Cart mutations; the cart row is created by the first ADD_ITEM.
+    `extra` may be a followup(reply) -> (reply, extra), run after the commit.
+    """
     # ============================================
     # CLEAR_CART
     # ============================================
     if result.intent == "CLEAR_CART":
-        order.items.all().delete()
-        order.recalc_totals()
+        if order.pk is not None:
+            OrderItem.objects.filter(order=order).delete()
+            _reload_items(order)
+            order.recalc_totals()
         return "✅ Your cart has been cleared.", order, {}
 
     # ============================================
     # CONFIRM_ORDER
     # ============================================
     if result.intent == "CONFIRM_ORDER":
-        if not order.items.exists():
-            return "Your cart is empty. Add some items before confirming.", order, {}
+        if not has_items(order):
+            return "Your cart is empty. Add some items before confirming.", order, _popular_followup(restaurant)
 
         order.status = Order.OrderStatus.CONFIRMED
         order.save(update_fields=["status"])
@@ -137,15 +227,6 @@ def apply_intent(restaurant: Restaurant, session_id: str, result: ChatbotResult)
             {},
         )
 
-    # ============================================
-    # SEARCH_ITEM
-    # ============================================
-    if result.intent == "SEARCH_ITEM":
-        extra = {}
-        if getattr(result, "suggestions", None):
-            extra["menu_items"] = result.suggestions
-        return result.reply, order, extra
-
     # ============================================
     # ADD_ITEM
     # ============================================
@@ -198,31 +279,37 @@ def apply_intent(restaurant: Restaurant, session_id: str, result: ChatbotResult)
                 {},
             )
 
-        with transaction.atomic():
-            oi, created = OrderItem.objects.get_or_create(
+        if order.pk is None:
+            # first item: the cart row is created only now
+            order = get_or_create_open_order(restaurant, session_id)
+            _reload_items(order)
+        # existing line from the prefetched cart, no lookup query
+        oi = next((line for line in order.items.all() if line.menu_item_id == menu_item.id), None)
+        if oi is None:
+            OrderItem.objects.create(
                 order=order,
                 menu_item=menu_item,
-                defaults={
-                    "name": menu_item.name,
-                    "quantity": qty_to_add,
-                    "unit_price": menu_item.price,
-                    "total_price": menu_item.price * qty_to_add,
-                },
+                name=menu_item.name,
+                quantity=qty_to_add,
+                unit_price=menu_item.price,
+                total_price=menu_item.price * qty_to_add,
             )
+        else:
+            oi.quantity += qty_to_add
+            oi.total_price = oi.unit_price * oi.quantity
+            oi.save(update_fields=["quantity", "total_price"])
 
-            if not created:
-                oi.quantity += qty_to_add
-                oi.total_price = oi.unit_price * oi.quantity
-                oi.save(update_fields=["quantity", "total_price"])
-
-            order.recalc_totals()
+        _reload_items(order)
+        order.recalc_totals()
 
-        confidence_emoji = "✅" if result.confidence > 0.7 else "👍"
+        # ChatbotResult from the intent parser has no confidence; treat it as sure
+        confidence_emoji = "✅" if getattr(result, "confidence", 1.0) > 0.7 else "👍"
         reply = (
             f"{confidence_emoji} Added {qty_to_add} × {menu_item.name} to your cart.\n"
             f"Current total: ₹{order.total}"
         )
-        return reply, order, {}
+        # best pairing: no LLM call, no query on a warm cache
+        return reply, order, _pairing_followup(restaurant, menu_item.id, order)
 
 
     # ============================================
@@ -232,7 +319,7 @@ def apply_intent(restaurant: Restaurant, session_id: str, result: ChatbotResult)
     # REMOVE_ITEM
     # ============================================
     if result.intent == "REMOVE_ITEM":
-        if not order.items.exists():
+        if not has_items(order):
             return "Your cart is already empty.", order, {}
 
         if not result.item_name:
@@ -240,11 +327,11 @@ def apply_intent(restaurant: Restaurant, session_id: str, result: ChatbotResult)
 
         try:
             menu_item = find_menu_item_by_name(restaurant, result.item_name)
-            oi = OrderItem.objects.get(
-                order=order,
-                menu_item=menu_item,
-            )
-        except (MenuItem.DoesNotExist, OrderItem.DoesNotExist):
+        except MenuItem.DoesNotExist:
+            return f"'{result.item_name}' is not in your cart.", order, {}
+        # cart lines are already prefetched
+        oi = next((line for line in order.items.all() if line.menu_item_id == menu_item.id), None)
+        if oi is None:
             return f"'{result.item_name}' is not in your cart.", order, {}
 
         raw_qty = getattr(result, "quantity", 1)
@@ -294,6 +381,7 @@ def apply_intent(restaurant: Restaurant, session_id: str, result: ChatbotResult)
             oi.save(update_fields=["quantity", "total_price"])
             msg = f"Removed {qty_to_remove} × {oi.name} from your cart."
 
+        _reload_items(order)
         order.recalc_totals()
         msg += f" Current total: ₹{order.total}"
         return msg, order, {}
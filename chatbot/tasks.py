@@ -0,0 +1,17 @@
+# chatbot/tasks.py
+from celery import shared_task
+
+from .recommendations import refresh, refresh_all
+
+
+@shared_task
+def refresh_recommendations() -> int:
+    """Periodic (beat) rebuild of the chat suggestions; returns restaurants refreshed."""
+    return refresh_all()
+
+
+@shared_task
+def refresh_restaurant_recommendations(restaurant_id) -> int:
+    """One restaurant's suggestions, queued by a chat read that found none cached."""
+    data = refresh(restaurant_id)
+    return data["orders"]
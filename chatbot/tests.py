@@ -1,3 +1,605 @@
-from django.test import TestCase
+import io
+import json
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from accounts.models import User
+from menu.embedding_context import suspend_embedding_signals
+from menu.models import MenuItem
+from menu.snapshot import get_snapshot as get_menu_snapshot
+from orders import cart_cache
+from orders.models import Order, OrderItem
+from restaurant_backend import llm
+from restaurants.models import Restaurant
+
+from . import engine, prompt_budget, recommendations, response_cache, throttling, views
+from .engine import ChatbotResult
+from .services import apply_intent
+
+
+def intent(name, **fields):
+    return ChatbotResult(intent=name, reply="Hi! Ask me about the menu.", **fields)
+
+
+# one test process: its memory cache is as shared as Redis
+@override_settings(CACHE_SHARED=True)
+class ApplyIntentQueryCountTests(TestCase):
+    """
+    Locks in the DB work per chat intent (warm menu snapshot / suggestions cache):
+    read-only intents never write, and no-cart sessions cost nothing.
+    """
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        self.restaurant = Restaurant.objects.create(owner=owner, name="Only Kulchas")
+        with suspend_embedding_signals():
+            self.kulcha = MenuItem.objects.create(
+                restaurant=self.restaurant, name="Amritsari Kulcha", price=Decimal("120"), external_item_id="k1"
+            )
+            self.lassi = MenuItem.objects.create(
+                restaurant=self.restaurant, name="Sweet Lassi", price=Decimal("60"), external_item_id="l1"
+            )
+        get_menu_snapshot(self.restaurant.id)
+        recommendations.refresh(self.restaurant.id)
+
+    def chat(self, result, session_id="sess_test"):
+        return apply_intent(self.restaurant, session_id, result)
+
+    def test_read_only_intents_without_cart(self):
+        # first turn of the session: one lookup, then "no cart" is cached
+        with self.assertNumQueries(1):
+            self.chat(intent("HELP"))
+        for name in ("HELP", "SHOW_MENU", "SEARCH_ITEM", "SHOW_CART"):
+            with self.subTest(intent=name), self.assertNumQueries(0):
+                reply, order, _ = self.chat(intent(name))
+            self.assertIsNone(order["id"])
+        self.assertFalse(Order.objects.exists())
+
+    def test_read_only_intents_with_cart(self):
+        self.chat(intent("ADD_ITEM", item_name="Amritsari Kulcha", quantity=2))
+        for name in ("HELP", "SHOW_MENU", "SEARCH_ITEM", "SHOW_CART"):
+            # answered from the write-through cart cache
+            with self.subTest(intent=name), self.assertNumQueries(0):
+                reply, order, _ = self.chat(intent(name))
+            self.assertEqual(order["items"][0]["quantity"], 2)
+        self.assertIn("2 × Amritsari Kulcha — ₹240.00", reply)
+
+        # cache lost (eviction, payment started): cart + its items, then cached again
+        cart_cache.invalidate(self.restaurant.id, "sess_test")
+        with self.assertNumQueries(2):
+            reply, order, _ = self.chat(intent("SHOW_CART"))
+        self.assertEqual(order["total"], "240.00")
+        with self.assertNumQueries(0):
+            self.chat(intent("SHOW_CART"))
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_reads_cart_from_db(self):
+        # no "empty cart" remembered in this process...
+        self.assertEqual(self.chat(intent("SHOW_CART"))[0], "Your cart is empty.")
+        # ...while another worker adds to the cart
+        order = Order.objects.create(restaurant=self.restaurant, session_id="sess_test", source="chatbot")
+        OrderItem.objects.create(
+            order=order, menu_item=self.kulcha, name="Amritsari Kulcha",
+            quantity=1, unit_price=Decimal("120"), total_price=Decimal("120"),
+        )
+        order.recalc_totals()
+        with self.assertNumQueries(2):
+            reply, cart, _ = self.chat(intent("SHOW_CART"))
+        self.assertIn("1 × Amritsari Kulcha", reply)
+        self.assertEqual(cart["total"], "120.00")
+
+    def test_add_item_creates_cart_and_returns_snapshot(self):
+        self.chat(intent("HELP"))
+        # 11 for the cart itself: menu item, cart lookup, cart row, the line, one items
+        # read shared by the totals and the snapshot, totals. The backoffice signals add
+        # the counter rows (2) and this hour's/day's analytics buckets, created here
+        # because they don't exist yet (2 x savepoint-wrapped insert after the update)
+        with self.assertNumQueries(21):
+            reply, order, _ = self.chat(intent("ADD_ITEM", item_name="Amritsari Kulcha"))
+        self.assertEqual(order["total"], "120.00")
+        self.assertEqual([item["name"] for item in order["items"]], ["Amritsari Kulcha"])
+
+        # next visitor's cart: the buckets exist, one UPDATE each
+        self.chat(intent("HELP"), session_id="sess_other")
+        with self.assertNumQueries(15):
+            self.chat(intent("ADD_ITEM", item_name="Amritsari Kulcha"), session_id="sess_other")
+
+        # a pending cart's total moves no counter (GMV/revenue count from confirmation),
+        # so the signals add nothing: cart lookup + prefetch, menu item, line update,
+        # items read, totals
+        with self.assertNumQueries(8):
+            reply, order, _ = self.chat(intent("ADD_ITEM", item_name="Amritsari Kulcha"))
+        self.assertEqual(order["items"][0]["quantity"], 2)
+        self.assertEqual(Order.objects.filter(session_id="sess_test").count(), 1)
+
+    def test_suggestions_are_read_after_the_cart_commit(self):
+        outer = len(connection.atomic_blocks)
+        depth = []
+
+        def also_ordered(restaurant_id, item_id, **kwargs):
+            depth.append(len(connection.atomic_blocks) - outer)
+            return [{"menu_item_id": 2, "name": "Sweet Lassi"}]
+
+        with mock.patch.object(recommendations, "also_ordered", also_ordered):
+            reply, _, extra = self.chat(intent("ADD_ITEM", item_name="Amritsari Kulcha"))
+        # a cold recommendations cache must not hold the SQLite write lock
+        self.assertEqual(depth, [0])
+        self.assertIn("Add a Sweet Lassi with that?", reply)
+        self.assertEqual(extra["menu_items_title"], "People also order:")
+
+    def test_pairing_skips_items_already_in_cart(self):
+        cache.set(
+            recommendations._key(self.restaurant.id),
+            {"popular": [], "also": {self.kulcha.id: [self.lassi.id]}, "orders": 3},
+        )
+        reply, _, extra = self.chat(intent("ADD_ITEM", item_name="Amritsari Kulcha"))
+        self.assertIn("Add a Sweet Lassi with that?", reply)
+
+        self.chat(intent("ADD_ITEM", item_name="Sweet Lassi"), session_id="sess_lassi")
+        reply, _, extra = self.chat(intent("ADD_ITEM", item_name="Amritsari Kulcha"), session_id="sess_lassi")
+        self.assertNotIn("Sweet Lassi with that", reply)
+        self.assertEqual(extra, {})
+
+    def test_cold_suggestions_are_queued_not_built(self):
+        cache.delete(recommendations._key(self.restaurant.id))
+        with mock.patch("chatbot.tasks.refresh_restaurant_recommendations.delay") as delay:
+            with self.assertNumQueries(0):
+                self.assertEqual(recommendations.popular(self.restaurant.id), [])
+                recommendations.also_ordered(self.restaurant.id, self.kulcha.id)
+        delay.assert_called_once_with(self.restaurant.id)
+
+    def test_remove_and_clear(self):
+        self.chat(intent("ADD_ITEM", item_name="Amritsari Kulcha", quantity=3))
+        # each mutation runs in its own transaction (a savepoint + release here)
+        with self.assertNumQueries(8):
+            reply, order, _ = self.chat(intent("REMOVE_ITEM", item_name="Amritsari Kulcha", quantity=1))
+        self.assertEqual(order["items"][0]["quantity"], 2)
+
+        with self.assertNumQueries(7):
+            reply, order, _ = self.chat(intent("CLEAR_CART"))
+        self.assertEqual(order["items"], [])
+        self.assertEqual(order["total"], "0.00")
+
+
+class SemanticResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = response_cache.SemanticResponseCache(threshold=0.9, max_entries=2)
+        self.items = frozenset({1, 2})
+
+    def test_hit_needs_same_items_and_similar_query(self):
+        self.cache.store([1.0, 0.0], self.items, "We have Paneer Tikka.")
+        self.assertEqual(self.cache.lookup([0.99, 0.05], self.items), "We have Paneer Tikka.")
+        # different retrieval, or a question that only shares the items
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], frozenset({1, 3})))
+        self.assertIsNone(self.cache.lookup([0.0, 1.0], self.items))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_oldest_entry_evicted(self):
+        for n in range(3):
+            self.cache.store([1.0, float(n)], frozenset({n}), f"reply {n}")
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], frozenset({0})))
+
+    def test_new_index_version_drops_cache(self):
+        old = response_cache.for_index(9001, "v1")
+        old.store([1.0, 0.0], self.items, "old menu answer")
+        self.assertIs(response_cache.for_index(9001, "v1"), old)
+
+        new = response_cache.for_index(9001, "v2")
+        self.assertIsNot(new, old)
+        self.assertIsNone(new.lookup([1.0, 0.0], self.items))
+
+
+class EngineSearchTests(SimpleTestCase):
+    def hit(self, score, match):
+        return {"index": 0, "text": "Item: Gulab Jamun", "score": score, "match": match}
+
+    def test_only_semantic_rankings_face_the_cosine_cutoff(self):
+        self.assertIn("not on our menu", engine._search_miss("pizza", [self.hit(0.2, "semantic")]).reply)
+        self.assertIsNone(engine._search_miss("jamun", [self.hit(0.9, "semantic")]))
+        # BM25 matched a word: the fused / lexical top hit stays, whatever its cosine
+        self.assertIsNone(engine._search_miss("jamun", [self.hit(0.1, "hybrid")]))
+        self.assertIsNone(engine._search_miss("gulab jamun", [self.hit(1.0, "lexical")]))
+        self.assertIn("couldn't find", engine._search_miss("pizza", []).reply)
+
+    def test_pickled_lexical_index_reaches_the_search_index(self):
+        lexical = {"postings": {}, "doc_len": [], "name_tokens": [], "k1": 1.5, "b": 0.75}
+        self.assertIs(engine._extras_from_payload({"lexical": lexical}, None)["lexical"], lexical)
+
+
+class MenuChatbotReplyCacheTests(SimpleTestCase):
+    def setUp(self):
+        from .chatbott import MenuChatbot
+
+        # no embeddings file / encoder model: only the cache wiring
+        self.bot = MenuChatbot.__new__(MenuChatbot)
+        self.bot.encode = lambda text: [1.0, 0.0]
+        self.bot.response_cache = response_cache.SemanticResponseCache()
+        self.bot.conversations = OrderedDict()
+        self.bot.conversations_lock = threading.Lock()
+        self.results = [{"metadata": {"menu_item_id": 1, "name": "Paneer Tikka"}}]
+
+    def test_first_turn_uses_cache(self):
+        cached, key = self.bot.cached_reply("veg starters?", self.results)
+        self.assertIsNone(cached)
+        self.bot.response_cache.store(*key, "Try the Paneer Tikka.")
+        self.assertEqual(self.bot.cached_reply("veg starters?", self.results)[0], "Try the Paneer Tikka.")
+
+    def test_follow_up_with_history_skips_cache(self):
+        _, key = self.bot.cached_reply("is it spicy?", self.results)
+        self.bot.response_cache.store(*key, "Yes, the Paneer Tikka is spicy.")
+        # "it" now refers to whatever the earlier turns were about
+        self.bot.remember_turn("tell me about the lassi", "Sweet Lassi is ₹60.", "sess_a")
+        self.assertEqual(self.bot.cached_reply("is it spicy?", self.results, "sess_a"), (None, None))
+
+    def test_other_visitor_hits_cache_after_bot_answered(self):
+        # the bot is shared per restaurant: visitor A's turns must not shut B out of the cache
+        _, key = self.bot.cached_reply("veg starters?", self.results, "sess_a")
+        self.bot.response_cache.store(*key, "Try the Paneer Tikka.")
+        self.bot.remember_turn("veg starters?", "Try the Paneer Tikka.", "sess_a")
+
+        self.assertEqual(self.bot.cached_reply("veg starters?", self.results, "sess_b")[0], "Try the Paneer Tikka.")
+        self.assertEqual(self.bot.conversation("sess_b").history, [])
+        self.assertEqual(len(self.bot.conversation("sess_a").history), 2)
+
+
+def turn(question, answer):
+    return [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+
+
+@override_settings(CHATBOT_HISTORY_MESSAGES=4, CHATBOT_HISTORY_MESSAGE_TOKENS=150)
+class PromptBudgetTests(SimpleTestCase):
+    """fit_history() / fit_context() (chatbot/prompt_budget.py)."""
+
+    HISTORY = [
+        *turn("question 0 about paneer", "answer 0"),
+        *turn("2", "details of item 2"),
+        *turn("question 2 about paneer", "answer 2"),
+        *turn("question 3 about paneer", "answer 3"),
+    ]
+
+    def test_window_keeps_recent_turns_and_summarises_older_questions(self):
+        fitted = prompt_budget.fit_history(self.HISTORY, 1000)
+        self.assertEqual(fitted[1:], self.HISTORY[-4:])
+        # numbered picks mean nothing out of context: left out of the summary
+        self.assertEqual(fitted[0], {
+            "role": "system",
+            "content": "Earlier in this conversation the customer asked about: question 0 about paneer",
+        })
+
+    def test_old_menus_are_compacted(self):
+        menu = (
+            "Here you go:\n\n📋 MENU OPTIONS:\n====\n1. Paneer Tikka - ₹240\n2. Paneer 65 (spicy) - ₹220\n====\n\n"
+            "💬 Reply with a number (1-2) to learn more about that item!"
+        )
+        fitted = prompt_budget.fit_history(turn("paneer?", menu), 1000)
+        self.assertEqual(fitted[1]["content"], "Here you go:\n\n[listed: Paneer Tikka, Paneer 65]")
+
+    @override_settings(CHATBOT_HISTORY_MESSAGE_TOKENS=3)
+    def test_long_messages_are_truncated(self):
+        fitted = prompt_budget.fit_history(turn("one two three four five", "ok"), 1000)
+        self.assertEqual(fitted[0]["content"], "one two …")
+
+    def test_budget_never_keeps_a_reply_without_its_question(self):
+        # room for "answer 2" but not for its question
+        budget = prompt_budget.count_message_tokens(self.HISTORY[-3:]) + 2
+        fitted = prompt_budget.fit_history(self.HISTORY, budget)
+        self.assertEqual(fitted, self.HISTORY[-2:])
+        self.assertLessEqual(prompt_budget.count_message_tokens(fitted), budget)
+
+    def test_history_starting_with_an_assistant_turn(self):
+        history = [{"role": "assistant", "content": "Welcome! Ask me anything."}, *turn("veg starters?", "Try the Paneer Tikka.")]
+        self.assertEqual(prompt_budget.fit_history(history, 1000), history[1:])
+        # nothing of it fits: nothing is sent
+        self.assertEqual(prompt_budget.fit_history(history, 5), [])
+
+    def test_context_keeps_rank_order_within_budget(self):
+        blocks = ["Item 1: Paneer Tikka", "Item 2: Paneer 65", "Item 3: " + "very " * 40 + "long", "Item 4: Lassi"]
+        budget = prompt_budget.count_tokens(blocks[0] + blocks[1]) + 5
+        # a lower-ranked item that would still fit doesn't jump the queue
+        self.assertEqual(prompt_budget.fit_context(blocks, budget), blocks[:2])
+
+    def test_best_hit_is_kept_even_over_budget(self):
+        kept = prompt_budget.fit_context(["Item 1: " + "very " * 40 + "long", "Item 2: Lassi"], 10)
+        self.assertEqual(len(kept), 1)
+        self.assertTrue(kept[0].startswith("Item 1: very") and kept[0].endswith(" …"))
+        self.assertLessEqual(prompt_budget.count_tokens(kept[0]), 10 + 1)  # + the ellipsis
+
+    def test_question_picks_the_context_fields(self):
+        self.assertEqual(prompt_budget.context_fields("any nuts in the korma?"), ({"allergens"}, False))
+        self.assertEqual(prompt_budget.context_fields("what's in it?"), ({"ingredients"}, False))
+        fields, full = prompt_budget.context_fields("tell me about the biryani")
+        self.assertEqual((fields, full), ({"ingredients", "allergens", "dietary_info"}, True))
+
+
+@override_settings(
+    CHAT_RATE_CLIENT_PER_MINUTE=1, CHAT_RATE_CLIENT_BURST=1,
+    CHAT_RATE_IP_PER_MINUTE=1, CHAT_RATE_IP_BURST=3,
+    CHAT_RATE_RESTAURANT_PER_MINUTE=1, CHAT_RATE_RESTAURANT_BURST=2,
+    CHAT_TENANT_MAX_INFLIGHT=1, CHAT_TENANT_QUEUE_SECONDS=0,
+)
+class ChatThrottlingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().post("/api/chatbot/chat/")
+
+    def allowed(self, session_id, ip="127.0.0.1", restaurant_id=7):
+        self.request.META["REMOTE_ADDR"] = ip
+        return not throttling.check_chat_rate(self.request, restaurant_id, session_id)
+
+    def tokens(self, bucket):
+        return cache.get(throttling._key("bucket", bucket))[0]
+
+    def test_client_denial_leaves_restaurant_tokens(self):
+        self.assertTrue(self.allowed("a"))
+        self.assertFalse(self.allowed("a"))
+        self.assertFalse(self.allowed("a"))
+        # the restaurant's second token is still there for another visitor
+        self.assertTrue(self.allowed("b"))
+        self.assertFalse(self.allowed("c"))
+
+    def test_restaurant_denial_gives_client_tokens_back(self):
+        self.assertTrue(self.allowed("a"))
+        self.assertTrue(self.allowed("b"))
+        self.assertFalse(self.allowed("c"))
+        self.assertEqual(self.tokens("client:ip:127.0.0.1:session:c"), 1.0)
+        self.assertAlmostEqual(self.tokens("ip:127.0.0.1"), 1.0, places=2)
+
+    def test_new_session_ids_do_not_get_past_the_ip_limit(self):
+        for n in range(3):
+            self.assertTrue(self.allowed(f"s{n}", restaurant_id=n))
+        self.assertFalse(self.allowed("s3", restaurant_id=3))
+        # someone else's address (e.g. another guest on mobile data)
+        self.assertTrue(self.allowed("s3", ip="10.0.0.2", restaurant_id=3))
+
+    def test_slot_is_freed_on_release(self):
+        release = throttling.acquire_tenant_slot(7)
+        with self.assertRaises(throttling.TenantBusy):
+            throttling.acquire_tenant_slot(7)
+        release()
+        throttling.acquire_tenant_slot(7)()
+
+    def test_slot_is_freed_when_stream_never_starts(self):
+        release = throttling.acquire_tenant_slot(7)
+
+        def events():
+            try:
+                yield "data: hi\n\n"
+            finally:
+                release()
+
+        # client gone before the first chunk: Django only closes the response
+        StreamingHttpResponse(throttling.ReleasingStream(events(), release)).close()
+        throttling.acquire_tenant_slot(7)()
+
+
+@override_settings(CHAT_TENANT_MAX_INFLIGHT=1, CHAT_TENANT_QUEUE_SECONDS=0)
+class MenuChatStreamTests(SimpleTestCase):
+    """/api/chatbot/chat/stream/ with a stubbed bot: SSE frames, TTFT, the tenant slot."""
+
+    def setUp(self):
+        cache.clear()
+        self.closed = []
+
+    def stream(self, *events, fail=False):
+        def chat_stream(message, session_id):
+            try:
+                yield from events
+                if fail:
+                    raise RuntimeError("provider down")
+            finally:
+                self.closed.append(session_id)
+
+        bot = mock.Mock(chat_stream=chat_stream)
+        with mock.patch("chatbot.views.get_chatbot_for_restaurant", return_value=bot):
+            return self.client.post(
+                "/api/chatbot/chat/stream/",
+                {"restaurant_id": 7, "session_id": "sess_sse", "message": "spicy starters?"},
+                content_type="application/json",
+            )
+
+    def frames(self, response):
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.endswith("\n\n"))
+        frames = []
+        for frame in body[:-2].split("\n\n"):
+            event, data = frame.split("\n")
+            frames.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return frames
+
+    def ttft_count(self):
+        return sum(v["count"] for v in views.CHAT_STREAM_TTFT.snapshot().values())
+
+    def test_answer_streams_as_sse_frames(self):
+        observed = self.ttft_count()
+        response = self.stream(("delta", "Paneer "), ("delta", "Tikka."), ("menu_list", "1. Paneer Tikka"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+        frames = self.frames(response)
+        self.assertEqual(frames[:3], [
+            ("delta", {"text": "Paneer "}), ("delta", {"text": "Tikka."}), ("menu_list", {"text": "1. Paneer Tikka"}),
+        ])
+        event, done = frames[3]
+        self.assertEqual((event, done["session_id"]), ("done", "sess_sse"))
+        self.assertLessEqual(0, done["ttft_ms"])
+        self.assertLessEqual(done["ttft_ms"], done["total_ms"])
+        # TTFT is observed once, at the first token
+        self.assertEqual(self.ttft_count(), observed + 1)
+
+    def test_failure_mid_stream_ends_with_error_then_done(self):
+        with self.assertLogs("chatbot.views", "ERROR") as logs:
+            frames = self.frames(self.stream(("delta", "Paneer "), fail=True))
+        self.assertEqual(logs.records[0].fields, {"restaurant_id": 7, "error": "provider down"})
+        self.assertEqual([event for event, _ in frames], ["delta", "error", "done"])
+        self.assertNotIn("provider", frames[1][1]["detail"])
+        throttling.acquire_tenant_slot(7)()
+
+    def test_no_token_yet_means_no_ttft(self):
+        with self.assertLogs("chatbot.views", "ERROR"):
+            frames = self.frames(self.stream(fail=True))
+        self.assertEqual([event for event, _ in frames], ["error", "done"])
+        self.assertIsNone(frames[1][1]["ttft_ms"])
+
+    def test_client_disconnect_releases_the_slot(self):
+        response = self.stream(("delta", "Paneer "), ("delta", "Tikka."))
+        self.assertEqual(next(iter(response.streaming_content)), b'event: delta\ndata: {"text": "Paneer "}\n\n')
+        # the restaurant's only slot is held by the open stream
+        with self.assertRaises(throttling.TenantBusy):
+            throttling.acquire_tenant_slot(7)
+
+        # client went away: Django closes the response, ReleasingStream frees the slot
+        response.close()
+        self.assertEqual(self.closed, ["sess_sse"])
+        throttling.acquire_tenant_slot(7)()
+
+
+@override_settings(CACHE_SHARED=True)
+class AsyncChatEndpointTests(TestCase):
+    """The ASGI chat views (same contract as the sync ones); intent parsing / the bot are stubbed."""
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        self.restaurant = Restaurant.objects.create(owner=owner, name="Only Kulchas")
+        with suspend_embedding_signals():
+            MenuItem.objects.create(
+                restaurant=self.restaurant, name="Amritsari Kulcha", price=Decimal("120"), external_item_id="k1"
+            )
+        recommendations.refresh(self.restaurant.id)
+
+    def parsed(self, result):
+        return mock.patch("chatbot.views.aparse_message", mock.AsyncMock(return_value=result))
+
+    async def post(self, path, **body):
+        return await self.async_client.post(
+            path, {"restaurant_id": self.restaurant.id, **body}, content_type="application/json"
+        )
+
+    async def test_simple_chat_adds_to_cart(self):
+        with self.parsed(intent("ADD_ITEM", item_name="Amritsari Kulcha", quantity=2)):
+            response = await self.post("/api/chatbot/simple/async/", message="2 kulcha please")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data["session_id"].startswith("sess_"))
+        self.assertEqual(data["order"]["total"], "240.00")
+        order = await Order.objects.aget(session_id=data["session_id"])
+        self.assertEqual(order.status, Order.OrderStatus.PENDING)
+
+    async def test_payment_failure_is_logged(self):
+        order = await Order.objects.acreate(restaurant=self.restaurant, session_id="sess_pay")
+        with self.parsed(intent("CONFIRM_ORDER")), \
+                mock.patch("chatbot.views.httpx.AsyncClient.post", side_effect=httpx.ConnectError("refused")), \
+                self.assertLogs("chatbot.views", "ERROR") as logs:
+            response = await self.post("/api/chatbot/simple/async/", session_id="sess_pay", message="confirm")
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(logs.records[0].getMessage(), "payment_create_failed")
+        self.assertEqual(logs.records[0].fields, {"order_id": order.id, "error": "refused"})
+
+    async def test_menu_chat_answers_per_session(self):
+        bot = mock.Mock(achat=mock.AsyncMock(return_value="Try the Amritsari Kulcha."))
+        with mock.patch("chatbot.views.get_chatbot_for_restaurant", return_value=bot):
+            response = await self.post("/api/chatbot/chat/async/", session_id="sess_menu", message="veg mains?")
+
+        self.assertEqual(response.json(), {"reply": "Try the Amritsari Kulcha.", "session_id": "sess_menu"})
+        bot.achat.assert_awaited_once_with("veg mains?", "sess_menu")
+
+    async def test_unknown_restaurant_costs_no_rate_tokens(self):
+        response = await self.post("/api/chatbot/simple/async/", restaurant_id=999, session_id="s", message="hi")
+        self.assertEqual(response.status_code, 404)
+        # 404 before any bucket: nobody can drain another tenant's (or a made-up) bucket
+        self.assertIsNone(await cache.aget(throttling._key("bucket", "restaurant:999")))
+        self.assertIsNone(await cache.aget(throttling._key("bucket", "ip:127.0.0.1")))
+
+    @override_settings(CHAT_RATE_CLIENT_PER_MINUTE=1, CHAT_RATE_CLIENT_BURST=1)
+    async def test_rate_limited_client_gets_429(self):
+        with self.parsed(intent("HELP")):
+            self.assertEqual((await self.post("/api/chatbot/simple/async/", session_id="s", message="hi")).status_code, 200)
+            response = await self.post("/api/chatbot/simple/async/", session_id="s", message="hi")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+
+@override_settings(CACHE_SHARED=True, CHAT_RATE_CLIENT_PER_MINUTE=1, CHAT_RATE_CLIENT_BURST=1)
+class ChatViewThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        self.restaurant = Restaurant.objects.create(owner=owner, name="Only Kulchas")
+        recommendations.refresh(self.restaurant.id)
+
+    def post(self, restaurant_id):
+        with mock.patch("chatbot.views.parse_message", return_value=intent("HELP")):
+            return self.client.post(
+                "/api/chatbot/simple/",
+                {"restaurant_id": restaurant_id, "session_id": "s", "message": "hi"},
+                content_type="application/json",
+            )
+
+    def test_buckets_are_charged_after_the_restaurant_lookup(self):
+        self.assertEqual(self.post(999).status_code, 404)
+        self.assertEqual(self.post("7; drop").status_code, 400)
+        self.assertEqual(self.post(self.restaurant.id).status_code, 200)
+
+        response = self.post(self.restaurant.id)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+
+@override_settings(CACHE_SHARED=True)
+class LoadTestCommandTests(TransactionTestCase):
+    """loadtest_chat --serve asgi/wsgi against the in-process app and the stub LLM."""
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        # committed: the served app reads it from its own threads / connections
+        self.restaurant = Restaurant.objects.create(owner=owner, name="Only Kulchas")
+        recommendations.refresh(self.restaurant.id)
+        self.addCleanup(setattr, llm, "_client_pid", None)
+
+    def run_command(self, *args):
+        # intent parsing without the encoder model, through the real LLM gateway (the command's stub)
+        def parse(message):
+            completion = llm.chat_completion(messages=[{"role": "user", "content": message}])
+            return ChatbotResult(intent="HELP", reply=llm.completion_text(completion))
+
+        async def aparse(message):
+            completion = await llm.achat_completion(messages=[{"role": "user", "content": message}])
+            return ChatbotResult(intent="HELP", reply=llm.completion_text(completion))
+
+        out, err = io.StringIO(), io.StringIO()
+        llm._client_pid = None
+        with mock.patch("chatbot.views.parse_message", parse), mock.patch("chatbot.views.aparse_message", aparse):
+            call_command(
+                "loadtest_chat", "--restaurant-id", str(self.restaurant.id), "--llm-latency", "0.05",
+                "--concurrency", "1,4", "--turns", "2", *args, stdout=out, stderr=err,
+            )
+        self.assertEqual(err.getvalue(), "")
+        rows = [line.split() for line in out.getvalue().splitlines()[2:]]
+        # conc, ok, err, ...
+        return [(int(r[0]), int(r[1]), int(r[2])) for r in rows]
+
+    def test_asgi(self):
+        self.assertEqual(self.run_command("--serve", "asgi", "--path", "/api/chatbot/simple/async/"), [(1, 2, 0), (4, 8, 0)])
+
+    def test_wsgi(self):
+        self.assertEqual(
+            self.run_command("--serve", "wsgi", "--threads", "4", "--path", "/api/chatbot/simple/"), [(1, 2, 0), (4, 8, 0)]
+        )
+
+    def test_needs_one_target(self):
+        with self.assertRaises(CommandError):
+            call_command("loadtest_chat", "--llm-latency", "0.1")
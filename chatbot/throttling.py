@@ -0,0 +1,223 @@
+# chatbot/throttling.py
+"""
+Rate limits for the public (AllowAny) chat endpoints.
+
+1) Token buckets in the shared Django cache (Redis in production):
+   - per client: client IP + session_id (a visitor behind a shared address
+     keeps their own bucket)
+   - per IP: all sessions from one address together, so minting a new
+     session_id per request doesn't get past the client limit
+   - per restaurant: one busy widget can't eat the provider quota of everyone
+   Buckets are taken in that order and handed back when a later one says no,
+   so a denied request costs nothing. The views call check_chat_rate() with
+   the restaurant they looked up (never the raw request field: anyone could
+   otherwise drain another tenant's bucket); DRF views via throttle_chat()
+   (429 + Retry-After).
+
+2) Per-restaurant cap on in-flight LLM requests (all processes): a request
+   waits up to CHAT_TENANT_QUEUE_SECONDS for a slot, then gets a 429, so a
+   spike at one restaurant queues there instead of slowing every tenant.
+   Each slot is its own cache key with a fixed lease (never renewed), so a
+   slot leaked by a killed worker frees itself after
+   CHAT_TENANT_SLOT_LEASE_SECONDS.
+
+Bucket updates are read-modify-write on the cache; two racing requests can
+both take the last token, which only ever over-admits by a request or two.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from restaurant_backend.observability import log_event
+
+logger = logging.getLogger(__name__)
+
+
+def _key(*parts) -> str:
+    return "chat-throttle:" + ":".join(str(p) for p in parts)
+
+
+# ------------------------------------------------------------
+# Token bucket
+# ------------------------------------------------------------
+def take_token(bucket: str, per_minute: float, burst: int) -> float:
+    """
+    Take one token from `bucket` (refills at per_minute/60 per second up to `burst`).
+    Returns 0 when allowed, else seconds until a token is available.
+    """
+    if per_minute <= 0:
+        return 0.0
+    rate = per_minute / 60.0
+    now = time.time()
+    key = _key("bucket", bucket)
+
+    tokens, updated = cache.get(key) or (float(burst), now)
+    tokens = min(float(burst), tokens + (now - updated) * rate)
+    if tokens < 1.0:
+        return (1.0 - tokens) / rate
+
+    # idle buckets expire once they would be full again anyway
+    cache.set(key, (tokens - 1.0, now), timeout=int(burst / rate) + 60)
+    return 0.0
+
+
+def give_back_token(bucket: str, per_minute: float, burst: int) -> None:
+    """Undo take_token() for a request another bucket turned away."""
+    if per_minute <= 0:
+        return
+    key = _key("bucket", bucket)
+    state = cache.get(key)
+    if state:
+        tokens, updated = state
+        cache.set(key, (min(float(burst), tokens + 1.0), updated), timeout=int(burst * 60 / per_minute) + 60)
+
+
+def client_ip(request) -> str:
+    # honours REST_FRAMEWORK["NUM_PROXIES"] for X-Forwarded-For
+    return BaseThrottle().get_ident(request)
+
+
+def _buckets(request, restaurant_id: int, session_id: str | None):
+    """(bucket, per_minute, burst) in the order tokens are taken."""
+    ip = client_ip(request)
+    return [
+        # client first: one chatty visitor over their limit mustn't drain the shared buckets
+        (f"client:ip:{ip}:session:{session_id or ''}", settings.CHAT_RATE_CLIENT_PER_MINUTE, settings.CHAT_RATE_CLIENT_BURST),
+        (f"ip:{ip}", settings.CHAT_RATE_IP_PER_MINUTE, settings.CHAT_RATE_IP_BURST),
+        (f"restaurant:{restaurant_id}", settings.CHAT_RATE_RESTAURANT_PER_MINUTE, settings.CHAT_RATE_RESTAURANT_BURST),
+    ]
+
+
+def check_chat_rate(request, restaurant_id: int, session_id: str | None = None) -> float:
+    """
+    0 if the chat request may proceed, else Retry-After seconds.
+    `restaurant_id` is the looked-up restaurant's id, never the unvalidated request field.
+    """
+    taken = []
+    for bucket in _buckets(request, restaurant_id, session_id):
+        wait = take_token(*bucket)
+        if wait:
+            for earlier in taken:
+                give_back_token(*earlier)
+            return wait
+        taken.append(bucket)
+    return 0.0
+
+
+def throttle_chat(request, restaurant_id: int, session_id: str | None = None) -> None:
+    """check_chat_rate() for DRF views: raises Throttled (429 + Retry-After)."""
+    wait = check_chat_rate(request, restaurant_id, session_id)
+    if wait:
+        raise Throttled(wait=wait)
+
+
+# ------------------------------------------------------------
+# Per-tenant in-flight LLM requests
+# ------------------------------------------------------------
+class TenantBusy(Throttled):
+    default_detail = "This restaurant's assistant is busy right now, please retry in a moment."
+    default_code = "tenant_busy"
+
+
+def _try_acquire(restaurant_id):
+    """(slot key, holder token) of a free slot, or None when all are taken."""
+    limit = settings.CHAT_TENANT_MAX_INFLIGHT
+    if limit <= 0:
+        return "", ""
+    holder = uuid.uuid4().hex
+    for slot in range(limit):
+        key = _key("inflight", restaurant_id, slot)
+        # add() is atomic (SET NX on Redis); the lease is never renewed
+        if cache.add(key, holder, timeout=settings.CHAT_TENANT_SLOT_LEASE_SECONDS):
+            return key, holder
+    return None
+
+
+def _release(slot) -> None:
+    key, holder = slot
+    # after the lease ran out the key may belong to another request already
+    if key and cache.get(key) == holder:
+        cache.delete(key)
+
+
+def _retry_after() -> int:
+    return max(1, round(settings.CHAT_TENANT_QUEUE_SECONDS))
+
+
+def acquire_tenant_slot(restaurant_id):
+    """
+    Take one of the restaurant's in-flight LLM slots, waiting in line up to
+    CHAT_TENANT_QUEUE_SECONDS; raises TenantBusy (429). Returns an idempotent
+    release() - for responses that outlive the view (SSE streams).
+    """
+    deadline = time.monotonic() + settings.CHAT_TENANT_QUEUE_SECONDS
+    while (slot := _try_acquire(restaurant_id)) is None:
+        if time.monotonic() >= deadline:
+            log_event(logger, "chat_tenant_busy", logging.WARNING, restaurant_id=restaurant_id)
+            raise TenantBusy(wait=_retry_after())
+        time.sleep(settings.CHAT_TENANT_QUEUE_POLL_SECONDS)
+
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            _release(slot)
+
+    return release
+
+
+class ReleasingStream:
+    """
+    StreamingHttpResponse content that calls release() when the response is
+    closed. Django closes the response even if the client went away before
+    the first chunk, when a generator's own finally never runs.
+    """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        return iter(self._stream)
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+@contextmanager
+def tenant_llm_slot(restaurant_id):
+    """Hold one of the restaurant's in-flight LLM slots for the block."""
+    release = acquire_tenant_slot(restaurant_id)
+    try:
+        yield
+    finally:
+        release()
+
+
+@asynccontextmanager
+async def atenant_llm_slot(restaurant_id):
+    """Async tenant_llm_slot(): waiting doesn't block the event loop."""
+    from asgiref.sync import sync_to_async
+
+    deadline = time.monotonic() + settings.CHAT_TENANT_QUEUE_SECONDS
+    while (slot := await sync_to_async(_try_acquire, thread_sensitive=False)(restaurant_id)) is None:
+        if time.monotonic() >= deadline:
+            log_event(logger, "chat_tenant_busy", logging.WARNING, restaurant_id=restaurant_id)
+            raise TenantBusy(wait=_retry_after())
+        await asyncio.sleep(settings.CHAT_TENANT_QUEUE_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        await sync_to_async(_release, thread_sensitive=False)(slot)
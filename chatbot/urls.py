@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
+    AsyncMenuChatAPIView,
+    AsyncSimpleChatbotView,
     MenuChatAPIView,
+    MenuChatStreamAPIView,
     SimpleChatbotView,
     ChatbotWidgetDemoView,
     CategoryListView,
@@ -10,8 +14,15 @@ from .views import (
     MenuChatFrontendView,
 )
 
+# ASGI deployments serve the main chat URLs from the async views
+if settings.CHATBOT_ASYNC_VIEWS:
+    simple_chat_view, menu_chat_view = AsyncSimpleChatbotView, AsyncMenuChatAPIView
+else:
+    simple_chat_view, menu_chat_view = SimpleChatbotView, MenuChatAPIView
+
 urlpatterns = [
-    path("simple/", SimpleChatbotView.as_view(), name="chatbot-simple"),
+    path("simple/", simple_chat_view.as_view(), name="chatbot-simple"),
+    path("simple/async/", AsyncSimpleChatbotView.as_view(), name="chatbot-simple-async"),
     path("widget-demo/", ChatbotWidgetDemoView.as_view(), name="chatbot-demo-ui"),
     path("categories/", CategoryListView.as_view(), name="chatbot_categories"),
 
@@ -31,5 +42,7 @@ urlpatterns = [
     ),
 
     path("chatui/", MenuChatFrontendView.as_view(), name="widget-demo"),
-    path("chat/", MenuChatAPIView.as_view(), name="menu_chat_drf"),
+    path("chat/", menu_chat_view.as_view(), name="menu_chat_drf"),
+    path("chat/async/", AsyncMenuChatAPIView.as_view(), name="menu_chat_async"),
+    path("chat/stream/", MenuChatStreamAPIView.as_view(), name="menu_chat_stream"),
 ]
@@ -1,4 +1,5 @@
 # chatbot/views.py
+import logging
 import uuid
 import requests
 from django.conf import settings
@@ -10,11 +11,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from django.http import Http404, HttpResponse
 from menu.models import MenuItem  # 👈 add this
+from menu.snapshot import etag as menu_etag, etag_matches, get_snapshot as get_menu_snapshot, menu_version
 from django.db.models import Count
+from restaurant_backend.db import ReplicaReadMixin
+from restaurant_backend.observability import log_event
 from restaurants.models import Restaurant
+from restaurants.tenant import request_restaurant
 from .serializers import ChatRequestSerializer
 from .engine import parse_message
+from .throttling import (
+    ReleasingStream,
+    TenantBusy,
+    acquire_tenant_slot,
+    atenant_llm_slot,
+    check_chat_rate,
+    tenant_llm_slot,
+    throttle_chat,
+)
 from .services import apply_intent
 from orders.models import Order   # ✅ add this
 from chatbot.models import RestaurantWidget
@@ -25,6 +40,8 @@ from datetime import timedelta
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 
+logger = logging.getLogger(__name__)
+
 from rest_framework.authentication import SessionAuthentication
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
@@ -47,7 +64,7 @@ from restaurants.models import Restaurant
 from .models import RestaurantWidget  # jahan bhi defined hai
 
 
-class WidgetSettingsApiView(APIView):
+class WidgetSettingsApiView(ReplicaReadMixin, APIView):
     """
     API endpoint (JWT protected) that returns:
     - restaurant info (including logo_url)
@@ -68,7 +85,7 @@ class WidgetSettingsApiView(APIView):
         return None
 
     def get(self, request, *args, **kwargs):
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = request_restaurant(request)
         if not restaurant:
             return Response(
                 {"detail": "You are not linked to any restaurant."},
@@ -148,7 +165,7 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.clickjacking import xframe_options_exempt
 
 @method_decorator(xframe_options_exempt, name="dispatch")
-class PublicWidgetView(TemplateView):
+class PublicWidgetView(ReplicaReadMixin, TemplateView):
     """
     Public iframe page: /widget/?token=XXX
     """
@@ -173,6 +190,35 @@ class ChatbotWidgetDemoView(TemplateView):
     template_name = "chatbot_widget_demo.html"
 
 
+def _payment_reply(session_id, data):
+    """Chat payload that opens the Razorpay popup in the widget."""
+    return {
+        "reply": "Please complete your payment to confirm the order.",
+        "session_id": session_id,
+        "payment": {
+            "key": data["key"],
+            "order_id": data["razorpay_order_id"],
+            "amount": data["amount"],
+            "currency": data["currency"],
+        },
+    }
+
+
+PAYMENT_CREATE_FAILED_REPLY = "⚠️ Cannot process payment — there should be atleast one order."
+
+
+def _chat_payload(reply_text, session_id, order_data, extra):
+    """Reply + order snapshot from apply_intent (+ any extra UI payload like menu_items)."""
+    payload = {
+        "reply": reply_text,
+        "session_id": session_id,
+        "order": order_data,
+    }
+    if extra:
+        payload.update(extra)
+    return payload
+
+
 @method_decorator(csrf_exempt, name="dispatch")
 class SimpleChatbotView(APIView):
     permission_classes = [AllowAny]
@@ -187,11 +233,14 @@ class SimpleChatbotView(APIView):
         message = serializer.validated_data["message"]
 
         restaurant = get_object_or_404(Restaurant, id=restaurant_id)
+        # rate buckets only for a restaurant that exists (429 + Retry-After)
+        throttle_chat(request, restaurant.id, session_id)
         if not session_id:
             session_id = f"sess_{uuid.uuid4().hex[:16]}"
 
-        # 1️⃣ Parse message → intent
-        result = parse_message(message)
+        # 1️⃣ Parse message → intent (LLM calls count against the restaurant's in-flight cap)
+        with tenant_llm_slot(restaurant_id):
+            result = parse_message(message)
 
         # 2️⃣ Handle CONFIRM_ORDER intent separately (payment trigger)
         if result.intent == "CONFIRM_ORDER":
@@ -215,29 +264,15 @@ class SimpleChatbotView(APIView):
                     msg = r.json().get("detail", "Unable to create payment.")
                     return Response(
                         {
-                            "reply": f"⚠️ Cannot process payment — there should be atleast one order.",
+                            "reply": PAYMENT_CREATE_FAILED_REPLY,
                             "session_id": session_id,
                         },
                         status=status.HTTP_200_OK,
                     )
 
-                data = r.json()
-
-                return Response(
-                    {
-                        "reply": "Please complete your payment to confirm the order.",
-                        "session_id": session_id,
-                        "payment": {
-                            "key": data["key"],
-                            "order_id": data["razorpay_order_id"],
-                            "amount": data["amount"],
-                            "currency": data["currency"],
-                        },
-                    },
-                    status=status.HTTP_200_OK,
-                )
+                return Response(_payment_reply(session_id, r.json()), status=status.HTTP_200_OK)
             except Exception as e:
-                print("Payment creation error:", e)
+                log_event(logger, "payment_create_failed", logging.ERROR, order_id=order.id, error=str(e))
                 return Response(
                     {"reply": "Something went wrong creating the payment."},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -246,39 +281,13 @@ class SimpleChatbotView(APIView):
 
         # 3️⃣ For all other intents → process normally
                 # 3️⃣ For all other intents → process normally
-        reply_text, order, extra = apply_intent(restaurant, session_id, result)
+        reply_text, order_data, extra = apply_intent(restaurant, session_id, result)
 
-        # 4️⃣ Prepare order snapshot
-        items_data = [
-            {
-                "id": item.menu_item.id,
-                "name": item.name,
-                "quantity": item.quantity,
-                "unit_price": str(item.unit_price),
-                "total_price": str(item.total_price),
-            }
-            for item in order.items.select_related("menu_item").all()
-        ]
-
-        order_data = {
-            "id": order.id,
-            "status": order.status,
-            "subtotal": str(order.subtotal),
-            "tax": str(order.tax),
-            "total": str(order.total),
-            "items": items_data,
-        }
-
-        # 5️⃣ Return chat response (+ any extra UI payload like menu_items)
-        payload = {
-            "reply": reply_text,
-            "session_id": session_id,
-            "order": order_data,
-        }
-        if extra:
-            payload.update(extra)
-
-        return Response(payload, status=status.HTTP_200_OK)
+        # 4️⃣ Order snapshot + chat response (+ any extra UI payload like menu_items)
+        return Response(
+            _chat_payload(reply_text, session_id, order_data, extra),
+            status=status.HTTP_200_OK,
+        )
 
 
 # class PopularItemsView(APIView):
@@ -330,7 +339,7 @@ class SimpleChatbotView(APIView):
 #         return Response({"items": items}, status=status.HTTP_200_OK)
 
 
-class CategoryListView(APIView):
+class CategoryListView(ReplicaReadMixin, APIView):
     permission_classes = [AllowAny]
     authentication_classes = []
 
@@ -339,24 +348,20 @@ class CategoryListView(APIView):
         if not restaurant_id:
             return Response({"detail": "restaurant_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        restaurant = get_object_or_404(Restaurant, id=restaurant_id)
-
-        qs = (
-            MenuItem.objects.filter(
-                restaurant=restaurant,
-                available=True,
-                is_active=True,   # (optional but recommended if you use it)
-            )
-            .exclude(category__isnull=True)
-            .exclude(category__name__isnull=True)
-            .exclude(category__name__exact="")
-            .values_list("category__name", flat=True)   # ✅ return names
-            .distinct()
-            .order_by("category__name")
+        # ✅ names precomputed in the menu snapshot (no distinct join per request)
+        current = menu_etag(restaurant_id, menu_version(restaurant_id))
+        if etag_matches(request, current):
+            return HttpResponse(status=304, headers={"ETag": current})
+
+        snapshot = get_menu_snapshot(restaurant_id)
+        if snapshot is None:
+            raise Http404("No Restaurant matches the given query.")
+        return HttpResponse(
+            snapshot["categories_json"],
+            content_type="application/json",
+            headers={"ETag": snapshot["etag"], "Cache-Control": "no-cache"},
         )
 
-        return Response({"categories": list(qs)}, status=status.HTTP_200_OK)
-
 
 
 
@@ -388,11 +393,10 @@ from rest_framework.response import Response
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import AllowAny
 from .serializers import MenuChatRequestSerializer
-from menu.tasks import get_embeddings_path  # helper jo embeddings path deta hai
+from menu.index_store import current_index
 
 import os
 from .chatbott import MenuChatbot
-from menu.tasks import get_embeddings_path
 
 CHATBOT_CACHE: dict[int, dict] = {}
 
@@ -400,34 +404,34 @@ CHATBOT_CACHE: dict[int, dict] = {}
 def get_chatbot_for_restaurant(restaurant_id: int) -> MenuChatbot:
     """
     Har restaurant ke liye ek hi MenuChatbot instance banega,
-    lekin agar embeddings file update ho jaaye to auto-reload ho jaayega.
+    lekin agar naya index version publish ho jaaye to auto-reload ho jaayega.
     """
-    embeddings_path = get_embeddings_path(restaurant_id)
+    current = current_index(restaurant_id)
 
-    if not os.path.exists(embeddings_path):
+    if current is None:
         raise FileNotFoundError(
-            f"Embeddings file not found for restaurant {restaurant_id}: {embeddings_path}"
+            f"Embeddings file not found for restaurant {restaurant_id}"
         )
 
-    # current file ka modified time
-    current_mtime = os.path.getmtime(embeddings_path)  # isse file ka last modified time mil jayega jisse hum compare karenge 
+    # published version (manifest) → files are immutable, so no mtime race
+    embeddings_path, current_version = current
 
-    # 1) Cache hit + file unchanged → purana bot use karo
+    # 1) Cache hit + same version → purana bot use karo
     if restaurant_id in CHATBOT_CACHE:
         entry = CHATBOT_CACHE[restaurant_id]
         bot = entry["bot"]
-        cached_mtime = entry["mtime"]
+        cached_version = entry["version"]
 
-        if cached_mtime == current_mtime:
+        if cached_version == current_version:
             print(
-                f"[chatbot-cache] HIT | restaurant_id={restaurant_id} | mtime={current_mtime}"
+                f"[chatbot-cache] HIT | restaurant_id={restaurant_id} | version={current_version}"
             )
             return bot
 
-        # 2) Cache hit, lekin file change ho chuki → reload karna padega
+        # 2) Cache hit, lekin naya version aa gaya → reload karna padega
         print(
             f"[chatbot-cache] STALE | restaurant_id={restaurant_id} | "
-            f"old_mtime={cached_mtime} new_mtime={current_mtime} → reloading MenuChatbot"
+            f"old_version={cached_version} new_version={current_version} → reloading MenuChatbot"
         )
 
     else:
@@ -437,12 +441,12 @@ def get_chatbot_for_restaurant(restaurant_id: int) -> MenuChatbot:
 
     # yahan aaoge agar:
     # - ya to first time call hai
-    # - ya embeddings file update ho gayi hai
+    # - ya naya index version publish hua hai
     bot = MenuChatbot(embeddings_path)
 
     CHATBOT_CACHE[restaurant_id] = {
         "bot": bot,
-        "mtime": current_mtime,
+        "version": current_version,
     }
 
     return bot
@@ -453,7 +457,7 @@ class MenuChatAPIView(GenericAPIView):
     """
     DRF CBV:
     - Browsable API se HTML form mil jaayega (serializer ke basis pe)
-    - POST: {message, restaurant_id} leke reply return karega
+    - POST: {message, restaurant_id, session_id?} leke reply return karega
     """
     permission_classes = [AllowAny]
     authentication_classes = []
@@ -479,10 +483,242 @@ class MenuChatAPIView(GenericAPIView):
         except FileNotFoundError as e:
             return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
 
-        reply = bot.chat(user_message)
-        return Response({"reply": reply}, status=status.HTTP_200_OK)
+        throttle_chat(request, restaurant_id, serializer.validated_data.get("session_id"))
+        session_id = _menu_chat_session(serializer)
+        with tenant_llm_slot(restaurant_id):
+            reply = bot.chat(user_message, session_id)
+        return Response({"reply": reply, "session_id": session_id}, status=status.HTTP_200_OK)
+
+
+
+
 
+import json
+import time
 
+from django.http import StreamingHttpResponse
 
+from restaurant_backend.metrics import histogram
 
+CHAT_STREAM_TTFT = histogram(
+    "chat_stream_ttft_seconds", "Request start to first streamed token (menu chat SSE)"
+)
+CHAT_STREAM_DURATION = histogram(
+    "chat_stream_duration_seconds", "Request start to end of stream (menu chat SSE)"
+)
 
+
+def _menu_chat_session(serializer) -> str:
+    # a fresh id starts a conversation with no history (and a reply-cache lookup)
+    return serializer.validated_data.get("session_id") or f"sess_{uuid.uuid4().hex[:16]}"
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class MenuChatStreamAPIView(GenericAPIView):
+    """
+    Same input as MenuChatAPIView, but the reply comes back as Server-Sent Events:
+
+        event: delta      data: {"text": "..."}     (LLM tokens as they arrive)
+        event: menu_list  data: {"text": "..."}     (numbered selection list, after the answer)
+        event: done       data: {"ttft_ms": ..., "total_ms": ..., "session_id": ...}
+        event: error      data: {"detail": "..."}
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    serializer_class = MenuChatRequestSerializer
+
+    def post(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user_message = serializer.validated_data["message"].strip()
+        restaurant_id = serializer.validated_data["restaurant_id"]
+
+        if not user_message:
+            return Response(
+                {"message": ["This field may not be blank."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            bot = get_chatbot_for_restaurant(restaurant_id)
+        except FileNotFoundError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        throttle_chat(request, restaurant_id, serializer.validated_data.get("session_id"))
+        # slot is held until the stream ends (429 here if the restaurant is saturated);
+        # released when the response is closed, also if the stream never started
+        release_slot = acquire_tenant_slot(restaurant_id)
+        response = StreamingHttpResponse(
+            ReleasingStream(
+                self._events(bot, user_message, _menu_chat_session(serializer), restaurant_id, started, release_slot),
+                release_slot,
+            ),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # nginx: don't buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def _events(self, bot, user_message, session_id, restaurant_id, started, release_slot):
+        ttft = None
+        try:
+            for event, text in bot.chat_stream(user_message, session_id):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    CHAT_STREAM_TTFT.observe(ttft, endpoint="menu_chat")
+                yield _sse(event, {"text": text})
+        except Exception as e:
+            log_event(logger, "chat_stream_failed", logging.ERROR, restaurant_id=restaurant_id, error=str(e))
+            yield _sse("error", {"detail": "Something went wrong, please try again."})
+        finally:
+            release_slot()
+
+        total = time.perf_counter() - started
+        CHAT_STREAM_DURATION.observe(total, endpoint="menu_chat")
+        ttft_ms = round(ttft * 1000, 1) if ttft is not None else None
+        log_event(logger, "chat_stream", restaurant_id=restaurant_id, ttft_ms=ttft_ms, total_ms=round(total * 1000, 1))
+        yield _sse("done", {"ttft_ms": ttft_ms, "total_ms": round(total * 1000, 1), "session_id": session_id})
+
+
+# ============================================================
+# ASGI (async) chat endpoints
+# ------------------------------------------------------------
+# Same request/response contract as SimpleChatbotView / MenuChatAPIView,
+# but the LLM round trips are awaited, so under ASGI (uvicorn/daphne) one
+# process keeps serving other conversations while a reply is being generated.
+# Encoder + scoring run in worker threads, ORM work via sync_to_async.
+# Under WSGI these still work (Django runs them in a per-request event loop).
+# ============================================================
+import asyncio
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+
+from .engine import aparse_message
+
+
+def _throttled(wait, detail="Request was throttled.") -> JsonResponse:
+    response = JsonResponse({"detail": detail}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response["Retry-After"] = str(max(1, int(wait + 0.999)))
+    return response
+
+
+def _json_body(request) -> dict:
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST.dict()
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncSimpleChatbotView(View):
+    http_method_names = ["post", "options"]
+
+    async def post(self, request, *args, **kwargs):
+        serializer = ChatRequestSerializer(data=_json_body(request))
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        restaurant_id = serializer.validated_data["restaurant_id"]
+        session_id = serializer.validated_data.get("session_id") or ""
+        message = serializer.validated_data["message"]
+
+        restaurant = await Restaurant.objects.filter(id=restaurant_id).afirst()
+        if restaurant is None:
+            return JsonResponse({"detail": "No Restaurant matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+
+        wait = await sync_to_async(check_chat_rate)(request, restaurant.id, session_id)
+        if wait:
+            return _throttled(wait)
+        if not session_id:
+            session_id = f"sess_{uuid.uuid4().hex[:16]}"
+
+        # 1️⃣ Parse message → intent (LLM awaited, encoder in a thread)
+        try:
+            async with atenant_llm_slot(restaurant_id):
+                result = await aparse_message(message)
+        except TenantBusy as e:
+            return _throttled(e.wait, str(e.detail))
+
+        # 2️⃣ CONFIRM_ORDER → payment trigger
+        if result.intent == "CONFIRM_ORDER":
+            order = await Order.objects.filter(
+                restaurant=restaurant,
+                session_id=session_id,
+                status=Order.OrderStatus.PENDING,
+            ).afirst()
+
+            if not order:
+                return JsonResponse({"reply": "No open order found to confirm.", "session_id": session_id})
+
+            payments_api = request.build_absolute_uri("/api/payments/create/")
+            try:
+                async with httpx.AsyncClient(timeout=30) as client:
+                    r = await client.post(payments_api, json={"order_id": order.id})
+                if r.status_code != 200:
+                    return JsonResponse({"reply": PAYMENT_CREATE_FAILED_REPLY, "session_id": session_id})
+                return JsonResponse(_payment_reply(session_id, r.json()))
+            except Exception as e:
+                log_event(logger, "payment_create_failed", logging.ERROR, order_id=order.id, error=str(e))
+                return JsonResponse(
+                    {"reply": "Something went wrong creating the payment."},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+
+        # 3️⃣ Cart/DB work + order snapshot in one sync hop
+        def apply_and_snapshot():
+            reply_text, order_data, extra = apply_intent(restaurant, session_id, result)
+            return _chat_payload(reply_text, session_id, order_data, extra)
+
+        payload = await sync_to_async(apply_and_snapshot)()
+        return JsonResponse(payload)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncMenuChatAPIView(View):
+    """Async MenuChatAPIView: POST {message, restaurant_id, session_id?} → {"reply", "session_id"}."""
+    http_method_names = ["post", "options"]
+
+    async def post(self, request, *args, **kwargs):
+        serializer = MenuChatRequestSerializer(data=_json_body(request))
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user_message = serializer.validated_data["message"].strip()
+        restaurant_id = serializer.validated_data["restaurant_id"]
+
+        if not user_message:
+            return JsonResponse(
+                {"message": ["This field may not be blank."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            # first call per version loads the model + index from disk
+            bot = await asyncio.to_thread(get_chatbot_for_restaurant, restaurant_id)
+        except FileNotFoundError as e:
+            return JsonResponse({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        wait = await sync_to_async(check_chat_rate)(request, restaurant_id, serializer.validated_data.get("session_id"))
+        if wait:
+            return _throttled(wait)
+
+        session_id = _menu_chat_session(serializer)
+        try:
+            async with atenant_llm_slot(restaurant_id):
+                reply = await bot.achat(user_message, session_id)
+        except TenantBusy as e:
+            return _throttled(e.wait, str(e.detail))
+        return JsonResponse({"reply": reply, "session_id": session_id})
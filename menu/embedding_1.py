@@ -4,18 +4,33 @@ from sentence_transformers import SentenceTransformer
 import pickle
 from pathlib import Path
 from typing import List, Dict, Any
+
+from menu.index_store import atomic_open
+from menu.filters import build_columns
+from menu.lexical import BM25Index
+from menu.quantize import STORAGE_DTYPES, normalize_rows, quantize
 # import argparse
 
 class MenuEmbeddingGenerator:
-    def __init__(self, model_name: str = "sentence-transformers/all-mpnet-base-v2"):
+    def __init__(self, model_name: str = "sentence-transformers/all-mpnet-base-v2", storage: str = "float32"):
         """
         Initialize the embedding generator with a sentence transformer model.
         Force CPU usage only.
+
+        storage: dtype of the pickled matrix - "float32" (default), "float16" or
+        "int8" (per-dimension scales). Compact formats also write the exact
+        float32 rows to a "<name>.f32.npy" sidecar for re-ranking.
         """
+        if storage not in STORAGE_DTYPES:
+            raise ValueError(f"storage must be one of {STORAGE_DTYPES}, got {storage!r}")
+        self.storage = storage
         print(f"Loading model on CPU: {model_name}")
         self.model = SentenceTransformer(model_name, device="cpu")
         self.embeddings = []
         self.metadata = []
+        self.texts = []
+        self.lexical = None
+        self.columns = None
     
     def load_menu_json(self, json_path: str) -> Dict[str, Any]:
         """Load menu data from JSON file."""
@@ -96,34 +111,71 @@ class MenuEmbeddingGenerator:
         texts = [chunk['text'] for chunk in chunks]
         self.embeddings = self.model.encode(texts, show_progress_bar=True)
         self.metadata = [chunk['metadata'] for chunk in chunks]
+        self.texts = texts
         print(f"Generated {len(self.embeddings)} embeddings")
+        # keyword index over the same chunks (hybrid search, see menu/search_index.py)
+        self.lexical = BM25Index.build(texts, names=[m['name'] for m in self.metadata])
+        # typed filter columns (price / category / available / diet), row-aligned
+        self.columns = build_columns([
+            {**m['original_data'], 'price': m['price'], 'category': m['category']}
+            for m in self.metadata
+        ])
     
     def save_embeddings(self, output_path: str, format: str = 'pickle') -> None:
-        """Save embeddings + metadata to file."""
+        """
+        Save embeddings + metadata (+ chunk texts) to file.
+        Written atomically (temp file → fsync → rename): readers never see a partial file.
+        """
         output_path = Path(output_path)
         
         if format == 'pickle':
-            with open(output_path, 'wb') as f:
+            embeddings, embedding_format = self._storage_matrix(output_path)
+            with atomic_open(output_path, 'wb') as f:
                 pickle.dump({
-                    'embeddings': self.embeddings,
-                    'metadata': self.metadata
+                    'embeddings': embeddings,
+                    'embedding_format': embedding_format,
+                    'metadata': self.metadata,
+                    'texts': self.texts,
+                    'lexical': self.lexical.to_dict() if self.lexical else None,
+                    'columns': self.columns,
                 }, f)
         
         elif format == 'npz':
-            np.savez(output_path,
-                     embeddings=self.embeddings,
-                     metadata=np.array(self.metadata, dtype=object))
+            with atomic_open(output_path, 'wb') as f:
+                np.savez(f,
+                         embeddings=self.embeddings,
+                         metadata=np.array(self.metadata, dtype=object))
         
         elif format == 'json':
             data = {
                 'embeddings': self.embeddings.tolist(),
-                'metadata': self.metadata
+                'metadata': self.metadata,
+                'texts': self.texts,
             }
-            with open(output_path, 'w', encoding='utf-8') as f:
+            with atomic_open(output_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2)
         
         print(f"Saved embeddings to {output_path}")
     
+    def _storage_matrix(self, output_path: Path):
+        """(matrix to pickle, embedding_format or None); writes the exact sidecar first."""
+        if self.storage == 'float32':
+            return self.embeddings, None
+
+        unit = normalize_rows(self.embeddings)
+        compact, scale = quantize(unit, self.storage)
+
+        # sidecar is published before the pickle that points at it
+        exact_path = output_path.with_suffix('.f32.npy')
+        with atomic_open(exact_path, 'wb') as f:
+            np.save(f, unit)
+
+        return compact, {
+            'dtype': self.storage,
+            'scale': scale,
+            'exact_file': exact_path.name,
+        }
+
     def process_menu(self, json_path: str, output_path: str, format: str = 'pickle') -> None:
         menu_data = self.load_menu_json(json_path)
         chunks = self.create_text_chunks(menu_data)
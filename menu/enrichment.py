@@ -0,0 +1,272 @@
+# menu/enrichment.py
+"""
+Offline per-item attributes the chatbot used to read from raw JSON or ask the LLM for live.
+
+After a menu import (rebuild_menu_from_json) the enrichment task sends the
+items to the LLM in batches (one call for many items, JSON answer) and stores
+normalized values in typed MenuItem columns: diet, allergens, dietary_tags,
+calories. Items are skipped when their content hash is unchanged, each batch
+is saved on its own (a crashed run resumes where it stopped), and the task
+paces its calls (settings.MENU_ENRICHMENT_*).
+"""
+import hashlib
+import json
+import logging
+import re
+
+from restaurant_backend.llm import chat_completion, completion_text, is_configured as llm_configured
+from restaurant_backend.observability import log_event
+
+logger = logging.getLogger(__name__)
+
+# bump when the prompt/fields change: every item gets re-enriched once
+ENRICHMENT_VERSION = 2
+LLM_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+
+
+def content_hash(item) -> str:
+    """Hash of everything the enriched attributes depend on (MenuItem instance)."""
+    payload = json.dumps(
+        [
+            ENRICHMENT_VERSION,
+            item.name,
+            item.category.name if item.category_id else "",
+            item.description or "",
+            item.ingredients or [],
+        ],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _strip_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+ALLERGENS = (
+    "dairy", "gluten", "egg", "nuts", "peanuts", "soy",
+    "fish", "shellfish", "sesame", "mustard", "celery",
+)
+_ALLERGEN_ALIASES = {
+    "milk": "dairy", "lactose": "dairy", "cheese": "dairy", "paneer": "dairy", "butter": "dairy", "cream": "dairy",
+    "wheat": "gluten", "maida": "gluten",
+    "eggs": "egg",
+    "nut": "nuts", "tree nuts": "nuts", "cashew": "nuts", "almond": "nuts",
+    "peanut": "peanuts", "groundnut": "peanuts",
+    "soya": "soy",
+    "prawn": "shellfish", "shrimp": "shellfish", "crustacean": "shellfish",
+}
+DIETARY_TAGS = ("jain", "gluten_free", "spicy", "sugar_free", "contains_alcohol")
+_DIET_ALIASES = {
+    "veg": "VEG", "vegetarian": "VEG", "pure veg": "VEG",
+    "vegan": "VEGAN",
+    "egg": "EGG", "eggetarian": "EGG", "contains egg": "EGG",
+    "non_veg": "NON_VEG", "non-veg": "NON_VEG", "non veg": "NON_VEG", "nonveg": "NON_VEG",
+    "non-vegetarian": "NON_VEG", "non vegetarian": "NON_VEG",
+}
+
+
+def _norm_key(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "").strip().lower())
+
+
+def normalize_attributes(raw: dict) -> dict:
+    """LLM answer for one item → values for the typed MenuItem columns."""
+    raw = raw if isinstance(raw, dict) else {}
+
+    allergens = []
+    for a in raw.get("allergens") or []:
+        key = _norm_key(a)
+        key = _ALLERGEN_ALIASES.get(key, key)
+        if key in ALLERGENS and key not in allergens:
+            allergens.append(key)
+
+    tags = []
+    for t in raw.get("tags") or []:
+        key = _norm_key(t).replace("-", "_").replace(" ", "_")
+        if key in DIETARY_TAGS and key not in tags:
+            tags.append(key)
+
+    return {
+        "diet": _DIET_ALIASES.get(_norm_key(raw.get("diet")), ""),
+        "allergens": sorted(allergens),
+        "dietary_tags": sorted(tags),
+        "calories": _clean_calories(raw.get("calories")),
+    }
+
+
+def _clean_calories(value) -> str:
+    value = re.sub(r"^[^0-9~]*", "", str(value or "")).split("\n")[0].strip()
+    return value if re.search(r"\d", value) else ""
+
+
+def estimate_calories_batch(items: list[dict]) -> list[str]:
+    """
+    One LLM call for all `items` ({"name", "category", "description"}).
+    Returns calorie strings ("~350-450 kcal") in the same order; "" where unknown.
+    """
+    if not items:
+        return []
+    if not llm_configured():
+        return [""] * len(items)
+
+    listing = "\n".join(
+        f'{i}. {it.get("name", "")}'
+        + (f' | Category: {it["category"]}' if it.get("category") else "")
+        + (f' | Details: {it["description"]}' if it.get("description") else "")
+        for i, it in enumerate(items, 1)
+    )
+    prompt = f"""Estimate the approximate calories for each menu item below. Be brief and realistic.
+
+{listing}
+
+Return ONLY JSON: {{"calories": {{"1": "~X-Y kcal", "2": "~X kcal", ...}}}}
+One entry per item number, value format "~X-Y kcal" or "~X kcal"."""
+
+    try:
+        completion = chat_completion(
+            model=LLM_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=30 * len(items) + 50,
+        )
+        data = json.loads(_strip_fences(completion_text(completion)))
+        calories = data.get("calories", data) if isinstance(data, dict) else {}
+    except Exception as e:
+        log_event(logger, "enrichment_calories_failed", logging.WARNING, items=len(items), error=str(e))
+        return [""] * len(items)
+
+    return [_clean_calories(calories.get(str(i))) for i in range(1, len(items) + 1)]
+
+
+def enrich_items_batch(items: list[dict]) -> list[dict] | None:
+    """
+    One LLM call for all `items` ({"name", "category", "description"}).
+    Returns normalized attributes per item (same order; None for an item the
+    answer left out), or None if the call failed.
+    """
+    if not items:
+        return []
+    if not llm_configured():
+        return None
+
+    listing = "\n".join(
+        f'{i}. {it.get("name", "")}'
+        + (f' | Category: {it["category"]}' if it.get("category") else "")
+        + (f' | Details: {it["description"]}' if it.get("description") else "")
+        for i, it in enumerate(items, 1)
+    )
+    prompt = f"""For each restaurant menu item below, infer its attributes. Be realistic; Indian menus are common.
+
+{listing}
+
+Return ONLY JSON:
+{{"items": {{"1": {{"diet": "veg|vegan|egg|non_veg", "allergens": [...], "tags": [...], "calories": "~X-Y kcal"}}, ...}}}}
+
+- allergens: only from {list(ALLERGENS)}
+- tags: only from {list(DIETARY_TAGS)}
+- one entry per item number"""
+
+    try:
+        completion = chat_completion(
+            model=LLM_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=80 * len(items) + 100,
+            timeout=90,
+        )
+        data = json.loads(_strip_fences(completion_text(completion)))
+        answers = data.get("items", data) if isinstance(data, dict) else {}
+    except Exception as e:
+        log_event(logger, "enrichment_batch_failed", logging.WARNING, items=len(items), error=str(e))
+        return None
+
+    return [
+        normalize_attributes(answers[str(i)]) if isinstance(answers.get(str(i)), dict) else None
+        for i in range(1, len(items) + 1)
+    ]
+
+
+def item_description(item) -> str:
+    if item.description:
+        return item.description
+    if item.ingredients:
+        return ", ".join(item.ingredients) if isinstance(item.ingredients, list) else str(item.ingredients)
+    return ""
+
+
+def pending_items(restaurant_id: int) -> list:
+    """Active items whose enriched columns are missing or older than their content."""
+    from menu.models import MenuItem
+
+    qs = (
+        MenuItem.objects
+        .filter(restaurant_id=restaurant_id, is_active=True)
+        .select_related("category")
+        .order_by("id")
+    )
+    return [item for item in qs if item.enrichment_hash != content_hash(item)]
+
+
+def enrich_batch(menu_items, give_up: bool = False) -> tuple[int, int]:
+    """
+    Enrich one batch of MenuItem instances with a single LLM call and save it.
+    bulk_update → no post_save signals, so no regeneration loop.
+    Only items the answer covered are written; the rest keep their old hash and
+    stay pending. With give_up (last attempt), items a successful answer still
+    left out get their current hash recorded with no attributes (enriched_at
+    stays as it was), so they stop counting as pending until their content changes.
+    Returns (items written, items skipped); (0, 0) when the call failed.
+    """
+    from django.utils import timezone
+
+    from menu.models import MenuItem
+
+    if not menu_items:
+        return 0, 0
+
+    results = enrich_items_batch([
+        {
+            "name": item.name,
+            "category": item.category.name if item.category_id else "",
+            "description": item_description(item),
+        }
+        for item in menu_items
+    ])
+    if results is None:
+        return 0, 0
+
+    now = timezone.now()
+    answered = []
+    skipped = []
+    for item, attrs in zip(menu_items, results):
+        if attrs is None:
+            if give_up:
+                item.enrichment_hash = content_hash(item)
+                skipped.append(item)
+            continue
+        answered.append(item)
+        item.diet = attrs["diet"]
+        item.allergens = attrs["allergens"]
+        item.dietary_tags = attrs["dietary_tags"]
+        # keep an older estimate rather than blanking it
+        item.calories = attrs["calories"] or item.calories
+        item.enrichment_hash = content_hash(item)
+        item.enriched_at = now
+
+    MenuItem.objects.bulk_update(
+        answered,
+        ["diet", "allergens", "dietary_tags", "calories", "enrichment_hash", "enriched_at"],
+    )
+    if skipped:
+        MenuItem.objects.bulk_update(skipped, ["enrichment_hash"])
+        log_event(logger, "enrichment_skipped", logging.WARNING, menu_item_ids=[item.id for item in skipped])
+    return len(answered), len(skipped)
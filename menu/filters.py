@@ -0,0 +1,225 @@
+# menu/filters.py
+"""
+Typed per-item columns stored next to the embeddings + a small query parser.
+
+"veg starters under 200" → MenuFilters(diet={"veg"}, category_ids={3}, max_price=200)
+and the remaining text is ranked only among rows that pass the mask.
+"""
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from menu.lexical import tokenize
+
+DIET_FLAGS = ("veg", "non_veg", "vegan", "egg", "jain", "gluten_free")
+
+_NON_VEG_WORDS = {
+    "chicken", "mutton", "lamb", "fish", "prawn", "shrimp", "crab", "beef", "pork",
+    "bacon", "ham", "salami", "keema", "meat", "seekh", "tuna", "salmon", "sausage",
+}
+_EGG_WORDS = {"egg", "omelette", "omelet", "anda"}
+# MenuItem.diet → flags it sets (vegan food is also veg)
+_TYPED_DIET = {
+    "VEG": ("veg",),
+    "VEGAN": ("veg", "vegan"),
+    "EGG": ("egg",),
+    "NON_VEG": ("non_veg",),
+}
+
+_NUM = r"(?:rs\.?|inr|₹)?\s*(\d+(?:\.\d+)?)\s*(?:rs\.?|inr|₹|rupees?)?"
+_PRICE_PATTERNS = [
+    (re.compile(rf"\bbetween\s+{_NUM}\s+(?:and|to|-)\s+{_NUM}", re.I), "range"),
+    (re.compile(rf"\b(?:under|below|less than|cheaper than|upto|up to|within|max|maximum|<=?)\s*{_NUM}", re.I), "max"),
+    (re.compile(rf"\b(?:above|over|more than|greater than|min|minimum|>=?)\s*{_NUM}", re.I), "min"),
+]
+_DIET_PATTERNS = [
+    (re.compile(r"\bnon[\s-]?veg(?:etarian)?\b", re.I), "non_veg"),
+    (re.compile(r"\bvegan\b", re.I), "vegan"),
+    (re.compile(r"\bjain\b", re.I), "jain"),
+    (re.compile(r"\bgluten[\s-]?free\b", re.I), "gluten_free"),
+    (re.compile(r"\b(?:pure\s+)?veg(?:etarian)?\b", re.I), "veg"),
+]
+
+
+@dataclass
+class MenuFilters:
+    max_price: float | None = None
+    min_price: float | None = None
+    category_ids: set[int] | None = None
+    diet: set[str] = field(default_factory=set)
+    available: bool | None = True
+
+    def is_empty(self) -> bool:
+        return (
+            self.max_price is None
+            and self.min_price is None
+            and not self.category_ids
+            and not self.diet
+            and self.available is None
+        )
+
+
+# ------------------------------------------------------------
+# Column building (index time)
+# ------------------------------------------------------------
+def _as_list(value) -> list[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in re.split(r"[,/|;]", value) if v.strip()]
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return []
+
+
+def diet_flags(item: dict) -> dict[str, bool]:
+    """
+    Dietary flags for one item dict (task payload / original_data).
+    Enriched typed fields (diet / dietary_tags, menu/enrichment.py) win,
+    then explicit fields in raw_data, then name/description keywords.
+    """
+    typed = _TYPED_DIET.get(item.get("diet") or "")
+    if typed:
+        tags = set(item.get("dietary_tags") or [])
+        flags = {f: False for f in DIET_FLAGS}
+        for flag in typed:
+            flags[flag] = True
+        flags["jain"] = "jain" in tags
+        flags["gluten_free"] = "gluten_free" in tags
+        return flags
+
+    raw = item.get("raw_data") or {}
+    labels = " ".join(
+        _as_list(item.get("dietary_info"))
+        + _as_list(raw.get("dietary_info"))
+        + _as_list(raw.get("diet"))
+        + _as_list(raw.get("food_type"))
+        + _as_list(raw.get("item_type"))
+    ).lower()
+    flags = {f: False for f in DIET_FLAGS}
+
+    explicit_veg = raw.get("is_veg", raw.get("veg", raw.get("vegetarian")))
+    words = set(tokenize(f"{item.get('name', '')} {item.get('description', '')} {labels}"))
+    text = f"{item.get('name', '')} {labels}".lower()
+
+    if re.search(r"non[\s-]?veg", text):
+        flags["non_veg"] = True
+    elif explicit_veg is not None and str(explicit_veg).lower() in ("0", "false", "no"):
+        flags["non_veg"] = True
+    elif words & _NON_VEG_WORDS:
+        flags["non_veg"] = True
+    elif words & _EGG_WORDS or "egg" in labels:
+        flags["egg"] = True
+    else:
+        flags["veg"] = True
+
+    flags["vegan"] = "vegan" in words
+    flags["jain"] = "jain" in words
+    flags["gluten_free"] = bool(re.search(r"gluten[\s-]?free", text))
+    return flags
+
+
+def build_columns(items: list[dict]) -> dict:
+    """NumPy columns aligned 1:1 with the embedding rows."""
+    n = len(items)
+    price = np.full(n, np.nan, dtype=np.float32)
+    category_id = np.full(n, -1, dtype=np.int64)
+    available = np.ones(n, dtype=bool)
+    diet = {f: np.zeros(n, dtype=bool) for f in DIET_FLAGS}
+    categories: dict[int, str] = {}
+
+    for i, item in enumerate(items):
+        try:
+            if item.get("price") not in (None, ""):
+                price[i] = float(item["price"])
+        except (TypeError, ValueError):
+            pass
+
+        cid = item.get("category_id")
+        if cid is not None:
+            category_id[i] = int(cid)
+            if item.get("category"):
+                categories[int(cid)] = item["category"]
+
+        if item.get("available") is False:
+            available[i] = False
+
+        for flag, value in diet_flags(item).items():
+            diet[flag][i] = value
+
+    return {
+        "price": price,
+        "category_id": category_id,
+        "available": available,
+        **diet,
+        "categories": categories,
+    }
+
+
+def mask_for(columns: dict | None, filters: MenuFilters | None, n_rows: int) -> np.ndarray | None:
+    """Boolean row mask, or None when nothing is filtered."""
+    if not columns or filters is None or filters.is_empty():
+        return None
+
+    mask = np.ones(n_rows, dtype=bool)
+    if filters.available is not None:
+        mask &= columns["available"] == filters.available
+    if filters.max_price is not None:
+        mask &= columns["price"] <= filters.max_price  # NaN (no price) never passes
+    if filters.min_price is not None:
+        mask &= columns["price"] >= filters.min_price
+    if filters.category_ids:
+        mask &= np.isin(columns["category_id"], list(filters.category_ids))
+    for flag in filters.diet:
+        if flag in columns:
+            mask &= columns[flag]
+    return mask
+
+
+# ------------------------------------------------------------
+# Query parsing (request time)
+# ------------------------------------------------------------
+def parse_query_filters(query: str, categories: dict[int, str] | None = None) -> tuple[MenuFilters, str]:
+    """
+    Pull price / diet / category constraints out of a free-text query.
+    Returns (filters, remaining_query); price phrases are removed from the
+    text, diet and category words stay (they still help ranking).
+    """
+    filters = MenuFilters()
+    text = query or ""
+
+    for pattern, kind in _PRICE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        if kind == "range":
+            lo, hi = sorted(float(v) for v in match.groups())
+            filters.min_price, filters.max_price = lo, hi
+        elif kind == "max":
+            filters.max_price = float(match.group(1))
+        else:
+            filters.min_price = float(match.group(1))
+        text = text[: match.start()] + " " + text[match.end():]
+
+    remaining = text
+    for pattern, flag in _DIET_PATTERNS:
+        if pattern.search(remaining):
+            filters.diet.add(flag)
+            # "non veg" must not also count as "veg"
+            remaining = pattern.sub(" ", remaining)
+
+    if categories:
+        q_tokens = set(tokenize(text))
+        # only a category the query ends on: "paneer tikka" is a dish, not the
+        # Paneer section (a filter there would hide the Paneer Tikka starter)
+        words = tokenize(remaining)
+        head = words[-1] if words else None
+        matched = {
+            cid for cid, name in categories.items()
+            if (tokens := set(tokenize(name)) - {"veg", "non"}) and tokens <= q_tokens and head in tokens
+        }
+        if matched:
+            filters.category_ids = matched
+
+    return filters, re.sub(r"\s+", " ", text).strip()
@@ -0,0 +1,218 @@
+# menu/index_store.py
+"""
+Versioned, crash-safe storage for per-restaurant embedding indexes.
+
+Layout under MEDIA_ROOT/embeddings/:
+
+    restaurant_<id>_menu_embeddings.<version>.pkl      immutable index build
+    restaurant_<id>_menu_embeddings.<version>.*        optional sidecar files of that build
+    restaurant_<id>_menu_embeddings.manifest.json      points at the current version
+    restaurant_<id>_menu_embeddings.pkl                legacy single file (read-only fallback)
+
+Writers never touch a published file: a build goes to a new version path
+(temp file → fsync → rename), then the manifest is swapped atomically.
+Readers resolve the manifest once and load a complete, immutable file.
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from restaurant_backend.observability import log_event
+
+logger = logging.getLogger(__name__)
+
+
+def embeddings_dir() -> str:
+    return os.path.join(settings.MEDIA_ROOT, "embeddings")
+
+
+def _prefix(restaurant_id: int) -> str:
+    return f"restaurant_{restaurant_id}_menu_embeddings"
+
+
+def legacy_path(restaurant_id: int) -> str:
+    return os.path.join(embeddings_dir(), f"{_prefix(restaurant_id)}.pkl")
+
+
+def manifest_path(restaurant_id: int) -> str:
+    return os.path.join(embeddings_dir(), f"{_prefix(restaurant_id)}.manifest.json")
+
+
+def version_path(restaurant_id: int, version: str, suffix: str = ".pkl") -> str:
+    return os.path.join(embeddings_dir(), f"{_prefix(restaurant_id)}.{version}{suffix}")
+
+
+def new_version() -> str:
+    # sortable + unique across processes
+    return f"v{time.time_ns()}-{os.getpid()}"
+
+
+# mkstemp creates 0600 files; published ones get the usual umask-based mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows: directories can't be opened
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_open(path, mode: str = "wb", encoding: str | None = None):
+    """
+    Write `path` all-or-nothing: data goes to a temp file in the same
+    directory, is fsynced, then renamed over `path`.
+    A crash leaves either the old file or the new one, never a torn write.
+    """
+    path = str(path)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory,
+        prefix=os.path.basename(path) + ".",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        # other users (web server, a second service account) read these too
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+        _fsync_dir(directory)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_manifest(restaurant_id: int) -> dict | None:
+    try:
+        with open(manifest_path(restaurant_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def current_index(restaurant_id: int) -> tuple[str, str] | None:
+    """
+    (path, version) of the index readers should load, or None.
+
+    Legacy single-file indexes get a synthetic version derived from mtime,
+    so cache invalidation keeps working until the first versioned build.
+    """
+    manifest = read_manifest(restaurant_id)
+    if manifest:
+        path = os.path.join(embeddings_dir(), manifest["file"])
+        if os.path.exists(path):
+            return path, manifest["version"]
+
+    path = legacy_path(restaurant_id)
+    if os.path.exists(path):
+        return path, f"legacy-{os.path.getmtime(path)}"
+
+    return None
+
+
+def publish_version(restaurant_id: int, version: str) -> None:
+    """Point the manifest at an already written version, then reclaim old builds."""
+    manifest = {
+        "version": version,
+        "file": os.path.basename(version_path(restaurant_id, version)),
+        "published_at": time.time(),
+    }
+    with atomic_open(manifest_path(restaurant_id), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    collect_stale_versions(restaurant_id)
+
+
+def retire_index(restaurant_id: int) -> None:
+    """Restaurant has no items anymore: unpublish, old builds get collected later."""
+    for path in (manifest_path(restaurant_id), legacy_path(restaurant_id)):
+        if os.path.exists(path):
+            os.remove(path)
+    collect_stale_versions(restaurant_id, keep=0)
+
+
+def collect_stale_versions(restaurant_id: int, keep: int | None = None, grace_seconds: int | None = None) -> list[str]:
+    """
+    Delete superseded builds of one restaurant.
+
+    Workers load the whole pickle into memory, so a build is only referenced
+    while a reader is between resolving the manifest and finishing the load.
+    We keep the current build plus the `keep - 1` newest previous ones, and
+    never touch anything younger than `grace_seconds` (covers slow loads and
+    leftover temp files of builds still being written).
+    """
+    if keep is None:
+        keep = settings.MENU_EMBEDDINGS_KEEP_VERSIONS
+    if grace_seconds is None:
+        grace_seconds = settings.MENU_EMBEDDINGS_GC_GRACE_SECONDS
+
+    directory = embeddings_dir()
+    if not os.path.isdir(directory):
+        return []
+
+    manifest = read_manifest(restaurant_id) or {}
+    current = manifest.get("version")
+    pattern = re.compile(rf"^{re.escape(_prefix(restaurant_id))}\.(v\d+-\d+)\.")
+
+    versions: dict[str, list[str]] = {}
+    temp_files = []
+    for name in os.listdir(directory):
+        if not name.startswith(_prefix(restaurant_id) + "."):
+            continue
+        if name.endswith(".tmp"):
+            temp_files.append(name)
+            continue
+        match = pattern.match(name)
+        if match:
+            versions.setdefault(match.group(1), []).append(name)
+
+    # newest first (versions embed time_ns)
+    ordered = sorted(versions, key=lambda v: int(v[1:].split("-")[0]), reverse=True)
+    survivors = set(ordered[:keep])
+    if current:
+        survivors.add(current)
+
+    candidates = [n for v in ordered if v not in survivors for n in versions[v]]
+    # the legacy file is superseded once a manifest exists
+    if current and os.path.exists(legacy_path(restaurant_id)):
+        candidates.append(os.path.basename(legacy_path(restaurant_id)))
+    candidates.extend(temp_files)
+
+    now = time.time()
+    removed = []
+    for name in candidates:
+        path = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(path) < grace_seconds:
+                continue
+            os.remove(path)
+            removed.append(name)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            # e.g. Windows refuses to delete a float32 sidecar that is still memory-mapped
+            log_event(logger, "index_remove_failed", logging.WARNING, restaurant_id=restaurant_id, file=name, error=str(e))
+
+    if removed:
+        log_event(logger, "index_stale_removed", restaurant_id=restaurant_id, files=len(removed))
+    return removed
@@ -0,0 +1,155 @@
+# menu/lexical.py
+"""
+BM25 keyword index over menu chunk texts + rank fusion helper.
+
+Built once at index time (menu/embedding_1.py) and pickled next to the
+embeddings as plain dicts/arrays, so loading it costs no model calls.
+"""
+import math
+import re
+import unicodedata
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_LABEL_RE = re.compile(r"^(item|category|description|ingredients|allergens|dietary):\s*", re.IGNORECASE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, accent-free word/number tokens; 'desserts' and 'dessert' match."""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    tokens = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+def split_chunk_text(text: str) -> tuple[str, str]:
+    """
+    Chunk text ("Item: X. Category: Y. Price: 250. ...") → (name, searchable text).
+    Price is dropped on purpose: "Paneer 65" must not match every ₹65 item.
+    """
+    name = ""
+    parts = []
+    for seg in (text or "").split(". "):
+        lower = seg.lower()
+        if lower.startswith("price:"):
+            continue
+        if lower.startswith("item:"):
+            name = seg.split(":", 1)[1].strip()
+        parts.append(_LABEL_RE.sub("", seg))
+    return name, " ".join(parts)
+
+
+class BM25Index:
+    """Okapi BM25 with the item name counted twice (cheap field boost)."""
+
+    def __init__(self, postings: dict, doc_len: np.ndarray, name_tokens: list[list[str]], k1: float = 1.5, b: float = 0.75):
+        self.postings = postings  # token -> (doc_ids int32, tfs float32)
+        self.doc_len = np.asarray(doc_len, dtype=np.float32)
+        self.name_tokens = [frozenset(t) for t in name_tokens]
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(self.doc_len)
+        self.avgdl = float(self.doc_len.mean()) if self.n_docs else 0.0
+        self.idf = {
+            tok: math.log(1 + (self.n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            for tok, (ids, _) in postings.items()
+        }
+
+    @classmethod
+    def build(cls, texts: list[str], names: list[str] | None = None, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        postings: dict[str, dict[int, int]] = {}
+        doc_len = []
+        name_tokens = []
+
+        for idx, text in enumerate(texts):
+            parsed_name, body = split_chunk_text(text)
+            name = (names[idx] if names and names[idx] else parsed_name) or ""
+            n_toks = tokenize(name)
+            toks = n_toks + tokenize(body)
+
+            name_tokens.append(n_toks)
+            doc_len.append(len(toks))
+            for tok in toks:
+                postings.setdefault(tok, {}).setdefault(idx, 0)
+                postings[tok][idx] += 1
+
+        packed = {
+            tok: (
+                np.fromiter(docs.keys(), dtype=np.int32, count=len(docs)),
+                np.fromiter(docs.values(), dtype=np.float32, count=len(docs)),
+            )
+            for tok, docs in postings.items()
+        }
+        return cls(packed, np.asarray(doc_len, dtype=np.float32), name_tokens, k1=k1, b=b)
+
+    def to_dict(self) -> dict:
+        return {
+            "postings": self.postings,
+            "doc_len": self.doc_len,
+            "name_tokens": [sorted(t) for t in self.name_tokens],
+            "k1": self.k1,
+            "b": self.b,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        return cls(data["postings"], data["doc_len"], data["name_tokens"], k1=data["k1"], b=data["b"])
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        if not self.n_docs:
+            return scores
+
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / (self.avgdl or 1.0))
+        for tok in set(tokenize(query)):
+            posting = self.postings.get(tok)
+            if posting is None:
+                continue
+            ids, tfs = posting
+            scores[ids] += self.idf[tok] * tfs * (self.k1 + 1) / (tfs + norm[ids])
+        return scores
+
+    def search(self, query: str, top_k: int = 5, mask: np.ndarray | None = None) -> list[tuple[int, float]]:
+        scores = self.scores(query)
+        if mask is not None:
+            scores[~mask] = 0.0
+        hits = np.flatnonzero(scores > 0)
+        if not len(hits):
+            return []
+        order = hits[np.argsort(-scores[hits], kind="stable")][:top_k]
+        return [(int(i), float(scores[i])) for i in order]
+
+    def unambiguous_match(self, query: str, hits: list[tuple[int, float]]) -> bool:
+        """
+        True when the lexical top hit is clearly *the* item asked for:
+        its name is exactly the query, or it is the only hit whose
+        name contains every query token. Then no embedding is needed.
+        """
+        if not hits:
+            return False
+        q = frozenset(tokenize(query))
+        if not q:
+            return False
+
+        top = hits[0][0]
+        exact = [i for i, _ in hits if self.name_tokens[i] == q]
+        if exact:
+            return exact == [top]
+
+        covering = [i for i, _ in hits if q <= self.name_tokens[i]]
+        return covering == [top]
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = 60) -> list[tuple[int, float]]:
+    """Merge several ranked id lists: score(d) = Σ 1 / (k + rank)."""
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking, start=1):
+            fused[idx] = fused.get(idx, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
@@ -0,0 +1,118 @@
+# menu/management/commands/benchmark_quantization.py
+import json
+import pickle
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from menu.index_store import current_index
+from menu.quantize import STORAGE_DTYPES, dequantize, normalize_rows, quantize
+from menu.search_index import MenuSearchIndex, load_exact_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare float32 / float16 / int8 embedding storage for one restaurant: "
+        "matrix memory, semantic search latency and recall@k relative to float32."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("restaurant_id", type=int)
+        parser.add_argument(
+            "--queries",
+            help='JSON file: [{"query": "..."}, ...] or a list of strings. Defaults to the item names.',
+        )
+        parser.add_argument("--top-k", type=int, default=5)
+        parser.add_argument(
+            "--tile",
+            type=int,
+            default=1,
+            help="Repeat the matrix N times (with small noise) to simulate a larger tenant.",
+        )
+        parser.add_argument("--model", default="sentence-transformers/all-mpnet-base-v2")
+
+    def handle(self, *args, **options):
+        current = current_index(options["restaurant_id"])
+        if current is None:
+            raise CommandError(f"No published index for restaurant {options['restaurant_id']}")
+
+        with open(current[0], "rb") as f:
+            data = pickle.load(f)
+
+        unit = self._exact_rows(data, current[0])
+        if options["tile"] > 1:
+            rng = np.random.default_rng(0)
+            unit = normalize_rows(np.concatenate(
+                [unit] + [unit + rng.normal(0, 0.01, unit.shape).astype(np.float32) for _ in range(options["tile"] - 1)]
+            ))
+        n_rows = len(unit)
+        texts = [""] * n_rows
+
+        queries = self._load_queries(options["queries"], data.get("metadata") or [])
+        top_k = options["top_k"]
+
+        from sentence_transformers import SentenceTransformer
+
+        encoder = SentenceTransformer(options["model"], device="cpu")
+        # encode once up front: only the scoring path is timed
+        q_embs = [encoder.encode(q) for q in queries]
+        encode_cache = dict(zip(queries, q_embs))
+
+        def encode(q):
+            return encode_cache[q]
+
+        self.stdout.write(f"index version={current[1]} rows={n_rows} dim={unit.shape[1]} queries={len(queries)} k={top_k}\n")
+        self.stdout.write(f"{'storage':<10}{'MB':>10}{'saved':>8}{'mean ms':>10}{'speedup':>9}{'recall@k':>10}")
+
+        baseline_hits, baseline_ms, baseline_bytes = None, None, None
+        for dtype in STORAGE_DTYPES:
+            compact, scale = quantize(unit, dtype)
+            if dtype == "float32":
+                index = MenuSearchIndex(compact, texts)
+            else:
+                # exact rows are a memmap in production: not resident, not counted
+                index = MenuSearchIndex(compact, texts, storage={"dtype": dtype, "scale": scale}, exact=unit)
+            nbytes = compact.nbytes + (scale.nbytes if scale is not None else 0)
+
+            hits, latencies = [], []
+            for q in queries:
+                start = time.perf_counter()
+                res = index.search(q, encode, top_k=top_k, mode="semantic")
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits.append({h["index"] for h in res})
+            mean_ms = statistics.mean(latencies)
+
+            if baseline_hits is None:
+                baseline_hits, baseline_ms, baseline_bytes = hits, mean_ms, nbytes
+            recall = statistics.mean(
+                len(h & b) / max(len(b), 1) for h, b in zip(hits, baseline_hits)
+            )
+            self.stdout.write(
+                f"{dtype:<10}{nbytes / 1e6:>10.3f}{1 - nbytes / baseline_bytes:>8.0%}"
+                f"{mean_ms:>10.3f}{baseline_ms / mean_ms:>8.2f}x{recall:>10.3f}"
+            )
+
+    def _exact_rows(self, data, path):
+        fmt = data.get("embedding_format")
+        if not fmt:
+            return normalize_rows(data["embeddings"])
+        exact = load_exact_rows(data, path)
+        if exact is not None:
+            return np.asarray(exact, dtype=np.float32)
+        self.stderr.write("float32 sidecar missing: baseline is the dequantised matrix")
+        return normalize_rows(dequantize(data["embeddings"], fmt.get("scale")))
+
+    def _load_queries(self, path, metadata):
+        if not path:
+            names = [(m.get("name") or "").strip() for m in metadata]
+            return [n for n in dict.fromkeys(names) if n]
+
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        queries = [r if isinstance(r, str) else r.get("query") for r in rows]
+        queries = [q for q in queries if q]
+        if not queries:
+            raise CommandError(f"No usable queries in {path}")
+        return queries
@@ -0,0 +1,100 @@
+# menu/management/commands/benchmark_retrieval.py
+import json
+import pickle
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu.index_store import current_index
+from menu.search_index import MenuSearchIndex
+
+MODES = ("semantic", "lexical", "hybrid")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare recall@k and latency of semantic-only, lexical-only and hybrid "
+        "menu search on a labelled query set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("restaurant_id", type=int)
+        parser.add_argument(
+            "--queries",
+            help='JSON file: [{"query": "paneer 65", "expected": ["Paneer 65"]}, ...]. '
+                 "Defaults to one query per item name (biased towards exact names). "
+                 "menu/benchmarks/ has labelled sets for the sample menus.",
+        )
+        parser.add_argument("--top-k", type=int, default=5)
+        parser.add_argument("--model", default="sentence-transformers/all-mpnet-base-v2")
+        parser.add_argument(
+            "--modes",
+            default=",".join(MODES),
+            help="Comma-separated subset of semantic,lexical,hybrid (lexical alone needs no encoder model).",
+        )
+
+    def handle(self, *args, **options):
+        modes = [m.strip() for m in options["modes"].split(",") if m.strip()]
+        if not modes or set(modes) - set(MODES):
+            raise CommandError(f"--modes: pick from {', '.join(MODES)}")
+
+        current = current_index(options["restaurant_id"])
+        if current is None:
+            raise CommandError(f"No published index for restaurant {options['restaurant_id']}")
+
+        with open(current[0], "rb") as f:
+            index = MenuSearchIndex.from_payload(pickle.load(f), path=current[0])
+
+        if not index.metadata:
+            raise CommandError("Index has no item metadata; rebuild it first.")
+
+        names = [(m.get("name") or "").strip().lower() for m in index.metadata]
+        labelled = self._load_queries(options["queries"], names)
+        top_k = options["top_k"]
+
+        encoder = None
+        if modes != ["lexical"]:
+            from sentence_transformers import SentenceTransformer
+
+            encoder = SentenceTransformer(options["model"], device="cpu")
+            encoder.encode("warm up")
+
+        self.stdout.write(f"index version={current[1]} items={len(index)} queries={len(labelled)} k={top_k}\n")
+        self.stdout.write(f"{'mode':<10}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}{'encodes':>10}")
+
+        for mode in modes:
+            recalls, latencies, encodes = [], [], 0
+
+            for row in labelled:
+                calls = []
+
+                def encode(q):
+                    calls.append(q)
+                    return encoder.encode(q)
+
+                start = time.perf_counter()
+                hits = index.search(row["query"], encode, top_k=top_k, mode=mode)
+                latencies.append((time.perf_counter() - start) * 1000)
+                encodes += len(calls)
+
+                found = {names[h["index"]] for h in hits}
+                expected = {e.strip().lower() for e in row["expected"]}
+                recalls.append(len(found & expected) / len(expected))
+
+            p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+            self.stdout.write(
+                f"{mode:<10}{statistics.mean(recalls):>10.3f}"
+                f"{statistics.mean(latencies):>10.2f}{p95:>10.2f}{encodes:>10}"
+            )
+
+    def _load_queries(self, path, names):
+        if not path:
+            return [{"query": n, "expected": [n]} for n in dict.fromkeys(names) if n]
+
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        labelled = [r for r in rows if r.get("query") and r.get("expected")]
+        if not labelled:
+            raise CommandError(f"No usable queries in {path}")
+        return labelled
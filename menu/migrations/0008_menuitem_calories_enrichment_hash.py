@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0007_remove_category_uniq_category_per_restaurant_external_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='calories',
+            field=models.CharField(blank=True, default='', help_text='Estimated calories, e.g. "~350-450 kcal".', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='enrichment_hash',
+            field=models.CharField(blank=True, default='', help_text='Content hash the enriched fields were computed from.', max_length=64),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0008_menuitem_calories_enrichment_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='allergens',
+            field=models.JSONField(blank=True, default=list, help_text='Normalized allergen keys, e.g. ["dairy", "gluten"].'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='diet',
+            field=models.CharField(blank=True, choices=[('', 'Unknown'), ('VEG', 'Vegetarian'), ('VEGAN', 'Vegan'), ('EGG', 'Contains egg'), ('NON_VEG', 'Non-vegetarian')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='dietary_tags',
+            field=models.JSONField(blank=True, default=list, help_text='Extra tags, e.g. ["jain", "gluten_free", "spicy"].'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='enriched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -96,6 +96,13 @@ class MenuSection(models.Model):
 
 
 class MenuItem(models.Model):
+    class Diet(models.TextChoices):
+        UNKNOWN = "", "Unknown"
+        VEG = "VEG", "Vegetarian"
+        VEGAN = "VEGAN", "Vegan"
+        EGG = "EGG", "Contains egg"
+        NON_VEG = "NON_VEG", "Non-vegetarian"
+
     restaurant = models.ForeignKey(
         Restaurant,
         on_delete=models.CASCADE,
@@ -157,6 +164,37 @@ class MenuItem(models.Model):
         help_text="Full original item JSON from POS / extractor.",
     )
 
+    # ✅ offline enrichment (menu/enrichment.py) - filled during embedding regeneration
+    calories = models.CharField(
+        max_length=50,
+        blank=True,
+        default="",
+        help_text='Estimated calories, e.g. "~350-450 kcal".',
+    )
+    diet = models.CharField(
+        max_length=10,
+        choices=Diet.choices,
+        blank=True,
+        default=Diet.UNKNOWN,
+    )
+    allergens = models.JSONField(
+        blank=True,
+        default=list,
+        help_text='Normalized allergen keys, e.g. ["dairy", "gluten"].',
+    )
+    dietary_tags = models.JSONField(
+        blank=True,
+        default=list,
+        help_text='Extra tags, e.g. ["jain", "gluten_free", "spicy"].',
+    )
+    enriched_at = models.DateTimeField(null=True, blank=True)
+    enrichment_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="Content hash the enriched fields were computed from.",
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
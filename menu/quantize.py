@@ -0,0 +1,60 @@
+# menu/quantize.py
+"""
+Compact storage for the embedding matrix.
+
+    float32  768-d → 3072 B/item (default, unchanged)
+    float16          1536 B/item
+    int8             768 B/item + one float32 scale per dimension
+
+Rows are L2-normalised before quantising, so a dot product is the cosine.
+Scores on the compact form are approximate; MenuSearchIndex re-ranks the
+shortlist against the exact float32 rows (memory-mapped sidecar file).
+"""
+import numpy as np
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+# rows converted to float32 per matmul block: bounds the temporary copy
+_BLOCK_ROWS = 4096
+
+
+def normalize_rows(embeddings) -> np.ndarray:
+    emb = np.asarray(embeddings, dtype=np.float32)
+    if not len(emb):
+        return emb
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    return emb / np.maximum(norms, 1e-12)
+
+
+def quantize(unit_rows: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """(compact matrix, per-dimension scale or None)."""
+    if dtype == "float32":
+        return unit_rows.astype(np.float32, copy=False), None
+    if dtype == "float16":
+        return unit_rows.astype(np.float16), None
+    if dtype == "int8":
+        # symmetric per-dimension scalar quantisation: x ≈ q * scale
+        scale = np.abs(unit_rows).max(axis=0) / 127.0 if len(unit_rows) else np.ones(unit_rows.shape[1:], np.float32)
+        scale = np.maximum(scale, 1e-12).astype(np.float32)
+        q = np.clip(np.rint(unit_rows / scale), -127, 127).astype(np.int8)
+        return q, scale
+    raise ValueError(f"Unknown embedding storage dtype: {dtype} (use one of {STORAGE_DTYPES})")
+
+
+def dequantize(rows: np.ndarray, scale: np.ndarray | None) -> np.ndarray:
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows * scale if scale is not None else rows
+
+
+def compact_scores(matrix: np.ndarray, scale: np.ndarray | None, query_unit: np.ndarray) -> np.ndarray:
+    """Approximate cosine of every row against a unit query vector."""
+    # fold the per-dimension scale into the query instead of the matrix
+    q = (query_unit * scale if scale is not None else query_unit).astype(np.float32)
+    if matrix.dtype == np.float32:
+        return matrix @ q
+
+    out = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), _BLOCK_ROWS):
+        block = matrix[start:start + _BLOCK_ROWS]
+        out[start:start + len(block)] = block.astype(np.float32) @ q
+    return out
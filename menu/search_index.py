@@ -0,0 +1,196 @@
+# menu/search_index.py
+"""
+In-memory search over one restaurant's published index (embeddings + BM25).
+
+Shared by chatbot.chatbott.MenuChatbot, chatbot.engine and the retrieval
+benchmark, so every caller ranks the same way.
+"""
+import os
+from typing import Callable
+
+import numpy as np
+
+from menu.filters import MenuFilters, mask_for, parse_query_filters
+from menu.lexical import BM25Index, reciprocal_rank_fusion
+from menu.quantize import compact_scores, dequantize, normalize_rows
+
+# candidates taken from each ranker before fusion
+FUSION_POOL = 20
+# compact (float16/int8) indexes: shortlist re-scored against exact float32 rows
+RERANK_POOL = 50
+
+
+class MenuSearchIndex:
+    def __init__(
+        self,
+        embeddings,
+        texts: list[str],
+        metadata: list[dict] | None = None,
+        lexical: dict | None = None,
+        columns: dict | None = None,
+        storage: dict | None = None,
+        exact=None,
+    ):
+        """
+        `storage` is the payload's "embedding_format" ({"dtype", "scale", ...})
+        when `embeddings` is a compact float16/int8 matrix of unit rows;
+        `exact` then optionally gives the float32 rows (usually a read-only memmap)
+        used to re-rank the shortlist.
+        """
+        self.storage = storage
+        if storage:
+            self.embeddings = np.asarray(embeddings)
+            self._scale = storage.get("scale")
+            self._exact = exact
+        else:
+            # only the normalised copy is kept in memory
+            self.embeddings = normalize_rows(embeddings)
+            self._scale = None
+            self._exact = None
+        self.texts = list(texts or [])
+        self.metadata = metadata
+        # typed filter columns (menu/filters.py); None for indexes built before them
+        if columns is not None and len(columns.get("price", ())) != len(self.embeddings):
+            columns = None  # not row-aligned (e.g. chunks loaded from another file)
+        self.columns = columns
+
+        if lexical and len(lexical["doc_len"]) == len(self.embeddings):
+            self.lexical = BM25Index.from_dict(lexical)
+        else:
+            # legacy index files (or not row-aligned): build the keyword index on load
+            names = [m.get("name", "") for m in metadata] if metadata else None
+            self.lexical = BM25Index.build(self.texts, names=names)
+
+    @classmethod
+    def from_payload(cls, data: dict, path=None) -> "MenuSearchIndex":
+        """`path` is the file `data` was loaded from; needed to find the exact float32 sidecar."""
+        metadata = data.get("metadata")
+        texts = data.get("texts") or data.get("chunks")
+        if not texts and metadata:
+            texts = [_text_from_metadata(m) for m in metadata]
+        return cls(
+            data["embeddings"],
+            texts or [],
+            metadata=metadata,
+            lexical=data.get("lexical"),
+            columns=data.get("columns"),
+            storage=data.get("embedding_format"),
+            exact=load_exact_rows(data, path),
+        )
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def semantic_scores(self, query_embedding) -> np.ndarray:
+        """Cosine of every row (approximate for compact indexes)."""
+        return compact_scores(self.embeddings, self._scale, _unit_query(query_embedding))
+
+    def exact_scores(self, query_embedding, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(sorted rows, full-precision cosine) for `rows` only; touches just those memmap pages."""
+        q = _unit_query(query_embedding)
+        rows = np.sort(rows)
+        if self._exact is not None:
+            exact = np.asarray(self._exact[rows], dtype=np.float32)
+        else:
+            exact = normalize_rows(dequantize(self.embeddings[rows], self._scale))
+        return rows, exact @ q
+
+    def parse_query(self, query: str) -> tuple[MenuFilters, str]:
+        """Filters found in `query` (category names come from this index) + the text left to rank."""
+        categories = (self.columns or {}).get("categories")
+        return parse_query_filters(query, categories)
+
+    def search(
+        self,
+        query: str,
+        encode: Callable[[str], np.ndarray],
+        top_k: int = 5,
+        mode: str = "hybrid",
+        filters: MenuFilters | None = None,
+    ) -> list[dict]:
+        """
+        Rank items for `query`.
+
+        mode="hybrid"   → lexical fast path if unambiguous, else BM25 ⊕ cosine via RRF
+        mode="semantic" → cosine only (previous behaviour)
+        mode="lexical"  → BM25 only
+
+        `filters` are applied as a row mask *before* top-k, so every returned
+        item satisfies them; default is "available items only".
+        `encode` is only called when a semantic ranking is needed.
+        Returns [{"index", "score", "source"}]; score is the cosine similarity,
+        except for lexical results where it is BM25 relative to the top hit (1.0).
+        """
+        if not len(self):
+            return []
+
+        mask = mask_for(self.columns, filters if filters is not None else MenuFilters(), len(self))
+        if mask is not None and not mask.any():
+            return []
+
+        if mode != "semantic":
+            lex_hits = self.lexical.search(query, top_k=max(top_k, FUSION_POOL), mask=mask)
+            if mode == "lexical" or self.lexical.unambiguous_match(query, lex_hits):
+                return _lexical_results(lex_hits, top_k)
+        else:
+            lex_hits = []
+
+        q_emb = encode(query)
+        sem = self.semantic_scores(q_emb)
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(sem))
+        if self.storage:
+            # compact scores pick the shortlist, exact scores order it
+            shortlist = candidates[np.argsort(-sem[candidates], kind="stable")][:max(top_k, RERANK_POOL)]
+            candidates, exact = self.exact_scores(q_emb, shortlist)
+            sem[candidates] = exact
+        pool = min(len(candidates), max(top_k, FUSION_POOL))
+        sem_ranking = candidates[np.argsort(-sem[candidates], kind="stable")][:pool].tolist()
+
+        if mode == "semantic" or not lex_hits:
+            ranked = sem_ranking
+            source = "semantic"
+        else:
+            fused = reciprocal_rank_fusion([sem_ranking, [i for i, _ in lex_hits]])
+            ranked = [i for i, _ in fused]
+            source = "hybrid"
+
+        return [
+            {"index": int(i), "score": float(sem[i]), "source": source}
+            for i in ranked[:top_k]
+        ]
+
+
+def load_exact_rows(data: dict, path):
+    """Read-only memmap of the float32 sidecar of a compact index, or None."""
+    fmt = data.get("embedding_format") or {}
+    if not fmt.get("exact_file") or not path:
+        return None
+    exact_path = os.path.join(os.path.dirname(str(path)), fmt["exact_file"])
+    if not os.path.exists(exact_path):
+        return None
+    return np.load(exact_path, mmap_mode="r")
+
+
+def _unit_query(query_embedding) -> np.ndarray:
+    q = np.asarray(query_embedding, dtype=np.float32).ravel()
+    return q / max(float(np.linalg.norm(q)), 1e-12)
+
+
+def _lexical_results(hits: list[tuple[int, float]], top_k: int) -> list[dict]:
+    if not hits:
+        return []
+    best = hits[0][1] or 1.0
+    return [
+        {"index": i, "score": s / best, "source": "lexical"}
+        for i, s in hits[:top_k]
+    ]
+
+
+def _text_from_metadata(meta: dict) -> str:
+    orig = meta.get("original_data") or {}
+    parts = [f"Item: {meta.get('name', '')}"]
+    if meta.get("category"):
+        parts.append(f"Category: {meta['category']}")
+    if orig.get("description"):
+        parts.append(f"Description: {orig['description']}")
+    return ". ".join(parts)
@@ -7,6 +7,7 @@ from django.db import transaction
 from django.utils.text import slugify
 
 from .models import MenuItem, Category, MenuSection
+from .snapshot import bump_menu_version
 
 
 def normalize_name(name: str) -> str:
@@ -140,6 +141,8 @@ def rebuild_menu_from_json(restaurant, items_from_json: list[dict]):
     # ✅ archive old categories + sections (IMPORTANT)
     Category.objects.filter(restaurant=restaurant).update(is_active=False)
     MenuSection.objects.filter(restaurant=restaurant).update(is_active=False)
+    # .update() sends no signals; an upload with zero items must still drop the old snapshot
+    transaction.on_commit(lambda: bump_menu_version(restaurant.id))
 
     for raw in items_from_json or []:
         name = (raw.get("name") or "").strip()
@@ -5,8 +5,9 @@ from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from .models import MenuItem
-from .tasks import regenerate_menu_embeddings_for_restaurant
+from .models import MenuItem, Category, MenuSection
+from .snapshot import bump_menu_version
+from .tasks import request_menu_embeddings_regeneration
 from .embedding_context import are_embedding_signals_disabled
 
 _thread_local = local()
@@ -39,16 +40,33 @@ def _schedule_regeneration_for_restaurant(restaurant_id: int | None) -> None:
         _thread_local.on_commit_registered = False
 
         for rid in ids:
-            regenerate_menu_embeddings_for_restaurant.delay(rid)
+            request_menu_embeddings_regeneration(rid)
 
     transaction.on_commit(_on_commit)
 
 
+def _invalidate_menu_snapshot(restaurant_id: int | None) -> None:
+    # bulk rebuilds included (embedding signals suspended or not); one cache write per save
+    if restaurant_id:
+        transaction.on_commit(lambda: bump_menu_version(restaurant_id))
+
+
 @receiver(post_save, sender=MenuItem)
 def menuitem_saved(sender, instance: MenuItem, created, **kwargs):
     _schedule_regeneration_for_restaurant(instance.restaurant_id)
+    _invalidate_menu_snapshot(instance.restaurant_id)
 
 
 @receiver(post_delete, sender=MenuItem)
 def menuitem_deleted(sender, instance: MenuItem, **kwargs):
     _schedule_regeneration_for_restaurant(instance.restaurant_id)
+    _invalidate_menu_snapshot(instance.restaurant_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=MenuSection)
+@receiver(post_delete, sender=MenuSection)
+def menu_structure_changed(sender, instance, **kwargs):
+    # category / section names are part of the public menu payload
+    _invalidate_menu_snapshot(instance.restaurant_id)
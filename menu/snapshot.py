@@ -0,0 +1,166 @@
+# menu/snapshot.py
+"""
+Pre-rendered public menu per restaurant.
+
+The public menu endpoints and the chat SHOW_MENU reply used to query and
+serialize the whole menu on every request, but the menu only changes when
+an owner edits it or a new upload is imported. Here:
+
+- menu_version(): opaque token per restaurant in the shared cache; signals
+  bump it (after commit) on every MenuItem / Category / MenuSection change
+- get_snapshot(): items JSON, categories JSON, the SHOW_MENU text and chat
+  cards by item id, built once per version and cached under it, so a warm
+  read never hits the DB
+- etag() / etag_matches(): ETag per version for If-None-Match → 304
+
+An expired / evicted version key just means a new token (one rebuild, one extra 200).
+With a per-process cache (CACHE_SHARED False) a bump made by another worker or
+by Celery would never be seen here, so the version comes from the menu rows
+instead (_db_version(): three aggregate queries per read).
+"""
+import hashlib
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from restaurant_backend.observability import log_event
+
+logger = logging.getLogger(__name__)
+
+
+def _key(*parts) -> str:
+    return "menu-snapshot:" + ":".join(str(p) for p in parts)
+
+
+def _db_version(restaurant_id) -> str:
+    """
+    Version from the rows: newest updated_at, row and active counts of items,
+    categories and sections. queryset.update() leaves updated_at alone, but
+    the archive step of an import changes the active counts.
+    """
+    from .models import Category, MenuItem, MenuSection
+
+    state = [
+        model.objects.filter(restaurant_id=restaurant_id).aggregate(
+            changed=Max("updated_at"), rows=Count("id"), active=Count("id", filter=Q(is_active=True))
+        )
+        for model in (MenuItem, Category, MenuSection)
+    ]
+    return hashlib.sha1(repr(state).encode()).hexdigest()[:12]
+
+
+def menu_version(restaurant_id) -> str:
+    if not settings.CACHE_SHARED:
+        return _db_version(restaurant_id)
+    key = _key("version", restaurant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex[:12], timeout=settings.MENU_SNAPSHOT_TTL_SECONDS)
+        version = cache.get(key)
+    return version
+
+
+def bump_menu_version(restaurant_id) -> None:
+    """Menu changed: every cached snapshot / ETag of the restaurant is stale from now on."""
+    key = _key("version", restaurant_id)
+    cache.set(key, uuid.uuid4().hex[:12], timeout=settings.MENU_SNAPSHOT_TTL_SECONDS)
+
+
+def etag(restaurant_id, version: str | None = None) -> str:
+    return f'"menu-{restaurant_id}-{version or menu_version(restaurant_id)}"'
+
+
+def etag_matches(request, current: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    tags = parse_etags(header)
+    # W/ prefix: weak comparison is fine for a GET
+    return "*" in tags or any(t.removeprefix("W/") == current for t in tags)
+
+
+def _card(m: dict) -> dict:
+    """Tap-able chat suggestion (widget "menu_items" entry)."""
+    return {
+        "id": m["id"],
+        "name": m["name"],
+        "price": m["price"],
+        "category": m.get("category_name") or "",
+    }
+
+
+def _show_menu(items: list[dict]) -> dict:
+    """SHOW_MENU reply text + tap-able suggestions (same wording as apply_intent had)."""
+    items = items[:settings.MENU_SNAPSHOT_CHAT_ITEMS]
+    if not items:
+        return {"reply": "This restaurant has no menu items yet.", "menu_items": []}
+
+    lines = []
+    current_category = None
+    suggestions = []
+    for m in items:
+        category = m.get("category_name") or "Other"
+        if category != current_category:
+            current_category = category
+            lines.append(f"\n**{current_category}**")
+        lines.append(f"• {m['name']} — ₹{m['price']}")
+        suggestions.append(_card(m))
+
+    reply = (
+        "Here's our menu:\n"
+        + "\n".join(lines)
+        + "\n\nJust tap an item or tell me what you'd like to add!"
+    )
+    return {"reply": reply, "menu_items": suggestions}
+
+
+def build_snapshot(restaurant_id, version: str) -> dict | None:
+    from restaurant_backend.db import primary_reads
+    from restaurants.models import Restaurant
+    from .models import MenuItem
+    from .serializers import MenuItemSerializer
+
+    # cached under this version until the next edit: never build it from a lagging replica
+    with primary_reads():
+        if not Restaurant.objects.filter(id=restaurant_id).exists():
+            return None
+
+        qs = (
+            MenuItem.objects
+            .filter(restaurant_id=restaurant_id, available=True, is_active=True)
+            .select_related("category", "menu_section")
+            .order_by("category__position", "menu_section__position", "position", "name")
+        )
+        items = MenuItemSerializer(qs, many=True).data
+    categories = sorted({m.get("category_name") for m in items} - {None, ""})
+
+    renderer = JSONRenderer()
+    return {
+        "version": version,
+        "etag": etag(restaurant_id, version),
+        "items_json": renderer.render(items),
+        "categories_json": renderer.render({"categories": categories}),
+        "show_menu": _show_menu(items),
+        # available items only: recommendations resolve ids through this
+        "cards": {m["id"]: _card(m) for m in items},
+    }
+
+
+def get_snapshot(restaurant_id) -> dict | None:
+    """The restaurant's current snapshot (built on first use per version); None if it doesn't exist."""
+    # version first: a save racing the build then only leaves a stale, never-read entry
+    version = menu_version(restaurant_id)
+    key = _key("data", restaurant_id, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(restaurant_id, version)
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, timeout=settings.MENU_SNAPSHOT_TTL_SECONDS)
+        log_event(logger, "menu_snapshot_built", restaurant_id=restaurant_id, version=version)
+    return snapshot
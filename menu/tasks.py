@@ -1,25 +1,126 @@
 # menu/tasks.py
+import logging
+import os
+import time
+import uuid
+
 from celery import shared_task
 from django.conf import settings
-import os
+from django.core.cache import cache
 
 from restaurants.models import Restaurant
 from menu.models import MenuItem
 from menu.services import rebuild_menu_from_json
 from menu.embedding_context import suspend_embedding_signals
 from menu.embedding_1 import MenuEmbeddingGenerator
+from menu import index_store
+from menu.enrichment import content_hash, enrich_batch, pending_items
+from restaurant_backend.observability import log_event
+
+logger = logging.getLogger(__name__)
 
 
 def get_embeddings_path(restaurant_id: int) -> str:
-    return os.path.join(
-        settings.MEDIA_ROOT,
-        "embeddings",
-        f"restaurant_{restaurant_id}_menu_embeddings.pkl",
-    )
+    """
+    Path of the currently published index for this restaurant.
+    Falls back to the legacy (unversioned) path when nothing is published yet.
+    """
+    current = index_store.current_index(restaurant_id)
+    if current:
+        return current[0]
+    return index_store.legacy_path(restaurant_id)
+
+
+def _regen_cache_key(restaurant_id: int, name: str) -> str:
+    return f"menu-embeddings:{restaurant_id}:{name}"
+
+
+def request_menu_embeddings_regeneration(restaurant_id: int) -> None:
+    """
+    Debounced entry point used by the MenuItem signals.
+
+    Every call refreshes the restaurant's "dirty since" marker; only the first
+    call of a burst queues a delayed task. That task waits until no edit has
+    happened for MENU_EMBEDDINGS_DEBOUNCE_SECONDS, so ten backoffice edits
+    end up as one re-encode.
+    """
+    debounce = settings.MENU_EMBEDDINGS_DEBOUNCE_SECONDS
+    ttl = debounce + settings.MENU_EMBEDDINGS_LOCK_TIMEOUT
+
+    cache.set(_regen_cache_key(restaurant_id, "dirty"), time.time(), timeout=ttl)
+
+    token = uuid.uuid4().hex
+    if cache.add(_regen_cache_key(restaurant_id, "scheduled"), token, timeout=ttl):
+        regenerate_menu_embeddings_for_restaurant.apply_async(
+            (restaurant_id,),
+            {"token": token},
+            countdown=debounce,
+        )
 
 
 @shared_task
-def regenerate_menu_embeddings_for_restaurant(restaurant_id: int) -> None:
+def regenerate_menu_embeddings_for_restaurant(restaurant_id: int, token: str | None = None) -> None:
+    """
+    Rebuild the embeddings file for one restaurant.
+
+    token=None -> direct call (bulk import), runs right away.
+    token=str  -> debounced run queued by request_menu_embeddings_regeneration();
+                  dropped if another run already covered it, postponed while
+                  edits keep coming in.
+
+    At most one regeneration per restaurant runs at a time; requests arriving
+    meanwhile are merged into a single follow-up run.
+    """
+    debounce = settings.MENU_EMBEDDINGS_DEBOUNCE_SECONDS
+    lock_timeout = settings.MENU_EMBEDDINGS_LOCK_TIMEOUT
+    scheduled_key = _regen_cache_key(restaurant_id, "scheduled")
+    dirty_key = _regen_cache_key(restaurant_id, "dirty")
+    lock_key = _regen_cache_key(restaurant_id, "lock")
+
+    if token is not None:
+        scheduled = cache.get(scheduled_key)
+        if scheduled is not None and scheduled != token:
+            # superseded: another run already picked these edits up
+            return
+        # key missing (evicted, cache flushed): run anyway, a spare re-encode
+        # is cheaper than a menu edit that never reaches the embeddings
+
+        dirty_at = cache.get(dirty_key)
+        if dirty_at is not None:
+            remaining = debounce - (time.time() - dirty_at)
+            if remaining > 0:
+                # still inside the quiet period → push this run back
+                cache.touch(scheduled_key, timeout=debounce + lock_timeout)
+                regenerate_menu_embeddings_for_restaurant.apply_async(
+                    (restaurant_id,),
+                    {"token": token},
+                    countdown=remaining,
+                )
+                return
+
+    lock_token = uuid.uuid4().hex
+    if not cache.add(lock_key, lock_token, timeout=lock_timeout):
+        # another worker is regenerating this restaurant → retry once it is done
+        if token is not None:
+            regenerate_menu_embeddings_for_restaurant.apply_async(
+                (restaurant_id,),
+                {"token": token},
+                countdown=debounce,
+            )
+        else:
+            request_menu_embeddings_regeneration(restaurant_id)
+        return
+
+    try:
+        # edits from here on must schedule a fresh run
+        cache.delete_many([scheduled_key, dirty_key])
+        _build_menu_embeddings(restaurant_id)
+    finally:
+        if cache.get(lock_key) == lock_token:
+            cache.delete(lock_key)
+
+
+def _build_menu_embeddings(restaurant_id: int) -> None:
     try:
         restaurant = Restaurant.objects.get(id=restaurant_id)
     except Restaurant.DoesNotExist:
@@ -27,45 +128,65 @@ def regenerate_menu_embeddings_for_restaurant(restaurant_id: int) -> None:
 
     qs = (
         MenuItem.objects
-        .filter(restaurant=restaurant, is_active=True, available=True)
+        # unavailable items stay in the index; the "available" column masks them at query time
+        .filter(restaurant=restaurant, is_active=True)
         .select_related("category", "menu_section")
         .order_by("id")
     )
 
+    menu_items = list(qs)
+    # ✅ items without (current) diet/allergen/calorie data → enrich in the background;
+    # that task requests another regeneration once it wrote something
+    if any(item.enrichment_hash != content_hash(item) for item in menu_items):
+        enrich_menu_for_restaurant.delay(restaurant_id)
+
     items = []
-    for item in qs:
+    for item in menu_items:
+        dietary_info = ([item.get_diet_display()] if item.diet else []) + (item.dietary_tags or [])
         items.append(
             {
+                "menu_item_id": item.id,
                 "name": item.name,
                 "description": item.description or "",
                 # ✅ FK -> string (very important)
                 "category": (item.category.name if item.category else ""),
+                "category_id": item.category_id,
                 # optional: embedding_1 ignores it (safe to keep)
                 "menu_section": (item.menu_section.name if item.menu_section else ""),
                 "price": float(item.price) if item.price is not None else None,
                 "currency": item.currency or "INR",
                 "ingredients": item.ingredients or [],
+                "available": item.available,
+                # ✅ typed enrichment columns (menu/enrichment.py)
+                "diet": item.diet,
+                "allergens": item.allergens or [],
+                "dietary_info": dietary_info,
+                "dietary_tags": item.dietary_tags or [],
+                "calories": item.calories,
+                # dietary flags are read from here (menu/filters.py)
+                "raw_data": item.raw_data or {},
             }
         )
 
-    output_path = get_embeddings_path(restaurant_id)
-
     if not items:
-        if os.path.exists(output_path):
-            os.remove(output_path)
+        index_store.retire_index(restaurant_id)
         return
 
     # ✅ embedding_1 supports {"items": [...]}
     menu_data = {"items": items}
 
     generator = MenuEmbeddingGenerator(
-        model_name="sentence-transformers/all-mpnet-base-v2"
+        model_name="sentence-transformers/all-mpnet-base-v2",
+        storage=settings.MENU_EMBEDDINGS_STORAGE,
     )
     chunks = generator.create_text_chunks(menu_data)
     generator.generate_embeddings(chunks)
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # ✅ new immutable version → atomic manifest swap → old versions reclaimed
+    version = index_store.new_version()
+    output_path = index_store.version_path(restaurant_id, version)
     generator.save_embeddings(output_path, format="pickle")
+    index_store.publish_version(restaurant_id, version)
 
     if hasattr(restaurant, "embeddings_file"):
         rel_path = os.path.relpath(output_path, settings.MEDIA_ROOT)
@@ -89,3 +210,98 @@ def extract_menu_for_restaurant_task(restaurant_id: int, items_from_json: list[d
         rebuild_menu_from_json(Restaurant.objects.get(id=restaurant_id), items_from_json)
 
     regenerate_menu_embeddings_for_restaurant.delay(restaurant_id)
+    enrich_menu_for_restaurant.delay(restaurant_id)
+
+
+def _enrich_cache_key(restaurant_id: int | None, name: str) -> str:
+    return f"menu-enrichment:{restaurant_id}:{name}"
+
+
+def _take_enrichment_slot() -> float:
+    """
+    Shared LLM budget for enrichment across all workers (fixed one-minute window).
+    Returns 0 if a batch may run now, else seconds until the next window.
+    """
+    window = int(time.time() // 60)
+    key = _enrich_cache_key(None, f"window:{window}")
+    cache.add(key, 0, timeout=120)
+    try:
+        used = cache.incr(key)
+    except ValueError:
+        # key expired between add() and incr()
+        cache.add(key, 1, timeout=120)
+        used = 1
+    if used <= settings.MENU_ENRICHMENT_BATCHES_PER_MINUTE:
+        return 0
+    return (window + 1) * 60 - time.time() + 1
+
+
+@shared_task
+def enrich_menu_for_restaurant(restaurant_id: int, attempt: int = 0) -> None:
+    """
+    Fill diet / allergens / dietary_tags / calories for items that need it.
+
+    - idempotent: items whose content hash is unchanged are skipped
+    - resumable: every batch is saved on its own; a later run continues with what is left
+    - rate-limited: MENU_ENRICHMENT_BATCHES_PER_MINUTE LLM calls across all workers;
+      over budget → rescheduled for the next window
+    """
+    lock_key = _enrich_cache_key(restaurant_id, "lock")
+    lock_token = uuid.uuid4().hex
+    if not cache.add(lock_key, lock_token, timeout=settings.MENU_EMBEDDINGS_LOCK_TIMEOUT):
+        return  # the running task re-reads pending items after every batch
+
+    batch_size = settings.MENU_ENRICHMENT_BATCH_SIZE
+    written = 0
+    retry_in = None
+    try:
+        for _ in range(settings.MENU_ENRICHMENT_BATCHES_PER_RUN):
+            batch = pending_items(restaurant_id)[:batch_size]
+            if not batch:
+                break
+
+            wait = _take_enrichment_slot()
+            if wait:
+                retry_in = wait
+                break
+
+            # last attempt: items the answer keeps leaving out are recorded as skipped,
+            # else every menu edit (_build_menu_embeddings) would queue this run again
+            saved, skipped = enrich_batch(batch, give_up=attempt >= settings.MENU_ENRICHMENT_MAX_ATTEMPTS)
+            written += saved
+            if saved + skipped < len(batch):
+                # call failed, or the answer left items out (they stay pending): back off
+                attempt += 1
+                retry_in = settings.MENU_ENRICHMENT_RETRY_SECONDS * attempt
+                break
+            attempt = 0
+        else:
+            # run budget used up; continue in a fresh task
+            retry_in = 1 if pending_items(restaurant_id) else None
+    finally:
+        if cache.get(lock_key) == lock_token:
+            cache.delete(lock_key)
+
+    log_event(logger, "enrichment_run", restaurant_id=restaurant_id, enriched=written, attempt=attempt)
+
+    if written:
+        request_menu_embeddings_regeneration(restaurant_id)
+
+    if retry_in is not None:
+        if attempt > settings.MENU_ENRICHMENT_MAX_ATTEMPTS:
+            log_event(logger, "enrichment_gave_up", logging.WARNING, restaurant_id=restaurant_id, attempt=attempt)
+            return
+        enrich_menu_for_restaurant.apply_async((restaurant_id,), {"attempt": attempt}, countdown=retry_in)
+
+
+@shared_task
+def enrich_menu_items(menu_item_ids: list[int]) -> None:
+    """
+    Items the chat showed without calories (MenuChatbot.lookup_calories):
+    enrich their restaurants offline instead of asking the LLM mid-request.
+    """
+    restaurant_ids = (
+        MenuItem.objects.filter(id__in=menu_item_ids).values_list("restaurant_id", flat=True).distinct()
+    )
+    for restaurant_id in restaurant_ids:
+        enrich_menu_for_restaurant.delay(restaurant_id)
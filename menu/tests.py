@@ -1,3 +1,515 @@
-from django.test import TestCase
+import os
+import shutil
+import stat
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from accounts.models import User
+from restaurants.models import Restaurant
+
+from . import index_store, snapshot, tasks
+from .embedding_context import suspend_embedding_signals
+from .enrichment import pending_items
+from .filters import MenuFilters, build_columns, mask_for, parse_query_filters
+from .lexical import BM25Index, reciprocal_rank_fusion
+from .models import Category, MenuItem
+from .quantize import compact_scores, dequantize, normalize_rows, quantize
+from .search_index import MenuSearchIndex
+
+
+class IndexStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def build(self, version, age_seconds=3600):
+        path = index_store.version_path(1, version)
+        with index_store.atomic_open(path) as f:
+            f.write(b"index " + version.encode())
+        old = time.time() - age_seconds
+        os.utime(path, (old, old))
+        return path
+
+    def files(self):
+        return sorted(os.listdir(index_store.embeddings_dir()))
+
+    def test_atomic_open_publishes_readable_file(self):
+        path = self.build("v1-1")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"index v1-1")
+        self.assertEqual(self.files(), ["restaurant_1_menu_embeddings.v1-1.pkl"])
+        if os.name == "posix":
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o666 & ~index_store._UMASK)
+
+    def test_failed_write_keeps_old_file(self):
+        path = self.build("v1-1")
+        with self.assertRaises(RuntimeError):
+            with index_store.atomic_open(path) as f:
+                f.write(b"half a")
+                raise RuntimeError("worker killed")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"index v1-1")
+        # no temp file left behind
+        self.assertEqual(self.files(), ["restaurant_1_menu_embeddings.v1-1.pkl"])
+
+    def test_publish_points_readers_at_new_version(self):
+        self.build("v1-1")
+        index_store.publish_version(1, "v1-1")
+        path = self.build("v2-1")
+        self.assertEqual(index_store.current_index(1)[1], "v1-1")
+
+        index_store.publish_version(1, "v2-1")
+        self.assertEqual(index_store.current_index(1), (path, "v2-1"))
+
+    @override_settings(MENU_EMBEDDINGS_KEEP_VERSIONS=2, MENU_EMBEDDINGS_GC_GRACE_SECONDS=600)
+    def test_collect_keeps_newest_versions_and_young_files(self):
+        for n in range(1, 5):
+            self.build(f"v{n}-1")
+        # superseded, but a reader may still be loading it
+        self.build("v0-1", age_seconds=10)
+        index_store.publish_version(1, "v4-1")
+
+        self.assertEqual(
+            self.files(),
+            [
+                "restaurant_1_menu_embeddings.manifest.json",
+                "restaurant_1_menu_embeddings.v0-1.pkl",
+                "restaurant_1_menu_embeddings.v3-1.pkl",
+                "restaurant_1_menu_embeddings.v4-1.pkl",
+            ],
+        )
+
+    def test_retire_unpublishes_everything_old(self):
+        self.build("v1-1")
+        index_store.publish_version(1, "v1-1")
+        index_store.retire_index(1)
+        self.assertIsNone(index_store.current_index(1))
+        self.assertEqual(self.files(), [])
+
+
+CATEGORIES = {1: "Paneer", 2: "Starters", 3: "Main Course", 4: "Desserts"}
+ITEMS = [
+    {"name": "Paneer Tikka", "price": "220", "category_id": 2, "category": "Starters"},
+    {"name": "Chicken Seekh Kebab", "price": "320", "category_id": 2, "category": "Starters"},
+    {"name": "Kadai Paneer", "price": "280", "category_id": 1, "category": "Paneer"},
+    {"name": "Egg Curry", "price": "180", "category_id": 3, "category": "Main Course"},
+    {"name": "Gulab Jamun", "price": "90", "category_id": 4, "category": "Desserts", "available": False},
+    {"name": "Chef's Special", "price": "", "category_id": 3, "category": "Main Course"},
+]
+
+
+class MenuFilterTests(SimpleTestCase):
+    columns = build_columns(ITEMS)
+
+    def rows(self, filters):
+        mask = mask_for(self.columns, filters, len(ITEMS))
+        return None if mask is None else np.flatnonzero(mask).tolist()
+
+    def test_price(self):
+        filters, text = parse_query_filters("starters under ₹250", CATEGORIES)
+        self.assertEqual((filters.max_price, text), (250.0, "starters"))
+        self.assertEqual(self.rows(filters), [0])
+
+        filters, _ = parse_query_filters("something between 300 and 200")
+        self.assertEqual((filters.min_price, filters.max_price), (200.0, 300.0))
+        # no price never passes a price filter
+        self.assertEqual(self.rows(MenuFilters(min_price=0)), [0, 1, 2, 3])
+
+    def test_category(self):
+        filters, _ = parse_query_filters("main course", CATEGORIES)
+        self.assertEqual(filters.category_ids, {3})
+        self.assertEqual(self.rows(filters), [3, 5])
+
+    def test_category_word_inside_a_dish_name_does_not_filter(self):
+        # the Paneer section would hide Paneer Tikka (a starter)
+        filters, text = parse_query_filters("paneer tikka", CATEGORIES)
+        self.assertIsNone(filters.category_ids)
+        self.assertEqual(text, "paneer tikka")
+        self.assertIn(0, self.rows(filters))
+
+        self.assertEqual(parse_query_filters("paneer", CATEGORIES)[0].category_ids, {1})
+
+    def test_diet(self):
+        filters, _ = parse_query_filters("non veg starters", CATEGORIES)
+        # "non veg" must not also count as "veg"
+        self.assertEqual(filters.diet, {"non_veg"})
+        self.assertEqual(self.rows(filters), [1])
+        self.assertEqual(self.rows(MenuFilters(diet={"veg"})), [0, 2, 5])
+        self.assertEqual(self.rows(MenuFilters(diet={"egg"})), [3])
+
+    def test_available_only_by_default(self):
+        filters, _ = parse_query_filters("gulab jamun", CATEGORIES)
+        self.assertFalse(filters.is_empty())
+        self.assertNotIn(4, self.rows(filters))
+
+    def test_no_constraints(self):
+        self.assertTrue(MenuFilters(available=None).is_empty())
+        self.assertIsNone(self.rows(MenuFilters(available=None)))
+        self.assertIsNone(mask_for(None, MenuFilters(max_price=100), len(ITEMS)))
+
+
+@override_settings(MENU_EMBEDDINGS_DEBOUNCE_SECONDS=30, MENU_EMBEDDINGS_LOCK_TIMEOUT=900)
+class RegenerationDebounceTests(SimpleTestCase):
+    """request_menu_embeddings_regeneration() → one delayed, locked rebuild per burst of edits."""
+
+    def setUp(self):
+        cache.clear()
+        queue = mock.patch.object(tasks.regenerate_menu_embeddings_for_restaurant, "apply_async")
+        build = mock.patch.object(tasks, "_build_menu_embeddings")
+        self.apply_async = queue.start()
+        self.build = build.start()
+        self.addCleanup(queue.stop)
+        self.addCleanup(build.stop)
+
+    def key(self, name):
+        return tasks._regen_cache_key(7, name)
+
+    def queued_token(self):
+        args, kwargs = self.apply_async.call_args.args
+        self.assertEqual(args, (7,))
+        return kwargs["token"]
+
+    def go_quiet(self):
+        # last edit was a full quiet period ago
+        cache.set(self.key("dirty"), time.time() - 31)
+
+    def test_burst_of_edits_queues_one_delayed_run(self):
+        for _ in range(10):
+            tasks.request_menu_embeddings_regeneration(7)
+
+        self.apply_async.assert_called_once()
+        self.assertEqual(self.apply_async.call_args.kwargs["countdown"], 30)
+        self.assertEqual(cache.get(self.key("scheduled")), self.queued_token())
+        self.assertAlmostEqual(cache.get(self.key("dirty")), time.time(), delta=5)
+
+    def test_run_inside_quiet_period_is_pushed_back(self):
+        tasks.request_menu_embeddings_regeneration(7)
+        token = self.queued_token()
+        # another edit 20s after the first one was queued
+        cache.set(self.key("dirty"), time.time() - 10)
+
+        tasks.regenerate_menu_embeddings_for_restaurant(7, token=token)
+
+        self.build.assert_not_called()
+        self.assertEqual(self.apply_async.call_count, 2)
+        self.assertEqual(self.queued_token(), token)
+        self.assertAlmostEqual(self.apply_async.call_args.kwargs["countdown"], 20, delta=2)
+
+    def test_burst_coalesces_into_one_rebuild(self):
+        for _ in range(3):
+            tasks.request_menu_embeddings_regeneration(7)
+        token = self.queued_token()
+        self.go_quiet()
+
+        tasks.regenerate_menu_embeddings_for_restaurant(7, token=token)
+        # a late duplicate of that run, once a newer burst is queued: superseded
+        cache.set(self.key("scheduled"), "newer")
+        tasks.regenerate_menu_embeddings_for_restaurant(7, token=token)
+
+        self.build.assert_called_once_with(7)
+        self.assertIsNone(cache.get(self.key("dirty")))
+        self.assertIsNone(cache.get(self.key("lock")))
+
+    def test_edit_after_the_rebuild_started_schedules_a_new_run(self):
+        tasks.request_menu_embeddings_regeneration(7)
+        token = self.queued_token()
+        self.go_quiet()
+        self.build.side_effect = lambda rid: tasks.request_menu_embeddings_regeneration(rid)
+
+        tasks.regenerate_menu_embeddings_for_restaurant(7, token=token)
+
+        self.assertEqual(self.apply_async.call_count, 2)
+        self.assertNotEqual(self.queued_token(), token)
+        self.assertEqual(cache.get(self.key("scheduled")), self.queued_token())
+
+    def test_locked_restaurant_waits_for_the_running_rebuild(self):
+        tasks.request_menu_embeddings_regeneration(7)
+        token = self.queued_token()
+        self.go_quiet()
+        cache.set(self.key("lock"), "other-worker")
+
+        tasks.regenerate_menu_embeddings_for_restaurant(7, token=token)
+        self.build.assert_not_called()
+        self.assertEqual(self.queued_token(), token)
+        self.assertEqual(self.apply_async.call_args.kwargs["countdown"], 30)
+
+        # direct (bulk import) run while locked: merged into the queued one as a fresh edit
+        tasks.regenerate_menu_embeddings_for_restaurant(7)
+        self.build.assert_not_called()
+        self.assertEqual(self.apply_async.call_count, 2)
+
+        cache.delete(self.key("lock"))
+        self.go_quiet()
+        tasks.regenerate_menu_embeddings_for_restaurant(7, token=token)
+        self.build.assert_called_once_with(7)
+
+
+class HybridSearchTests(SimpleTestCase):
+    """BM25 keyword index, rank fusion and the lexical fast path (menu/lexical.py, menu/search_index.py)."""
+
+    TEXTS = [
+        "Item: Paneer Tikka. Category: Starters. Price: 65",
+        "Item: Paneer 65. Category: Starters. Price: 240",
+        "Item: Gulab Jamun. Category: Desserts. Description: Fried milk dumplings in syrup",
+        "Item: Masala Chai. Category: Beverages. Description: Spiced milk tea",
+    ]
+    # one axis per item: the "embedding" of a query picks its item directly
+    EMBEDDINGS = np.eye(4, dtype=np.float32)
+
+    def setUp(self):
+        self.encoded = []
+
+    def encode(self, item_row):
+        def encode(query):
+            self.encoded.append(query)
+            return self.EMBEDDINGS[item_row]
+        return encode
+
+    def index(self, **kwargs):
+        return MenuSearchIndex(self.EMBEDDINGS, self.TEXTS, **kwargs)
+
+    def names(self, hits):
+        return [self.TEXTS[h["index"]].split(".")[0][len("Item: "):] for h in hits]
+
+    def test_bm25_ranks_names_and_folds_plurals(self):
+        bm25 = BM25Index.build(self.TEXTS)
+        self.assertEqual([i for i, _ in bm25.search("paneer")], [0, 1])
+        self.assertEqual([i for i, _ in bm25.search("dessert")], [2])
+        self.assertEqual([i for i, _ in bm25.search("jamuns")], [2])
+        # prices are not indexed: "65" is the dish, not every ₹65 item
+        self.assertEqual([i for i, _ in bm25.search("paneer 65")][0], 1)
+        self.assertEqual([i for i, _ in bm25.search("65")], [1])
+
+    def test_bm25_round_trips_through_its_dict(self):
+        bm25 = BM25Index.build(self.TEXTS)
+        loaded = BM25Index.from_dict(bm25.to_dict())
+        np.testing.assert_allclose(loaded.scores("paneer tea"), bm25.scores("paneer tea"))
+
+    def test_rrf_prefers_items_both_rankers_agree_on(self):
+        # 2 is second in both lists, 1 and 4 top only one of them
+        fused = reciprocal_rank_fusion([[1, 2, 3], [4, 2, 3]])
+        self.assertEqual(fused[0][0], 2)
+        self.assertEqual({i for i, _ in fused}, {1, 2, 3, 4})
+        self.assertAlmostEqual(fused[0][1], 2 / 62)
+
+    def test_unambiguous_name_skips_the_encoder(self):
+        hits = self.index().search("gulab jamun", self.encode(3))
+        self.assertEqual(self.names(hits), ["Gulab Jamun"])
+        self.assertEqual(hits[0]["source"], "lexical")
+        self.assertEqual(self.encoded, [])
+
+    def test_ambiguous_query_fuses_both_rankings(self):
+        # "paneer" names two items: the cosine ranking breaks the tie
+        hits = self.index().search("paneer", self.encode(1), top_k=2)
+        self.assertEqual(self.names(hits), ["Paneer 65", "Paneer Tikka"])
+        self.assertEqual({h["source"] for h in hits}, {"hybrid"})
+        self.assertEqual(self.encoded, ["paneer"])
+
+    def test_no_keyword_match_is_semantic(self):
+        hits = self.index().search("something sweet", self.encode(2), top_k=1)
+        self.assertEqual(self.names(hits), ["Gulab Jamun"])
+        self.assertEqual(hits[0]["source"], "semantic")
+
+    def test_pickled_lexical_index_is_used_when_row_aligned(self):
+        stored = BM25Index.build(self.TEXTS, names=["a", "b", "c", "dal makhani"]).to_dict()
+        self.assertEqual([i for i, _ in self.index(lexical=stored).lexical.search("makhani")], [3])
+        # built over another file's rows: rebuilt from these texts instead
+        other = BM25Index.build(self.TEXTS[:2]).to_dict()
+        self.assertEqual([i for i, _ in self.index(lexical=other).lexical.search("chai")], [3])
+
+
+class QuantizationTests(SimpleTestCase):
+    """Compact embedding storage and the float32 re-rank (menu/quantize.py, menu/search_index.py)."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        # 40 dishes x 8 near-duplicates: close calls the compact scores can get wrong
+        centres = rng.normal(size=(40, 64))
+        self.unit = normalize_rows(np.repeat(centres, 8, axis=0) + rng.normal(scale=0.05, size=(320, 64)))
+        self.queries = normalize_rows(centres[:10] + rng.normal(scale=0.05, size=(10, 64)))
+        self.texts = [f"Item: Dish {i}" for i in range(len(self.unit))]
+
+    def test_round_trip_error_is_bounded(self):
+        half, _ = quantize(self.unit, "float16")
+        self.assertEqual(half.dtype, np.float16)
+        np.testing.assert_allclose(dequantize(half, None), self.unit, atol=1e-3)
+
+        q, scale = quantize(self.unit, "int8")
+        self.assertEqual(q.dtype, np.int8)
+        # rounding to the nearest step: half a step per dimension at most
+        self.assertTrue((np.abs(dequantize(q, scale) - self.unit) <= scale / 2 + 1e-7).all())
+
+        same, none = quantize(self.unit, "float32")
+        self.assertIs(same, self.unit)
+        self.assertIsNone(none)
+        with self.assertRaises(ValueError):
+            quantize(self.unit, "int4")
+
+    def test_compact_scores_approximate_the_cosine(self):
+        for dtype, atol in (("float16", 1e-3), ("int8", 0.05)):
+            matrix, scale = quantize(self.unit, dtype)
+            for query in self.queries:
+                with self.subTest(dtype=dtype):
+                    np.testing.assert_allclose(compact_scores(matrix, scale, query), self.unit @ query, atol=atol)
+
+    def test_sidecar_rerank_matches_float32_top_k(self):
+        exact = MenuSearchIndex(self.unit, self.texts)
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        np.save(os.path.join(tmp, "index.f32.npy"), self.unit)
+        # int8 scores alone do reorder the near-duplicates
+        q, scale = quantize(self.unit, "int8")
+        self.assertTrue(any(
+            (np.argsort(-compact_scores(q, scale, query))[:5] != np.argsort(-(self.unit @ query))[:5]).any()
+            for query in self.queries
+        ))
+
+        for dtype in ("float16", "int8"):
+            matrix, scale = quantize(self.unit, dtype)
+            payload = {
+                "embeddings": matrix,
+                "texts": self.texts,
+                "embedding_format": {"dtype": dtype, "scale": scale, "exact_file": "index.f32.npy"},
+            }
+            compact = MenuSearchIndex.from_payload(payload, path=os.path.join(tmp, "index.pkl"))
+            self.assertIsInstance(compact._exact, np.memmap)
+            for query in self.queries:
+                with self.subTest(dtype=dtype):
+                    want = exact.search("x", lambda _: query, top_k=5, mode="semantic")
+                    got = compact.search("x", lambda _: query, top_k=5, mode="semantic")
+                    self.assertEqual([h["index"] for h in got], [h["index"] for h in want])
+                    # scores are the exact cosines, not the compact approximation
+                    np.testing.assert_allclose([h["score"] for h in got], [h["score"] for h in want], rtol=1e-6)
+
+
+# one test process: its memory cache is as shared as Redis
+@override_settings(CACHE_SHARED=True)
+class MenuSnapshotTests(TestCase):
+    """Public menu from the snapshot: ETag per menu version, 304s (menu/snapshot.py)."""
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        self.restaurant = Restaurant.objects.create(owner=owner, name="Only Kulchas")
+        self.category = Category.objects.create(restaurant=self.restaurant, name="Breads")
+        with suspend_embedding_signals():
+            self.kulcha = MenuItem.objects.create(
+                restaurant=self.restaurant, category=self.category, name="Amritsari Kulcha",
+                price=Decimal("120"), external_item_id="k1",
+            )
+        self.url = f"/api/menu/restaurants/{self.restaurant.id}/menu-items/"
+
+    def get(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(self.url, headers=headers)
+
+    def edit(self, obj, **fields):
+        # the version is bumped on commit
+        with self.captureOnCommitCallbacks(execute=True), suspend_embedding_signals():
+            for name, value in fields.items():
+                setattr(obj, name, value)
+            obj.save()
+
+    def test_warm_reads_and_304s_skip_the_db(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([m["name"] for m in first.json()], ["Amritsari Kulcha"])
+        self.assertEqual(first["Cache-Control"], "no-cache")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get().content, first.content)
+            revalidated = self.get(first["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated["ETag"], first["ETag"])
+        self.assertEqual(self.get("W/" + first["ETag"]).status_code, 304)
+        self.assertEqual(self.get('"menu-0-stale", ' + first["ETag"]).status_code, 304)
+        self.assertEqual(self.get("*").status_code, 304)
+
+    def test_edit_changes_the_version(self):
+        before = self.get()
+        self.edit(self.kulcha, price=Decimal("140"))
+
+        after = self.get(before["ETag"])
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after["ETag"], before["ETag"])
+        self.assertEqual(after.json()[0]["price"], "140.00")
+        self.assertEqual(self.get(after["ETag"]).status_code, 304)
+
+    def test_category_rename_changes_the_version(self):
+        version = snapshot.menu_version(self.restaurant.id)
+        self.edit(self.category, name="Kulchas")
+        self.assertNotEqual(snapshot.menu_version(self.restaurant.id), version)
+        self.assertEqual(snapshot.get_snapshot(self.restaurant.id)["show_menu"]["menu_items"][0]["category"], "Kulchas")
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_reads_the_version_from_the_rows(self):
+        version = snapshot.menu_version(self.restaurant.id)
+        # another worker (or an import's archive step, which bypasses the signals)
+        MenuItem.objects.filter(pk=self.kulcha.pk).update(is_active=False)
+        self.assertNotEqual(snapshot.menu_version(self.restaurant.id), version)
+        self.assertEqual(self.get().json(), [])
+
+    def test_unknown_restaurant_is_an_empty_menu(self):
+        response = self.client.get("/api/menu/restaurants/999/menu-items/")
+        self.assertEqual((response.status_code, response.json()), (200, []))
+        self.assertIsNone(snapshot.get_snapshot(999))
+
+
+@override_settings(MENU_ENRICHMENT_MAX_ATTEMPTS=2, MENU_ENRICHMENT_BATCH_SIZE=10)
+class EnrichmentTests(TestCase):
+    ATTRS = {"diet": "veg", "allergens": ["dairy"], "dietary_tags": [], "calories": "~300 kcal"}
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        self.restaurant = Restaurant.objects.create(owner=owner, name="Only Kulchas")
+        with suspend_embedding_signals():
+            self.kulcha = MenuItem.objects.create(
+                restaurant=self.restaurant, name="Amritsari Kulcha", price=Decimal("120"), external_item_id="k1"
+            )
+            self.mystery = MenuItem.objects.create(
+                restaurant=self.restaurant, name="Chef's Surprise", price=Decimal("99"), external_item_id="s1"
+            )
+        for target in ("request_menu_embeddings_regeneration", "enrich_menu_for_restaurant.apply_async"):
+            patcher = mock.patch(f"menu.tasks.{target}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_enrichment(self, attempt):
+        # the LLM answers for the kulcha, never for the mystery item
+        with mock.patch("menu.enrichment.enrich_items_batch", return_value=[self.ATTRS, None]):
+            tasks.enrich_menu_for_restaurant(self.restaurant.id, attempt=attempt)
+
+    def pending(self):
+        return [item.name for item in pending_items(self.restaurant.id)]
+
+    def test_left_out_item_stays_pending_and_is_retried(self):
+        self.run_enrichment(attempt=0)
+        self.assertEqual(self.pending(), ["Chef's Surprise"])
+        tasks.enrich_menu_for_restaurant.apply_async.assert_called_once()
+
+    def test_last_attempt_records_the_hash_so_edits_stop_requeueing(self):
+        self.run_enrichment(attempt=2)
+
+        # _build_menu_embeddings queues enrichment only while something is pending
+        self.assertEqual(self.pending(), [])
+        tasks.enrich_menu_for_restaurant.apply_async.assert_not_called()
+        self.mystery.refresh_from_db()
+        self.assertEqual((self.mystery.diet, self.mystery.calories, self.mystery.enriched_at), ("", "", None))
+        self.kulcha.refresh_from_db()
+        self.assertEqual(self.kulcha.calories, "~300 kcal")
+
+        # new content: worth another try
+        self.mystery.description = "Paneer, peas and cashews"
+        with suspend_embedding_signals():
+            self.mystery.save()
+        self.assertEqual(self.pending(), ["Chef's Surprise"])
@@ -1,4 +1,5 @@
 # menu/views.py
+from django.http import HttpResponse
 from django.views.generic import TemplateView
 
 from rest_framework import viewsets
@@ -9,59 +10,62 @@ from rest_framework.authentication import SessionAuthentication
 
 from django.db.models import Count
 
+from restaurant_backend.db import ReplicaReadMixin
 from restaurants.models import Restaurant
+from restaurants.tenant import OwnerRestaurantMixin
 from .models import MenuItem, Category, MenuSection
 from .serializers import MenuItemSerializer, CategorySerializer, MenuSectionSerializer
 from .services import normalize_name
+from .snapshot import get_snapshot, menu_version, etag, etag_matches
 
 
 class ApiDemoView(TemplateView):
     template_name = "api_demo.html"
 
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuItemViewSet(OwnerRestaurantMixin, viewsets.ModelViewSet):
     serializer_class = MenuItemSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication, SessionAuthentication]
 
-    def _get_restaurant(self):
+    def _get_restaurant_id(self):
+        # owner's restaurant: cached id (restaurants/tenant.py), no query
         user = self.request.user
         restaurant_id = self.request.query_params.get("restaurant_id")
 
         if getattr(user, "is_superuser", False) or getattr(user, "is_superadmin", False):
             if restaurant_id:
                 try:
-                    return Restaurant.objects.get(id=restaurant_id)
+                    return Restaurant.objects.only("id").get(id=restaurant_id).id
                 except Restaurant.DoesNotExist:
                     raise ValidationError({"detail": "Restaurant not found."})
 
-            owned = Restaurant.objects.filter(owner=user).first()
+            owned = self.owner_restaurant_id()
             if owned:
                 return owned
 
             raise ValidationError({"detail": "Superadmin: provide ?restaurant_id or own a restaurant."})
 
-        restaurant = Restaurant.objects.filter(owner=user).first()
-        if not restaurant:
+        owned = self.owner_restaurant_id()
+        if not owned:
             raise ValidationError({"detail": "This user is not linked to any restaurant."})
 
-        if restaurant_id and str(restaurant.id) != restaurant_id:
+        if restaurant_id and str(owned) != restaurant_id:
             raise ValidationError({"detail": "You are not allowed to access this restaurant."})
 
-        return restaurant
+        return owned
 
     def get_queryset(self):
-        restaurant = self._get_restaurant()
+        restaurant_id = self._get_restaurant_id()
         return (
             MenuItem.objects
-            .filter(restaurant=restaurant, is_active=True)
+            .filter(restaurant_id=restaurant_id, is_active=True)
             .select_related("category", "menu_section")
             .order_by("category__position", "menu_section__position", "position", "name")
         )
 
     def perform_create(self, serializer):
-        restaurant = self._get_restaurant()
-        instance = serializer.save(restaurant=restaurant)
+        instance = serializer.save(restaurant_id=self._get_restaurant_id())
 
         if instance.name:
             new_norm = normalize_name(instance.name)
@@ -81,7 +85,7 @@ class MenuItemViewSet(viewsets.ModelViewSet):
         return instance
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(OwnerRestaurantMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication, SessionAuthentication]
@@ -93,18 +97,18 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         if getattr(user, "is_superuser", False) or getattr(user, "is_superadmin", False):
             if restaurant_id:
                 return Category.objects.filter(restaurant_id=restaurant_id, is_active=True).order_by("position", "name")
-            owned = Restaurant.objects.filter(owner=user).first()
+            owned = self.owner_restaurant_id()
             if owned:
-                return Category.objects.filter(restaurant=owned, is_active=True).order_by("position", "name")
+                return Category.objects.filter(restaurant_id=owned, is_active=True).order_by("position", "name")
             return Category.objects.none()
 
-        restaurant = Restaurant.objects.filter(owner=user).first()
-        if not restaurant:
+        owned = self.owner_restaurant_id()
+        if not owned:
             return Category.objects.none()
-        return Category.objects.filter(restaurant=restaurant, is_active=True).order_by("position", "name")
+        return Category.objects.filter(restaurant_id=owned, is_active=True).order_by("position", "name")
 
 
-class MenuSectionViewSet(viewsets.ReadOnlyModelViewSet):
+class MenuSectionViewSet(OwnerRestaurantMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = MenuSectionSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication, SessionAuthentication]
@@ -118,23 +122,43 @@ class MenuSectionViewSet(viewsets.ReadOnlyModelViewSet):
         if getattr(user, "is_superuser", False) or getattr(user, "is_superadmin", False):
             if restaurant_id:
                 return qs.filter(restaurant_id=restaurant_id).order_by("category__position", "position", "name")
-            owned = Restaurant.objects.filter(owner=user).first()
+            owned = self.owner_restaurant_id()
             if owned:
-                return qs.filter(restaurant=owned).order_by("category__position", "position", "name")
+                return qs.filter(restaurant_id=owned).order_by("category__position", "position", "name")
             return MenuSection.objects.none()
 
-        restaurant = Restaurant.objects.filter(owner=user).first()
-        if not restaurant:
+        owned = self.owner_restaurant_id()
+        if not owned:
             return MenuSection.objects.none()
-        return qs.filter(restaurant=restaurant).order_by("category__position", "position", "name")
+        return qs.filter(restaurant_id=owned).order_by("category__position", "position", "name")
 
 
-class RestaurantMenuViewSet(viewsets.ReadOnlyModelViewSet):
+class RestaurantMenuViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     Public endpoint: /menu/restaurants/<id>/menu-items/
+    Served from the menu snapshot (menu/snapshot.py): ETag per menu version,
+    If-None-Match → 304, no DB query once the snapshot is warm.
+    Reads go to the replica when one is configured (restaurant_backend/db.py).
     """
     serializer_class = MenuItemSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def list(self, request, *args, **kwargs):
+        restaurant_id = self.kwargs.get("restaurant_id")
+        current = etag(restaurant_id, menu_version(restaurant_id))
+        if etag_matches(request, current):
+            return HttpResponse(status=304, headers={"ETag": current})
+
+        snapshot = get_snapshot(restaurant_id)
+        if snapshot is None:
+            return HttpResponse(b"[]", content_type="application/json")
+        return HttpResponse(
+            snapshot["items_json"],
+            content_type="application/json",
+            # revalidate every time: a menu edit must show up on the next load
+            headers={"ETag": snapshot["etag"], "Cache-Control": "no-cache"},
+        )
 
     def get_queryset(self):
         restaurant_id = self.kwargs.get("restaurant_id")
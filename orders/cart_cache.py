@@ -0,0 +1,94 @@
+# orders/cart_cache.py
+"""
+Write-through cache of chatbot carts, keyed by (restaurant, session_id).
+
+The value is the cart snapshot the chat payload sends ("order" block: id,
+status, totals, lines); a session without an open cart is stored as the
+empty snapshot (id None), so "no cart" is cached too.
+
+- chatbot/services.py: read-only intents answer from get(); every cart
+  mutation ends with put(order)
+- payments/views.py and the cart reaper (orders/carts.py) invalidate() when
+  an order leaves the cart state outside the chat
+
+Anything else that changes a PENDING order (admin edits) is picked up once
+the entry expires (CHAT_CART_CACHE_TTL_SECONDS) or the next chat mutation.
+
+Needs a cache shared by all processes (CACHE_SHARED): with a per-process
+cache another worker would keep answering from its own stale copy, so
+get() always misses and put() stores nothing; every turn reads the DB.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Order
+
+
+def _key(restaurant_id, session_id: str) -> str:
+    return f"chat-cart:{restaurant_id}:{session_id}"
+
+
+def empty_snapshot() -> dict:
+    return {
+        "id": None,
+        "status": Order.OrderStatus.PENDING.value,
+        "subtotal": "0.00",
+        "tax": "0.00",
+        "total": "0.00",
+        "items": [],
+    }
+
+
+def snapshot(order: Order) -> dict:
+    """Snapshot of a cart; uses the prefetched items (order.items.all()) when present."""
+    if order.pk is None:
+        return empty_snapshot()
+    return {
+        "id": order.id,
+        "status": str(order.status),
+        "subtotal": str(order.subtotal),
+        "tax": str(order.tax),
+        "total": str(order.total),
+        "items": [
+            {
+                "id": item.menu_item_id,
+                "name": item.name,
+                "quantity": item.quantity,
+                "unit_price": str(item.unit_price),
+                "total_price": str(item.total_price),
+            }
+            for item in order.items.all()
+        ],
+    }
+
+
+def get(restaurant_id, session_id: str) -> dict | None:
+    """The cached cart snapshot (id None = no open cart); None if unknown."""
+    if not settings.CACHE_SHARED:
+        return None
+    return cache.get(_key(restaurant_id, session_id))
+
+
+def put(order: Order) -> dict:
+    """
+    Store the order's current state and return its snapshot. An order that is
+    no longer PENDING (just confirmed) is stored as "no open cart".
+    """
+    data = snapshot(order)
+    if not settings.CACHE_SHARED:
+        return data
+    cached = data if order.status == Order.OrderStatus.PENDING else empty_snapshot()
+    cache.set(_key(order.restaurant_id, order.session_id), cached, timeout=settings.CHAT_CART_CACHE_TTL_SECONDS)
+    return data
+
+
+def invalidate(restaurant_id, session_id: str) -> None:
+    if session_id:
+        cache.delete(_key(restaurant_id, session_id))
+
+
+def invalidate_many(carts) -> None:
+    """carts: iterable of (restaurant_id, session_id)."""
+    keys = [_key(rid, session_id) for rid, session_id in carts if session_id]
+    if keys:
+        cache.delete_many(keys)
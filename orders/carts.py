@@ -0,0 +1,79 @@
+# orders/carts.py
+"""
+Chatbot cart lifecycle.
+
+A cart is a PENDING order keyed by (restaurant, session_id). It is only
+created by the first ADD_ITEM (chatbot/services.py); carts nobody touched
+for CART_TTL_HOURS are reaped in batches by reap_stale_carts() (Celery
+beat, orders/tasks.py):
+
+- carts with items -> EXPIRED (kept for abandoned-cart numbers)
+- empty carts (cleared, or left over from before lazy creation) -> deleted
+
+Both keep PENDING small, which is what every chat turn's
+(restaurant, status) / (restaurant, session_id) lookups scan.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from backoffice.stats import STATUS_FIELDS, apply_delta
+from restaurant_backend.observability import log_event
+from . import cart_cache
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+
+def stale_carts(ttl_hours: int | None = None):
+    cutoff = timezone.now() - timedelta(hours=ttl_hours or settings.CART_TTL_HOURS)
+    return Order.objects.filter(status=Order.OrderStatus.PENDING, updated_at__lt=cutoff).order_by()
+
+
+def _expire(rows: list[tuple]) -> int:
+    """rows: (id, restaurant_id, session_id) of PENDING carts with items."""
+    ids = [order_id for order_id, _, _ in rows]
+    with transaction.atomic():
+        # re-check the status: a cart confirmed meanwhile must stay confirmed
+        expired = Order.objects.filter(pk__in=ids, status=Order.OrderStatus.PENDING).update(
+            status=Order.OrderStatus.EXPIRED, updated_at=timezone.now()
+        )
+        if expired == len(ids):
+            # .update() skips the Order signals: move the dashboard counters here
+            for restaurant_id, count in Counter(rid for _, rid, _ in rows).items():
+                apply_delta(restaurant_id, {STATUS_FIELDS[Order.OrderStatus.PENDING]: -count})
+    # (expired < len(ids): a race with a confirm; the next stats rollup settles the counters)
+    cart_cache.invalidate_many((rid, session_id) for _, rid, session_id in rows)
+    return expired
+
+
+def reap_stale_carts(ttl_hours: int | None = None, batch_size: int | None = None) -> dict:
+    """Expire / delete PENDING carts idle for ttl_hours; returns the counts."""
+    batch_size = batch_size or settings.CART_REAPER_BATCH_SIZE
+    counts = {"expired": 0, "deleted": 0}
+
+    empty = stale_carts(ttl_hours).filter(items__isnull=True)
+    while True:
+        rows = list(empty.values_list("id", "restaurant_id", "session_id")[:batch_size])
+        if not rows:
+            break
+        ids = [order_id for order_id, _, _ in rows]
+        # queryset delete: post_delete signals keep counters / rollups right
+        counts["deleted"] += Order.objects.filter(pk__in=ids, items__isnull=True).delete()[1].get(
+            Order._meta.label, 0
+        )
+        cart_cache.invalidate_many((rid, session_id) for _, rid, session_id in rows)
+
+    with_items = stale_carts(ttl_hours).filter(items__isnull=False).distinct()
+    while True:
+        rows = list(with_items.values_list("id", "restaurant_id", "session_id")[:batch_size])
+        if not rows:
+            break
+        counts["expired"] += _expire(rows)
+
+    log_event(logger, "carts_reaped", **counts)
+    return counts
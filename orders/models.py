@@ -29,6 +29,8 @@ class Order(models.Model):
         READY = "READY", "Ready"
         COMPLETED = "COMPLETED", "Completed"
         CANCELLED = "CANCELLED", "Cancelled"
+        # chatbot cart abandoned for CART_TTL_HOURS (orders/carts.py)
+        EXPIRED = "EXPIRED", "Expired"
 
     class PaymentMethod(models.TextChoices):
         PAY_AT_COUNTER = "PAY_AT_COUNTER", "Pay at counter"
@@ -136,7 +138,8 @@ class Order(models.Model):
         self.total = self.subtotal + self.tax
 
         if save:
-            self.save(update_fields=["subtotal", "tax", "total"])
+            # updated_at too: the cart reaper reads it as "last activity"
+            self.save(update_fields=["subtotal", "tax", "total", "updated_at"])
 
 
 class OrderItem(models.Model):
@@ -0,0 +1,10 @@
+# orders/tasks.py
+from celery import shared_task
+
+from .carts import reap_stale_carts as _reap_stale_carts
+
+
+@shared_task
+def reap_stale_carts() -> dict:
+    """Periodic (beat) cart cleanup; returns {"expired": n, "deleted": n}."""
+    return _reap_stale_carts()
@@ -1,3 +1,134 @@
-from django.test import TestCase
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from backoffice import stats
+from backoffice.models import RestaurantStats
+from chatbot import recommendations
+from chatbot.engine import ChatbotResult
+from chatbot.services import apply_intent
+from menu.embedding_context import suspend_embedding_signals
+from menu.models import MenuItem
+from restaurants.models import Restaurant
+
+from . import cart_cache
+from .carts import _expire, reap_stale_carts
+from .models import Order, OrderItem
+
+COUNTERS = ["orders_total", "orders_pending", "orders_confirmed", "gmv", "chatbot_orders", "chatbot_conversions"]
+
+
+# one test process: its memory cache is as shared as Redis
+@override_settings(CACHE_SHARED=True, CART_TTL_HOURS=24)
+class CartReaperTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        self.restaurant = Restaurant.objects.create(owner=owner, name="Only Kulchas")
+        with suspend_embedding_signals():
+            self.kulcha = MenuItem.objects.create(
+                restaurant=self.restaurant, name="Amritsari Kulcha", price=Decimal("120"), external_item_id="k1"
+            )
+        recommendations.refresh(self.restaurant.id)
+        self.now = timezone.now()
+
+    @contextmanager
+    def hours_ago(self, hours):
+        # auto_now and the reaper's cutoff both read timezone.now()
+        with mock.patch("django.utils.timezone.now", return_value=self.now - timedelta(hours=hours)):
+            yield
+
+    def cart(self, session_id, items=0, idle_hours=48):
+        with self.hours_ago(idle_hours):
+            order = Order.objects.create(
+                restaurant=self.restaurant, session_id=session_id,
+                order_type=Order.OrderType.TAKEAWAY, source="chatbot",
+            )
+            for _ in range(items):
+                OrderItem.objects.create(
+                    order=order, menu_item=self.kulcha, name=self.kulcha.name,
+                    quantity=1, unit_price=self.kulcha.price, total_price=self.kulcha.price,
+                )
+            order.recalc_totals()
+        cart_cache.put(order)
+        return order
+
+    def add_item(self, session_id, hours_ago):
+        with self.hours_ago(hours_ago):
+            result = ChatbotResult(intent="ADD_ITEM", reply="", item_name="Amritsari Kulcha")
+            return apply_intent(self.restaurant, session_id, result)[1]
+
+    def test_cart_in_use_outlives_the_ttl(self):
+        # both carts started 30h ago; one kept getting items until 6h ago
+        self.add_item("sess_active", hours_ago=30)
+        self.add_item("sess_idle", hours_ago=30)
+        self.add_item("sess_active", hours_ago=6)
+
+        self.assertEqual(reap_stale_carts(), {"expired": 1, "deleted": 0})
+        active = Order.objects.get(session_id="sess_active")
+        self.assertEqual(active.status, Order.OrderStatus.PENDING)
+        self.assertEqual(Order.objects.get(session_id="sess_idle").status, Order.OrderStatus.EXPIRED)
+
+        # idle for a full TTL after its last item: reaped too
+        with self.hours_ago(-19):
+            self.assertEqual(reap_stale_carts(), {"expired": 1, "deleted": 0})
+
+    def counters(self):
+        row = RestaurantStats.objects.get(restaurant=self.restaurant)
+        return {field: getattr(row, field) for field in COUNTERS}
+
+    def test_reaps_idle_carts(self):
+        empty = self.cart("sess_empty")
+        full = self.cart("sess_full", items=2)
+        fresh = self.cart("sess_fresh", items=1, idle_hours=1)
+        stats.rollup()
+
+        self.assertEqual(reap_stale_carts(batch_size=1), {"expired": 1, "deleted": 1})
+
+        self.assertFalse(Order.objects.filter(pk=empty.pk).exists())
+        full.refresh_from_db()
+        self.assertEqual(full.status, Order.OrderStatus.EXPIRED)
+        self.assertEqual(full.items.count(), 2)
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, Order.OrderStatus.PENDING)
+
+        # reaped sessions start over; the active one keeps its cached cart
+        self.assertIsNone(cart_cache.get(self.restaurant.id, "sess_empty"))
+        self.assertIsNone(cart_cache.get(self.restaurant.id, "sess_full"))
+        self.assertEqual(cart_cache.get(self.restaurant.id, "sess_fresh")["id"], fresh.id)
+
+    def test_counters_match_a_rollup(self):
+        self.cart("sess_empty")
+        self.cart("sess_full", items=1)
+        stats.rollup()
+        self.assertEqual(self.counters()["orders_pending"], 2)
+
+        reap_stale_carts()
+        reaped = self.counters()
+        self.assertEqual(reaped["orders_pending"], 0)
+        # the expired cart still counts towards orders_total / chatbot_orders
+        self.assertEqual(reaped["orders_total"], 1)
+        stats.rollup()
+        self.assertEqual(reaped, self.counters())
+
+    def test_cart_confirmed_meanwhile_is_left_alone(self):
+        full = self.cart("sess_full", items=1)
+        stats.rollup()
+        rows = [(full.id, self.restaurant.id, "sess_full")]
+        # picked up as stale, then paid before the UPDATE ran
+        full.status = Order.OrderStatus.CONFIRMED
+        full.save(update_fields=["status"])
+        before = self.counters()
+
+        self.assertEqual(_expire(rows), 0)
+
+        full.refresh_from_db()
+        self.assertEqual(full.status, Order.OrderStatus.CONFIRMED)
+        self.assertEqual(self.counters(), before)
+        self.assertEqual(before["orders_confirmed"], 1)
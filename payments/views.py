@@ -12,6 +12,7 @@ from rest_framework import status
 import json
 import razorpay
 
+from orders import cart_cache
 from orders.models import Order
 from .models import Payment
 
@@ -70,6 +71,8 @@ def create_payment(request):
             "status": "CREATED",
         },
     )
+    # payment started: the chat must re-read this cart from the DB
+    cart_cache.invalidate(order.restaurant_id, order.session_id)
 
     return Response(
         {
@@ -156,6 +159,8 @@ def verify_payment(request):
 
         order.save(update_fields=["status", "payment_status"] 
                    if hasattr(order, "payment_status") else ["status"])
+        # no longer an open cart for this chat session
+        cart_cache.invalidate(order.restaurant_id, order.session_id)
 
         return JsonResponse({"status": "success"}, status=200)
 
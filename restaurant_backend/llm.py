@@ -0,0 +1,321 @@
+# restaurant_backend/llm.py
+"""
+Single gateway for every Groq (OpenAI-compatible) chat completion call.
+
+- one pooled HTTP client per process (TLS connections are reused), created
+  lazily so Celery prefork children don't share sockets with the parent;
+  the async client lives on one gateway event loop thread, so callers'
+  short-lived loops (async_to_sync under WSGI) share it too
+- sync `chat_completion()` and async `achat_completion()` with the same arguments
+  as `client.chat.completions.create()`; `stream_chat_completion()` yields deltas
+- per-call timeout, retries with jittered exponential backoff on 429 / 5xx /
+  connection errors (Retry-After is honoured)
+- process-wide concurrency cap; callers wait at most their timeout for a slot
+- LLM_BASE_URL points everything at a local stub server in tests
+  (see restaurant_backend/llm_stub.py)
+"""
+import asyncio
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+from .observability import log_event, span
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+
+
+class LLMError(Exception):
+    """Raised when a completion could not be obtained (after retries)."""
+
+
+class LLMNotConfigured(LLMError):
+    pass
+
+
+class LLMBusy(LLMError):
+    """No concurrency slot became free within the call's timeout."""
+
+
+def _setting(name: str, default):
+    """Django setting when available (tests can override), else env var."""
+    try:
+        from django.conf import settings
+
+        if settings.configured and hasattr(settings, name):
+            return getattr(settings, name)
+    except ImportError:
+        pass
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return type(default)(value) if default is not None else value
+
+
+def api_key() -> str | None:
+    return _setting("GROQ_API_KEY", None)
+
+
+def is_configured() -> bool:
+    return bool(api_key())
+
+
+def _limits() -> httpx.Limits:
+    pool = int(_setting("LLM_POOL_SIZE", 20))
+    return httpx.Limits(max_connections=pool, max_keepalive_connections=pool, keepalive_expiry=60)
+
+
+def _client_kwargs(key: str | None) -> dict:
+    key = key or api_key()
+    if not key:
+        raise LLMNotConfigured("GROQ_API_KEY not found. Add it to your .env file.")
+    kwargs = {
+        "api_key": key,
+        # retries are done here (jitter + concurrency aware), not inside the SDK
+        "max_retries": 0,
+        "timeout": float(_setting("LLM_TIMEOUT_SECONDS", 30.0)),
+    }
+    base_url = _setting("LLM_BASE_URL", "")
+    if base_url:
+        kwargs["base_url"] = base_url
+    return kwargs
+
+
+# ------------------------------------------------------------
+# Sync
+# ------------------------------------------------------------
+_lock = threading.Lock()
+_clients: dict = {}  # (api key, base url, timeout) -> Groq
+_client_pid = None
+_semaphore = None
+
+
+def _fresh_process_state() -> None:
+    """New pools + semaphores sized from the settings; _lock held. Fork → never reuse the parent's connections."""
+    global _client_pid, _semaphore, _async_clients, _async_semaphore
+    _clients.clear()
+    _semaphore = threading.BoundedSemaphore(int(_setting("LLM_MAX_CONCURRENCY", 8)))
+    if _async_loop_pid == os.getpid() and _async_clients:
+        # same process (tests reset the state): close the old async pool on its loop
+        asyncio.run_coroutine_threadsafe(_aclose(list(_async_clients.values())), _async_loop)
+    _async_clients = {}
+    _async_semaphore = None
+    _client_pid = os.getpid()
+
+
+def get_client(key: str | None = None):
+    """Shared sync Groq client (pooled httpx.Client) for this process."""
+    from groq import Groq
+
+    with _lock:
+        if _client_pid != os.getpid():
+            _fresh_process_state()
+
+        kwargs = _client_kwargs(key)
+        cache_key = tuple(sorted(kwargs.items()))
+        client = _clients.get(cache_key)
+        if client is None:
+            client = Groq(http_client=httpx.Client(limits=_limits()), **kwargs)
+            _clients[cache_key] = client
+        return client
+
+
+def _retry_delay(attempt: int, error) -> float:
+    """Full-jitter exponential backoff; a server Retry-After wins when present."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+    base = float(_setting("LLM_RETRY_BASE_SECONDS", 0.5))
+    return random.uniform(0, min(8.0, base * (2 ** attempt)))
+
+
+def _is_retryable(error) -> bool:
+    import groq
+
+    if isinstance(error, (groq.APIConnectionError, groq.APITimeoutError, groq.RateLimitError)):
+        return True
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _log_retry(error, attempt: int, retries: int, delay: float) -> None:
+    log_event(
+        logger, "llm_retry", logging.WARNING,
+        error=type(error).__name__, attempt=attempt + 1, retries=retries, delay_s=round(delay, 2),
+    )
+
+
+def chat_completion(*, model: str = DEFAULT_MODEL, timeout: float | None = None, api_key: str | None = None, **kwargs):
+    """
+    `client.chat.completions.create(model=..., **kwargs)` through the shared pool.
+    Returns the SDK completion object; raises LLMError subclasses or the last SDK error.
+    """
+    client = get_client(api_key)
+    timeout = timeout or float(_setting("LLM_TIMEOUT_SECONDS", 30.0))
+    retries = int(_setting("LLM_MAX_RETRIES", 3))
+
+    if not _semaphore.acquire(timeout=timeout):
+        raise LLMBusy(f"no LLM slot free within {timeout}s")
+    try:
+        with span("llm", model=model, mode="sync"):
+            for attempt in range(retries + 1):
+                try:
+                    return client.chat.completions.create(model=model, timeout=timeout, **kwargs)
+                except Exception as e:
+                    if attempt >= retries or not _is_retryable(e):
+                        raise
+                    delay = _retry_delay(attempt, e)
+                    _log_retry(e, attempt, retries, delay)
+                    time.sleep(delay)
+    finally:
+        _semaphore.release()
+
+
+def stream_chat_completion(*, model: str = DEFAULT_MODEL, timeout: float | None = None, api_key: str | None = None, **kwargs):
+    """
+    Streaming variant of chat_completion(): yields text deltas as they arrive.
+    Retries only happen before the first chunk; the concurrency slot is held
+    until the stream is exhausted or the generator is closed (client went away).
+    """
+    client = get_client(api_key)
+    timeout = timeout or float(_setting("LLM_TIMEOUT_SECONDS", 30.0))
+    retries = int(_setting("LLM_MAX_RETRIES", 3))
+
+    if not _semaphore.acquire(timeout=timeout):
+        raise LLMBusy(f"no LLM slot free within {timeout}s")
+    try:
+        with span("llm", model=model, mode="stream"):
+            for attempt in range(retries + 1):
+                try:
+                    stream = client.chat.completions.create(model=model, timeout=timeout, stream=True, **kwargs)
+                    break
+                except Exception as e:
+                    if attempt >= retries or not _is_retryable(e):
+                        raise
+                    delay = _retry_delay(attempt, e)
+                    _log_retry(e, attempt, retries, delay)
+                    time.sleep(delay)
+
+            try:
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            finally:
+                stream.close()
+    finally:
+        _semaphore.release()
+
+
+def completion_text(completion) -> str:
+    return (completion.choices[0].message.content or "").strip()
+
+
+# ------------------------------------------------------------
+# Async
+# ------------------------------------------------------------
+# An AsyncClient (and asyncio.Semaphore) is bound to the loop it was created on.
+# Callers' loops are often short-lived (async_to_sync makes one per call), so
+# the pooled client lives on one gateway loop thread per process instead and
+# calls are awaited across; it is closed at exit (or on a state reset).
+_async_loop = None
+_async_loop_pid = None
+_async_clients: dict = {}  # same keys as _clients -> AsyncGroq
+_async_semaphore = None
+
+
+def _gateway_loop() -> asyncio.AbstractEventLoop:
+    global _async_loop, _async_loop_pid
+    with _lock:
+        if _async_loop_pid != os.getpid():
+            # first use, or a forked child (the parent's loop thread isn't here)
+            _async_loop = asyncio.new_event_loop()
+            threading.Thread(target=_async_loop.run_forever, name="llm-gateway", daemon=True).start()
+            _async_loop_pid = os.getpid()
+        return _async_loop
+
+
+def get_async_client(key: str | None = None):
+    """Shared AsyncGroq client + semaphore; only call on the gateway loop."""
+    global _async_semaphore
+    from groq import AsyncGroq
+
+    with _lock:
+        if _client_pid != os.getpid():
+            _fresh_process_state()
+        if _async_semaphore is None:
+            _async_semaphore = asyncio.Semaphore(int(_setting("LLM_MAX_CONCURRENCY", 8)))
+
+        kwargs = _client_kwargs(key)
+        cache_key = tuple(sorted(kwargs.items()))
+        client = _async_clients.get(cache_key)
+        if client is None:
+            client = AsyncGroq(http_client=httpx.AsyncClient(limits=_limits()), **kwargs)
+            _async_clients[cache_key] = client
+        return client, _async_semaphore
+
+
+async def _aclose(clients) -> None:
+    for client in clients:
+        await client.close()
+
+
+def close_async_clients(timeout: float = 5.0) -> None:
+    """Close the pooled async connections (process exit, tests)."""
+    global _async_clients, _async_semaphore
+    with _lock:
+        if _async_loop_pid != os.getpid() or not _async_clients:
+            return
+        clients, _async_clients, _async_semaphore = list(_async_clients.values()), {}, None
+    asyncio.run_coroutine_threadsafe(_aclose(clients), _async_loop).result(timeout)
+
+
+atexit.register(close_async_clients)
+
+
+async def achat_completion(*, model: str = DEFAULT_MODEL, timeout: float | None = None, api_key: str | None = None, **kwargs):
+    """Async twin of chat_completion() - does not block the event loop while waiting."""
+    # cancelling the caller cancels the call on the gateway loop too
+    future = asyncio.run_coroutine_threadsafe(
+        _achat_completion(model=model, timeout=timeout, api_key=api_key, **kwargs), _gateway_loop()
+    )
+    return await asyncio.wrap_future(future)
+
+
+async def _achat_completion(*, model: str, timeout: float | None, api_key: str | None, **kwargs):
+    client, semaphore = get_async_client(api_key)
+    timeout = timeout or float(_setting("LLM_TIMEOUT_SECONDS", 30.0))
+    retries = int(_setting("LLM_MAX_RETRIES", 3))
+
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise LLMBusy(f"no LLM slot free within {timeout}s")
+    try:
+        with span("llm", model=model, mode="async"):
+            for attempt in range(retries + 1):
+                try:
+                    return await client.chat.completions.create(model=model, timeout=timeout, **kwargs)
+                except Exception as e:
+                    if attempt >= retries or not _is_retryable(e):
+                        raise
+                    delay = _retry_delay(attempt, e)
+                    _log_retry(e, attempt, retries, delay)
+                    await asyncio.sleep(delay)
+    finally:
+        semaphore.release()
@@ -0,0 +1,105 @@
+# restaurant_backend/llm_stub.py
+"""
+Tiny local OpenAI/Groq-compatible server for tests and offline runs.
+
+    with StubLLMServer(lambda req: '{"calories": {"1": "~300 kcal"}}') as stub:
+        with override_settings(LLM_BASE_URL=stub.url, GROQ_API_KEY="test"):
+            ...  # every restaurant_backend.llm call hits the stub
+
+The responder gets the request JSON and returns the reply text, or an int
+HTTP status to simulate failures (e.g. 429 / 503 to exercise retries).
+Requests with "stream": true get the reply back as SSE chunks, one per word.
+`delay` simulates model latency (seconds before the reply / first chunk).
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubLLMServer:
+    def __init__(self, responder=None, port: int = 0, chunk_delay: float = 0.0, delay: float = 0.0):
+        self.responder = responder or (lambda request: "ok")
+        self.delay = delay
+        self.chunk_delay = chunk_delay  # seconds between streamed chunks
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("content-length") or 0))
+                request = json.loads(body or b"{}")
+                stub.requests.append(request)
+                reply = stub.responder(request)
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                if isinstance(reply, int):
+                    self._send(reply, {"error": {"message": f"stub status {reply}"}})
+                    return
+                if request.get("stream"):
+                    self._stream(request, reply)
+                    return
+                self._send(200, {
+                    "id": f"stub-{len(stub.requests)}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": reply},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            def _stream(self, request, reply):
+                # one SSE chunk per word, like the real API's token deltas
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.end_headers()
+                words = reply.split(" ")
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": f"stub-{len(stub.requests)}",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": word + (" " if i < len(words) - 1 else "")},
+                            "finish_reason": None,
+                        }],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if stub.chunk_delay:
+                        time.sleep(stub.chunk_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                if status == 429:
+                    self.send_header("retry-after", "0")
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
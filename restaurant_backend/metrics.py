@@ -0,0 +1,129 @@
+# restaurant_backend/metrics.py
+"""
+Minimal in-process metrics registry (no external client library).
+
+    CHAT_TTFT = histogram("chat_stream_ttft_seconds", "Time to first streamed token")
+    CHAT_TTFT.observe(0.42, endpoint="menu_chat")
+
+Values live per process; snapshot() returns plain dicts for logging / export
+and render_prometheus() the text exposition format served at /metrics
+(with several workers each scrape sees the worker that answered it).
+"""
+import threading
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_registry: dict = {}
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._values: dict = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> dict:
+        with _lock:
+            return dict(self._values)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict = {}  # labels -> {"buckets": [...], "sum": float, "count": int}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def snapshot(self) -> dict:
+        with _lock:
+            return {
+                key: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                for key, v in self._values.items()
+            }
+
+
+def _get_or_create(cls, name, *args, **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, *args, **kwargs)
+            _registry[name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"metric {name} already registered as {metric.kind}")
+        return metric
+
+
+def counter(name: str, help: str = "") -> Counter:
+    return _get_or_create(Counter, name, help)
+
+
+def histogram(name: str, help: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, help, buckets=buckets)
+
+
+def registry() -> dict:
+    with _lock:
+        return dict(_registry)
+
+
+# ------------------------------------------------------------
+# Prometheus text exposition
+# ------------------------------------------------------------
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus() -> str:
+    lines = []
+    for name, metric in sorted(registry().items()):
+        lines.append(f"# HELP {name} {_escape(metric.help)}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(metric.snapshot().items()):
+            if metric.kind == "counter":
+                lines.append(f"{name}{_labels(key)} {_number(value)}")
+                continue
+            # observe() already counts a value into every bucket >= it (cumulative)
+            for bound, count in zip(metric.buckets, value["buckets"]):
+                lines.append(f"{name}_bucket{_labels(key, (('le', _number(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_labels(key, (('le', '+Inf'),))} {value['count']}")
+            lines.append(f"{name}_sum{_labels(key)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_labels(key)} {value['count']}")
+    return "\n".join(lines) + "\n"
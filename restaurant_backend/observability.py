@@ -0,0 +1,233 @@
+# restaurant_backend/observability.py
+"""
+Per-request instrumentation.
+
+- recording(): context manager that collects DB query count/time and spans
+  for the code inside it (a request, a Celery task, a shell session)
+- RequestMetricsMiddleware: recording() around every request, one JSON log
+  line per request + http_* metrics; X-Request-ID in and out
+- span("llm", model=...): times a block into the current recording and the
+  app_span_seconds histogram (encode, vector_search, llm, cart)
+- JsonFormatter / log_event(): structured log lines, see LOGGING in settings
+- metrics_view: /metrics in Prometheus text format (restaurant_backend/metrics.py)
+
+DB queries are counted by an execute wrapper installed on every connection
+(connection_created); state lives in a ContextVar, so queries run through
+sync_to_async() in async views count towards their request.
+Streaming responses are logged when their headers are ready.
+"""
+import json
+import logging
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .metrics import counter, histogram, render_prometheus
+
+logger = logging.getLogger("restaurant_backend.requests")
+
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests by route, method and status")
+HTTP_DURATION = histogram("http_request_duration_seconds", "Time until the response (headers) was ready")
+HTTP_DB_QUERIES = histogram(
+    "http_request_db_queries", "DB queries per request", buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+)
+SPAN_SECONDS = histogram(
+    "app_span_seconds", "Duration of instrumented blocks (encode, vector_search, llm, cart)"
+)
+
+_current: ContextVar["RequestStats | None"] = ContextVar("request_stats", default=None)
+_REQUEST_ID = re.compile(r"^[\w.-]{1,64}$")
+
+
+class RequestStats:
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.spans: dict = {}  # name -> [count, seconds]
+
+    def add_span(self, name: str, seconds: float) -> None:
+        entry = self.spans.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def as_fields(self) -> dict:
+        return {
+            "db_queries": self.db_queries,
+            "db_ms": round(self.db_seconds * 1000, 1),
+            "spans": {name: {"count": c, "ms": round(s * 1000, 1)} for name, (c, s) in self.spans.items()},
+        }
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+@contextmanager
+def recording(request_id: str | None = None):
+    """Collect DB queries and spans of the block into a fresh RequestStats (yielded)."""
+    stats = RequestStats(request_id or uuid.uuid4().hex[:16])
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# ------------------------------------------------------------
+# Spans
+# ------------------------------------------------------------
+@contextmanager
+def span(name: str, **labels):
+    """Time the block; `labels` must be low-cardinality (they become metric labels)."""
+    # bound on entry: a generator finishing in another context still reports here
+    stats = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, span=name, **labels)
+        if stats is not None:
+            stats.add_span(name, elapsed)
+
+
+def traced(name: str, fn, **labels):
+    """`fn` wrapped in span(name)."""
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with span(name, **labels):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+# ------------------------------------------------------------
+# DB queries
+# ------------------------------------------------------------
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs) -> None:
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid="observability_query_recorder")
+
+
+# ------------------------------------------------------------
+# Structured logs
+# ------------------------------------------------------------
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={"fields": {...}}` become top-level keys."""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        stats = _current.get()
+        if stats is not None:
+            payload["request_id"] = stats.request_id
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+def log_event(log: logging.Logger, event: str, level: int = logging.INFO, **fields) -> None:
+    log.log(level, event, extra={"fields": fields})
+
+
+# ------------------------------------------------------------
+# Middleware
+# ------------------------------------------------------------
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection=connection)
+
+    @staticmethod
+    def _request_id(request) -> str | None:
+        incoming = request.headers.get("X-Request-ID", "")
+        return incoming if _REQUEST_ID.match(incoming) else None
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with recording(self._request_id(request)) as stats:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            self._finish(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        with recording(self._request_id(request)) as stats:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            self._finish(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def _finish(self, request, response, stats: RequestStats, elapsed: float) -> None:
+        match = getattr(request, "resolver_match", None)
+        # route pattern, not the path: ids must not become metric labels
+        route = match.route if match else "unmatched"
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        HTTP_DURATION.observe(elapsed, route=route)
+        HTTP_DB_QUERIES.observe(stats.db_queries, route=route)
+        response["X-Request-ID"] = stats.request_id
+
+        if match and match.url_name == "metrics":
+            return
+        log_event(
+            logger,
+            "request",
+            method=request.method,
+            path=request.path,
+            route=route,
+            status=response.status_code,
+            duration_ms=round(elapsed * 1000, 1),
+            **stats.as_fields(),
+        )
+
+
+# ------------------------------------------------------------
+# /metrics
+# ------------------------------------------------------------
+def metrics_view(request):
+    """Prometheus scrape endpoint; METRICS_TOKEN (if set) is required as a Bearer token."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
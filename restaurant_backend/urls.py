@@ -5,6 +5,7 @@ from django.conf.urls.static import static
 from rest_framework.authtoken.views import obtain_auth_token
 from django.views.generic import TemplateView
 from accounts.views  import LoginDemoView
+from restaurant_backend.observability import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,6 +26,9 @@ urlpatterns = [
         name="chat-demo",
     ),
     path("super-admin/", include("backoffice.urls")),
+
+    # Prometheus scrape endpoint
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 
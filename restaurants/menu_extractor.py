@@ -4,9 +4,10 @@ import json
 import os
 from io import BytesIO
 from pathlib import Path
-from groq import Groq
 from dotenv import load_dotenv
 
+from restaurant_backend.llm import chat_completion, completion_text
+
 # Load environment variables
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -44,7 +45,6 @@ def convert_pdf_to_images_in_memory(pdf_path):
 # Extract restaurant info from first page only
 # -------------------------------------------------------------------
 def extract_restaurant_info(image_bytes, groq_api_key):
-    client = Groq(api_key=groq_api_key)
     encoded_image = base64.b64encode(image_bytes).decode("utf-8")
 
     prompt = """
@@ -57,7 +57,10 @@ Extract restaurant name and phone number. Return ONLY JSON:
 """
 
     try:
-        completion = client.chat.completions.create(
+        # shared pooled client: TLS connection reused across pages/calls
+        completion = chat_completion(
+            api_key=groq_api_key,
+            timeout=60,
             model="meta-llama/llama-4-maverick-17b-128e-instruct",
             temperature=0.1,
             max_tokens=200,
@@ -75,7 +78,7 @@ Extract restaurant name and phone number. Return ONLY JSON:
             ]
         )
 
-        response = completion.choices[0].message.content.strip()
+        response = completion_text(completion)
         if response.startswith("```json"):
             response = response[7:]
         if response.startswith("```"):
@@ -92,7 +95,6 @@ Extract restaurant name and phone number. Return ONLY JSON:
 # Extract menu items from a single page
 # -------------------------------------------------------------------
 def extract_menu_to_json(image_bytes, groq_api_key, retry_with_shorter_prompt=False):
-    client = Groq(api_key=groq_api_key)
     encoded_image = base64.b64encode(image_bytes).decode("utf-8")
 
     if retry_with_shorter_prompt:
@@ -130,7 +132,10 @@ CRITICAL RULES:
 """
 
     try:
-        completion = client.chat.completions.create(
+        # big vision call: longer timeout than chat
+        completion = chat_completion(
+            api_key=groq_api_key,
+            timeout=180,
             model="meta-llama/llama-4-maverick-17b-128e-instruct",
             temperature=0.1,
             max_tokens=8192,
@@ -148,7 +153,7 @@ CRITICAL RULES:
             ]
         )
 
-        response = completion.choices[0].message.content.strip()
+        response = completion_text(completion)
 
         if response.startswith("```json"):
             response = response[7:]
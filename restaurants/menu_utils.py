@@ -1,9 +1,12 @@
 # restaurants/menu_utils.py
 
+import logging
 import os
 import tempfile
 import requests
 
+from restaurant_backend.observability import log_event, span
+
 from .menu_extractor import (
     convert_pdf_to_images_in_memory,
     extract_restaurant_info,
@@ -11,6 +14,8 @@ from .menu_extractor import (
     GROQ_API_KEY,
 )
 
+logger = logging.getLogger(__name__)
+
 
 def extract_menu_from_path(path, groq_api_key=None):
     """Local path (PDF / image) se menu JSON nikaalna using hero-ai pipeline.
@@ -58,15 +63,15 @@ def extract_menu_from_path(path, groq_api_key=None):
     # 3) har page se categories collect karo
     all_categories = []
     for idx, img_bytes in enumerate(image_bytes_list, start=1):
-        print(f"[menu-utils] extracting page {idx}/{len(image_bytes_list)} from {path}")
-        page_data = extract_menu_to_json(img_bytes, groq_api_key)
+        with span("menu_page_extract"):
+            page_data = extract_menu_to_json(img_bytes, groq_api_key)
         if not page_data:
-            print(f"[menu-utils] ✗ Failed to extract page {idx}")
+            log_event(logger, "menu_page_failed", logging.WARNING, path=path, page=idx, pages=len(image_bytes_list))
             continue
 
         cats = page_data.get("categories") or []
         all_categories.extend(cats)
-        print(f"[menu-utils] ✓ Extracted {len(cats)} categories from page {idx}")
+        log_event(logger, "menu_page_extracted", path=path, page=idx, pages=len(image_bytes_list), categories=len(cats))
 
     if not all_categories and not restaurant_info:
         return None
@@ -12,7 +12,7 @@ from restaurants.menu_utils import extract_menu_from_path
 
 from menu.services import rebuild_menu_from_json
 from menu.embedding_context import suspend_embedding_signals
-from menu.tasks import regenerate_menu_embeddings_for_restaurant
+from menu.tasks import enrich_menu_for_restaurant, regenerate_menu_embeddings_for_restaurant
 
 
 def _flatten_categories_to_items(categories: list[dict]) -> list[dict]:
@@ -133,8 +133,9 @@ def run_menu_extraction_pipeline(restaurant) -> Tuple[bool, Dict[str, Any]]:
     with suspend_embedding_signals():
         rebuild_menu_from_json(restaurant, items_from_json)
 
-    # Trigger embeddings ONCE
+    # Trigger embeddings ONCE (+ offline diet/allergen/calorie enrichment)
     regenerate_menu_embeddings_for_restaurant.delay(restaurant.id)
+    enrich_menu_for_restaurant.delay(restaurant.id)
 
     restaurant.menu_extract_status = "succeeded"
     restaurant.menu_extract_error = ""
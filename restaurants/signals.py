@@ -67,4 +67,42 @@
 #         print(f"[signals] Menu rebuilt for restaurant {instance.id}")
 
 #     # ensure this runs only after transaction commit
-#     transaction.on_commit(_go)
\ No newline at end of file
+#     transaction.on_commit(_go)
+
+# ------------------------------------------------------------
+# Owner -> restaurant cache (restaurants/tenant.py)
+# ------------------------------------------------------------
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Restaurant
+from . import tenant
+
+
+def _invalidate(*owner_ids):
+    tenant.invalidate(*owner_ids)
+    # again after commit: a request in between may have cached the old state
+    transaction.on_commit(lambda: tenant.invalidate(*owner_ids))
+
+
+def _owner_id(instance: Restaurant):
+    # __dict__: no extra query when owner is deferred (.only("id"))
+    return instance.__dict__.get("owner_id")
+
+
+@receiver(post_init, sender=Restaurant)
+def remember_owner(sender, instance: Restaurant, **kwargs):
+    instance._tenant_owner_id = _owner_id(instance)
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_owner_saved(sender, instance: Restaurant, **kwargs):
+    # old and new owner: a reassigned restaurant moves between both
+    _invalidate(instance._tenant_owner_id, _owner_id(instance))
+    instance._tenant_owner_id = _owner_id(instance)
+
+
+@receiver(post_delete, sender=Restaurant)
+def restaurant_owner_deleted(sender, instance: Restaurant, **kwargs):
+    _invalidate(instance._tenant_owner_id, _owner_id(instance))
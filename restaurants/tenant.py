@@ -0,0 +1,86 @@
+# restaurants/tenant.py
+"""
+Owner -> restaurant resolution for the owner / admin APIs.
+
+- owned_restaurant_id(user): id of the user's restaurant (None = owns none).
+  Cached per user for TENANT_CACHE_SECONDS (a few minutes), "owns none"
+  included - only with a shared cache: a per-process cache can't be
+  invalidated from the process that saved the Restaurant, so it would keep
+  granting a reassigned restaurant to its old owner
+- request_restaurant_id() / request_restaurant(): the same, memoized on the
+  request, so get_queryset() + perform_create() + templates resolve it once.
+  request_restaurant() loads the Restaurant row (one query) only when a view
+  needs more than the id
+- OwnerRestaurantMixin: self.owner_restaurant_id() / self.owner_restaurant()
+
+The cache entry is dropped by the Restaurant save / delete signals
+(restaurants/signals.py), so a new restaurant or a changed owner shows up on
+the next request.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from restaurant_backend.db import primary_reads
+from .models import Restaurant
+
+_UNSET = object()
+_NONE = 0  # cached "owns no restaurant" (cache.get() returns None for a miss)
+
+
+def _key(user_id) -> str:
+    return f"owner-restaurant:{user_id}"
+
+
+def owned_restaurant_id(user) -> int | None:
+    if not getattr(user, "is_authenticated", False):
+        return None
+    key = _key(user.pk)
+    restaurant_id = cache.get(key) if settings.CACHE_SHARED else None
+    if restaurant_id is None:
+        # feeds the cache: a lagging replica could pin "owns none" for minutes
+        with primary_reads():
+            restaurant_id = Restaurant.objects.filter(owner_id=user.pk).values_list("id", flat=True).first() or _NONE
+        if settings.CACHE_SHARED:
+            cache.set(key, restaurant_id, timeout=settings.TENANT_CACHE_SECONDS)
+    return restaurant_id or None
+
+
+def invalidate(*user_ids) -> None:
+    keys = [_key(user_id) for user_id in user_ids if user_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+def _http_request(request):
+    # DRF Request wraps the HttpRequest; memoize on the inner one so function
+    # views, templates and API views of the same request share it
+    return getattr(request, "_request", request)
+
+
+def request_restaurant_id(request) -> int | None:
+    http_request = _http_request(request)
+    restaurant_id = getattr(http_request, "_owned_restaurant_id", _UNSET)
+    if restaurant_id is _UNSET:
+        restaurant_id = owned_restaurant_id(request.user)
+        http_request._owned_restaurant_id = restaurant_id
+    return restaurant_id
+
+
+def request_restaurant(request) -> Restaurant | None:
+    http_request = _http_request(request)
+    restaurant = getattr(http_request, "_owned_restaurant", _UNSET)
+    if restaurant is _UNSET:
+        restaurant_id = request_restaurant_id(request)
+        restaurant = Restaurant.objects.filter(pk=restaurant_id).first() if restaurant_id else None
+        http_request._owned_restaurant = restaurant
+    return restaurant
+
+
+class OwnerRestaurantMixin:
+    """Views: the requesting user's restaurant, resolved once per request."""
+
+    def owner_restaurant_id(self) -> int | None:
+        return request_restaurant_id(self.request)
+
+    def owner_restaurant(self) -> Restaurant | None:
+        return request_restaurant(self.request)
@@ -1,3 +1,101 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from chatbot.models import RestaurantWidget
+from menu.embedding_context import suspend_embedding_signals
+from menu.models import Category, MenuItem
+
+from .models import Restaurant
+
+OWNER_ENDPOINTS = [
+    # (url, queries once the owner's restaurant id is cached)
+    ("/api/menu/menu-items/", 1),
+    ("/api/menu/categories/", 1),
+    ("/api/menu/sections/", 1),
+    ("/super-admin/owner/api/menu-items/", 1),
+    ("/super-admin/owner/categories/", 1),
+    # restaurant row (name, logo), widget, category counts
+    ("/api/chatbot/dashboard/widget/", 3),
+]
+
+
+# one test process: its memory cache is as shared as Redis
+@override_settings(CACHE_SHARED=True)
+class OwnerRestaurantResolutionTests(TestCase):
+    """
+    The owner -> restaurant lookup is cached (restaurants/tenant.py), not run
+    once or twice per request.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(username="owner", email="owner@example.com")
+        self.restaurant = Restaurant.objects.create(owner=self.owner, name="Only Kulchas")
+        RestaurantWidget.objects.create(restaurant=self.restaurant)
+        category = Category.objects.create(restaurant=self.restaurant, name="Breads")
+        with suspend_embedding_signals():
+            MenuItem.objects.create(
+                restaurant=self.restaurant, category=category, name="Amritsari Kulcha",
+                price=Decimal("120"), external_item_id="k1",
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_owner_endpoints_skip_the_lookup_once_cached(self):
+        # first owner request: + the owner -> restaurant id lookup
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/menu/categories/")
+        self.assertEqual([c["name"] for c in response.json()], ["Breads"])
+
+        for url, queries in OWNER_ENDPOINTS:
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_create_resolves_restaurant_without_query(self):
+        self.client.get("/api/menu/categories/")
+        with suspend_embedding_signals():
+            response = self.client.post(
+                "/super-admin/owner/api/menu-items/", {"name": "Sweet Lassi", "price": "60.00"}, format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(MenuItem.objects.get(name="Sweet Lassi").restaurant_id, self.restaurant.id)
+
+    def test_new_restaurant_is_picked_up(self):
+        other = User.objects.create(username="newcomer", email="newcomer@example.com")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get("/super-admin/owner/categories/").json(), {"results": []})
+
+        # "owns none" was cached; the Restaurant save drops it
+        restaurant = Restaurant.objects.create(owner=other, name="Lassi Corner")
+        Category.objects.create(restaurant=restaurant, name="Drinks")
+        response = self.client.get("/super-admin/owner/categories/")
+        self.assertEqual([c["name"] for c in response.json()["results"]], ["Drinks"])
+
+    def test_reassigned_restaurant_moves_to_new_owner(self):
+        self.client.get("/super-admin/owner/categories/")
+        new_owner = User.objects.create(username="new-owner", email="new-owner@example.com")
+        other = APIClient()
+        other.force_authenticate(new_owner)
+        self.assertEqual(other.get("/super-admin/owner/categories/").json(), {"results": []})
+
+        self.restaurant.owner = new_owner
+        self.restaurant.save()
+
+        # both cached answers are dropped: the old owner loses access at once
+        self.assertEqual(self.client.get("/super-admin/owner/categories/").json(), {"results": []})
+        response = other.get("/super-admin/owner/categories/")
+        self.assertEqual([c["name"] for c in response.json()["results"]], ["Breads"])
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_is_not_trusted(self):
+        self.client.get("/super-admin/owner/categories/")
+        # e.g. reassigned in another process: no signal reaches this one's cache
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(
+            owner=User.objects.create(username="new-owner", email="new-owner@example.com")
+        )
+        self.assertEqual(self.client.get("/super-admin/owner/categories/").json(), {"results": []})
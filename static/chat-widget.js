@@ -16,6 +16,8 @@
 
   const restaurantId = currentScript.getAttribute('data-restaurant-id');
   const apiBaseUrl = currentScript.getAttribute('data-api-base-url') || '';
+  // 'order' (default): intent/cart flow; 'assistant': streamed menu Q&A
+  const chatMode = currentScript.getAttribute('data-chat-mode') || 'order';
 
   if (!restaurantId) {
     console.error('[ChatWidget] data-restaurant-id is required.');
@@ -24,6 +26,7 @@
 
   const baseApiUrl = apiBaseUrl.replace(/\/$/, '');
   const apiUrl = baseApiUrl + '/api/chatbot/simple/';
+  const streamUrl = baseApiUrl + '/api/chatbot/chat/stream/';
   const categoriesUrl = baseApiUrl + '/api/chatbot/categories/';
   const SESSION_KEY = 'rb_chat_session_id';
 
@@ -517,18 +520,88 @@
     div.textContent = text;
     messagesEl.appendChild(div);
     messagesEl.scrollTop = messagesEl.scrollHeight;
+    return div;
+  }
+
+  // 🔹 Assistant mode: read SSE events from the stream endpoint and fill one bot bubble
+  async function streamChat(text) {
+    const res = await fetch(streamUrl, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        restaurant_id: parseInt(restaurantId, 10),
+        session_id: sessionId,
+        message: text,
+      }),
+    });
+
+    if (!res.ok || !res.body) {
+      let detail = 'Error: ' + res.status;
+      try {
+        const data = await res.json();
+        if (data.detail) detail += ' – ' + data.detail;
+      } catch (_) {}
+      addMessage(detail, 'bot');
+      return;
+    }
+
+    const bubble = addMessage('', 'bot');
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let sep;
+      while ((sep = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+
+        let event = 'message';
+        let data = '';
+        block.split('\n').forEach(function (line) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+
+        let payload = {};
+        try {
+          payload = data ? JSON.parse(data) : {};
+        } catch (err) {
+          console.error('[ChatWidget] bad SSE payload', err);
+          continue;
+        }
+
+        if (event === 'delta' || event === 'menu_list') {
+          bubble.textContent += payload.text || '';
+        } else if (event === 'error') {
+          bubble.textContent += (bubble.textContent ? '\n' : '') + '⚠️ ' + (payload.detail || 'Error');
+        } else if (event === 'done') {
+          console.log('[ChatWidget] stream done:', payload);
+        }
+        messagesEl.scrollTop = messagesEl.scrollHeight;
+      }
+    }
+
+    if (!bubble.textContent) {
+      bubble.textContent = 'No reply received from server.';
+    }
   }
 
   // 🔹 Render clickable menu items from backend "menu_items" with + / – / Add
-  function addMenuItems(items) {
+  // (title: optional heading, e.g. "People also order:" for recommendations)
+  function addMenuItems(items, title) {
     if (!items || !items.length) return;
 
     const wrapper = document.createElement('div');
     wrapper.className = 'rb-msg bot';
 
-    const title = document.createElement('div');
-    title.textContent = 'Tap + / - to choose quantity, then "Add":';
-    wrapper.appendChild(title);
+    const heading = document.createElement('div');
+    heading.textContent = title || 'Tap + / - to choose quantity, then "Add":';
+    wrapper.appendChild(heading);
 
     const list = document.createElement('div');
     list.className = 'menu-suggestions';
@@ -685,6 +758,19 @@
     input.value = '';
     sendBtn.disabled = true;
 
+    if (chatMode === 'assistant') {
+      try {
+        await streamChat(trimmed);
+      } catch (err) {
+        console.error('[ChatWidget] Error streaming reply:', err);
+        addMessage('Error talking to server. Please try again in a moment.', 'bot');
+      } finally {
+        sendBtn.disabled = false;
+        input.focus();
+      }
+      return;
+    }
+
     try {
       const res = await fetch(apiUrl, {
         method: 'POST',
@@ -705,11 +791,12 @@
       }
 
       // Show reply
-      addMessage(data.reply ?? 'No reply received from server.', 'bot');
+      // 429 (rate limit / restaurant busy) comes back as {detail}
+      addMessage(data.reply ?? data.detail ?? 'No reply received from server.', 'bot');
 
       // If backend sent structured menu items, show them as clickable cards with qty
       if (Array.isArray(data.menu_items) && data.menu_items.length > 0) {
-        addMenuItems(data.menu_items);
+        addMenuItems(data.menu_items, data.menu_items_title);
       }
 
       // Razorpay Payment trigger